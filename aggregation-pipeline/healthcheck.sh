@@ -33,7 +33,7 @@ done
 # URLs for Solace broker and validation service health checks
 SOLACE_BROKER_URL_GUARANTEED="$BROKER_HEALTH_PROTOCOL://$BROKER_HEALTH_HOST:$BROKER_HEALTH_PORT/health-check/guaranteed-active"
 SOLACE_BROKER_URL_DIRECT="$BROKER_HEALTH_PROTOCOL://$BROKER_HEALTH_HOST:$BROKER_HEALTH_PORT/health-check/direct-active"
-VALIDATION_SERVICE_URL="$API_PROTOCOL://$API_HOST:$API_PORT/validation-service/api/v1/health"
+VALIDATION_SERVICE_URL="$API_PROTOCOL://$API_HOST:$API_PORT/validation-service/api/v1/ready"
 
 MAX_ATTEMPTS=10          # Maximum attempts for health checks
 ATTEMPT=1                # Initial attempt counter
@@ -2,6 +2,7 @@ from opentelemetry.trace import StatusCode, SpanKind
 from opentelemetry import trace
 from bytewax.outputs import DynamicSink, StatelessSinkPartition
 from logger_config import setup_logger
+from trace_links import to_links
 from utils import send_to_api
 import os
 
@@ -21,33 +22,44 @@ class ApiSinkPartition(StatelessSinkPartition):
         """
         Processes a batch of items and sends each item to the API.
 
+        The batch is sent under a single `send_batch` span, which links to the
+        sampled receipts that contributed to the window of each item.
+
         Args:
             items (list[dict]): A list of event data dictionaries to be sent.
         """
+        links = []
         for item in items:
-            logger.info(f"Sending to API: {item}")
-            try:
-                # Start a span for tracing API requests
-                with tracer.start_as_current_span(
-                    "send_event_to_api", kind=SpanKind.CLIENT
-                ) as send_span:
-                    # Add tracing attributes for HTTP request details
-                    send_span.set_attribute("http.method", "POST")
-                    send_span.set_attribute(
-                        "http.url",
-                        f"{os.getenv('API_PROTOCOL')}://{os.getenv('API_HOST')}:{os.getenv('API_PORT')}/validation-service/api/v1/pos/amount-per-store",
-                    )
-                    send_span.set_attribute("event.id", item["event_id"])
-                    send_span.set_attribute("store.id", item["store_id"])
+            links.extend(
+                to_links(
+                    item.pop("trace_links", ()),
+                    {"event.id": item["event_id"], "store.id": item["store_id"]},
+                )
+            )
+
+        # Start a span for tracing API requests
+        with tracer.start_as_current_span(
+            "send_batch", kind=SpanKind.CLIENT, links=links
+        ) as send_span:
+            # Add tracing attributes for HTTP request details
+            send_span.set_attribute("http.method", "POST")
+            send_span.set_attribute(
+                "http.url",
+                f"{os.getenv('API_PROTOCOL')}://{os.getenv('API_HOST')}:{os.getenv('API_PORT')}/validation-service/api/v1/pos/amount-per-store",
+            )
+            send_span.set_attribute("batch.size", len(items))
+            send_span.set_attribute("event.ids", [item["event_id"] for item in items])
 
+            for item in items:
+                logger.info(f"Sending to API: {item}")
+                try:
                     # Send the event data to the API
                     send_to_api(item)
-
-            except Exception as e:
-                # Handle errors by logging and recording them in the tracing span
-                logger.error(f"Failed to send item {item}: {e}")
-                send_span.set_status(StatusCode.ERROR)
-                send_span.record_exception(e)
+                except Exception as e:
+                    # Handle errors by logging and recording them in the tracing span
+                    logger.error(f"Failed to send item {item}: {e}")
+                    send_span.set_status(StatusCode.ERROR)
+                    send_span.record_exception(e)
 
     def close(self):
         """
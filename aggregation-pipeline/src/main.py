@@ -7,19 +7,23 @@ from opentelemetry import trace
 from opentelemetry.sdk.resources import Resource
 from opentelemetry.sdk.trace import TracerProvider
 from opentelemetry.exporter.otlp.proto.grpc.trace_exporter import OTLPSpanExporter
-from opentelemetry.sdk.trace.export import BatchSpanProcessor
 from opentelemetry.instrumentation.requests import RequestsInstrumentor
 from logger_config import setup_logger
+from common.tracing_config import create_sampler, ErrorSpanProcessor
 from utils import (
     deserialize_message,
+    key_by_store,
     extract_timestamp,
     accumulator_builder,
     aggregate_sales,
     merger,
+    observe_window_close,
+    count_late_event,
     format_aggregated_event,
 )
-from solace_source import SolaceDynamicSource
+from solace_source import SolaceDynamicSource, SOURCE_MODE
 from api_sink import ApiDynamicSink
+from common.profiling import enable_profiling
 from prometheus_client import start_http_server
 import os
 
@@ -28,14 +32,14 @@ logger = setup_logger()
 
 # Configure OpenTelemetry for tracing
 resource = Resource.create(attributes={"service.name": "aggregation-pipeline"})
-tracer_provider = TracerProvider(resource=resource)
+tracer_provider = TracerProvider(resource=resource, sampler=create_sampler())
 trace.set_tracer_provider(tracer_provider)
 
 # Configure OTLP exporter for sending spans to the OpenTelemetry Collector
 otlp_exporter = OTLPSpanExporter(
     endpoint=f"{os.getenv('OTEL_COLLECTOR_PROTOCOL')}://{os.getenv('OTEL_COLLECTOR_HOST')}:{os.getenv('OTEL_COLLECTOR_PORT')}", insecure=True
 )
-span_processor = BatchSpanProcessor(
+span_processor = ErrorSpanProcessor(
     otlp_exporter,
     max_queue_size=1000,
     max_export_batch_size=500,
@@ -47,6 +51,7 @@ tracer = trace.get_tracer(__name__)
 # Instrument HTTP requests for tracing
 RequestsInstrumentor().instrument()
 start_http_server(8000) # Start Prometheus metrics server
+enable_profiling("aggregation-pipeline") # Start the profiling triggers, if configured
 
 # Define the dataflow
 flow = Dataflow("aggregation-pipeline")
@@ -54,8 +59,12 @@ flow = Dataflow("aggregation-pipeline")
 # Input: Source data from Solace
 stream = op.input("solace_input", flow, SolaceDynamicSource())
 
-# Step 1: Deserialize incoming messages
-deserialized_events = op.map("deserialize", stream, deserialize_message)
+# Step 1: Deserialize incoming messages (in the "properties" source mode, the source
+# already emits events built from the message properties)
+if SOURCE_MODE == "properties":
+    deserialized_events = stream
+else:
+    deserialized_events = op.map("deserialize", stream, deserialize_message)
 
 # Step 2: Filter valid events
 valid_events = op.filter(
@@ -63,13 +72,15 @@ valid_events = op.filter(
 )
 
 # Step 3: Key events by store ID for aggregation
-keyed_events = op.key_on("key_by_store", valid_events, lambda x: x["store_id"])
+keyed_events = op.key_on("key_by_store", valid_events, key_by_store)
 
-# Step 4: Define windowing parameters for event aggregation
+# Step 4: Define windowing parameters for event aggregation. Partial aggregates of the
+# edge pre-aggregation all carry their window start as event time and arrive within one
+# EDGE_FLUSH_INTERVAL of each other, so WINDOW_WAIT_SECONDS has to exceed it with them.
 align_to_start = datetime(2024, 11, 15, 0, 0, 0, tzinfo=timezone.utc)  # Window alignment
 clock = EventClock(
     lambda e: extract_timestamp(e["timestamp"]),  # Extract timestamp from events
-    wait_for_system_duration=timedelta(seconds=0.1),  # Minimal delay for late events
+    wait_for_system_duration=timedelta(seconds=float(os.getenv("WINDOW_WAIT_SECONDS", "0.1"))),
 )
 windower = TumblingWindower(length=timedelta(seconds=10), align_to=align_to_start)
 
@@ -84,6 +95,10 @@ aggregated_events = windowing.fold_window(
     merger=merger,  # Merge accumulators across partitions
 )
 
+# Track window emit lag and late events
+op.inspect("window_emit_lag", aggregated_events.meta, observe_window_close)
+op.inspect("late_events", aggregated_events.late, count_late_event)
+
 # Step 6: Format the aggregated events into the desired structure
 formatted_events = op.map(
     "format_in_event_structure", aggregated_events.down, format_aggregated_event
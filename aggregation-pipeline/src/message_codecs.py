@@ -0,0 +1,174 @@
+import json
+import os
+import re
+from datetime import datetime, timezone
+from metrics import PROJECTION_FALLBACKS
+
+# User property carrying the content type of a message payload
+CONTENT_TYPE_PROPERTY = "content_type"
+JSON_CONTENT_TYPE = "application/json"
+MSGPACK_CONTENT_TYPE = "application/msgpack"
+
+# Typed user properties carrying the routing keys of a receipt
+STORE_ID_PROPERTY = "store_id"
+EVENT_TIME_PROPERTY = "event_time_ms"
+TOTAL_CENTS_PROPERTY = "total_cents"
+
+# Boolean user properties of the partial aggregates of the validation service's edge
+# pre-aggregation, which carry the routing properties of a receipt (with the window
+# start as event time) and are folded in place of their receipts if those were suppressed
+PARTIAL_AGGREGATE_PROPERTY = "partial_aggregate"
+RECEIPTS_SUPPRESSED_PROPERTY = "receipts_suppressed"
+
+# Fields of a receipt the aggregation reads
+EVENT_FIELDS = ("store_id", "timestamp", "total_amount")
+
+# JSON decoding mode: "projection" extracts only the needed fields, "full" parses the whole receipt
+DESERIALIZE_MODE = os.getenv("DESERIALIZE_MODE", "projection")
+
+# Patterns of the projected fields (plain string values without escapes, JSON numbers)
+STORE_ID_PATTERN = re.compile(r'"store_id"\s*:\s*"([^"\\]*)"')
+TIMESTAMP_PATTERN = re.compile(r'"timestamp"\s*:\s*"([^"\\]*)"')
+TOTAL_AMOUNT_PATTERN = re.compile(r'"total_amount"\s*:\s*(-?\d+(?:\.\d+)?(?:[eE][+-]?\d+)?)')
+RECEIPT_PATTERN = re.compile(r'"receipt"\s*:')
+
+
+def project(document: dict) -> dict:
+    """
+    Reduces a decoded receipt to the fields the aggregation reads.
+
+    Args:
+        document (dict): The decoded receipt.
+
+    Returns:
+        dict: The `store_id`, `timestamp` and `total_amount` of the receipt.
+
+    Raises:
+        KeyError: If a field is missing.
+    """
+    return {field: document[field] for field in EVENT_FIELDS}
+
+
+def decode_json(payload: str | bytes) -> dict:
+    """
+    Decodes a JSON receipt.
+
+    Args:
+        payload (str | bytes): The JSON document.
+
+    Returns:
+        dict: The projected event (see `project`).
+    """
+    return project(json.loads(payload))
+
+
+def decode_json_projection(payload: str | bytes) -> dict:
+    """
+    Extracts the projected fields of a JSON receipt without parsing the whole document.
+
+    The fields are located with regular expressions instead of building the `items`
+    list and the nested `receipt` object. The first match of each field is used, so
+    this relies on the serialization of the validation service, where the top-level
+    `total_amount` precedes the nested `receipt` (which carries its own `total_amount`).
+    Only this order is checked: the payload is not validated as JSON, and a receipt
+    with other fields in another order may be decoded from the wrong occurrence.
+    Receipts where a field is missing, has an escaped string value or where `receipt`
+    precedes `total_amount` are decoded with a full parse (`decode_json`).
+
+    Args:
+        payload (str | bytes): The JSON document.
+
+    Returns:
+        dict: The projected event (see `project`).
+    """
+    if isinstance(payload, bytes):
+        payload = payload.decode()
+
+    store_id = STORE_ID_PATTERN.search(payload)
+    timestamp = TIMESTAMP_PATTERN.search(payload)
+    total_amount = TOTAL_AMOUNT_PATTERN.search(payload)
+    receipt = RECEIPT_PATTERN.search(payload)
+    if (
+        store_id is None
+        or timestamp is None
+        or total_amount is None
+        or (receipt is not None and receipt.start() < total_amount.start())
+    ):
+        PROJECTION_FALLBACKS.inc()
+        return decode_json(payload)
+
+    return {
+        "store_id": store_id.group(1),
+        "timestamp": timestamp.group(1),
+        "total_amount": float(total_amount.group(1)),
+    }
+
+
+def decode_msgpack(payload: bytes) -> dict:
+    """
+    Decodes a MessagePack receipt.
+
+    The `msgpack` package is imported on first use, so that it is only required
+    when MessagePack messages are consumed.
+
+    Args:
+        payload (bytes): The MessagePack document.
+
+    Returns:
+        dict: The projected event (see `project`).
+    """
+    import msgpack
+
+    return project(msgpack.unpackb(payload))
+
+
+def event_from_properties(store_id: str, event_time_ms: int, total_cents: int) -> dict:
+    """
+    Builds an event from the typed routing properties of a receipt.
+
+    Args:
+        store_id (str): The `store_id` property.
+        event_time_ms (int): The `event_time_ms` property (epoch milliseconds).
+        total_cents (int): The `total_cents` property.
+
+    Returns:
+        dict: The event with `store_id`, `timestamp` (datetime) and `total_amount`.
+    """
+    return {
+        "store_id": store_id,
+        "timestamp": datetime.fromtimestamp(event_time_ms / 1000, tz=timezone.utc),
+        "total_amount": total_cents / 100,
+    }
+
+
+def event_from_topic(topic: str):
+    """
+    Builds an event from the levels of a receipt topic.
+
+    Receipt topics have the form
+    `<prefix>/receipt/{store_id}/{cashier_id}/{payment_method}/{payment_status}/{timestamp}/{transaction_id}/{total_amount}/...`.
+
+    Args:
+        topic (str): The destination topic of the message.
+
+    Returns:
+        dict or None: The event with `store_id`, `timestamp` and `total_amount`,
+            or None if the topic is not a receipt topic.
+    """
+    levels = topic.split("/")
+    try:
+        receipt = levels.index("receipt")
+        return {
+            "store_id": levels[receipt + 1],
+            "timestamp": levels[receipt + 5],
+            "total_amount": float(levels[receipt + 7]),
+        }
+    except (ValueError, IndexError):
+        return None
+
+
+# Decoders per content type; messages without a content type are JSON
+DECODERS = {
+    JSON_CONTENT_TYPE: decode_json_projection if DESERIALIZE_MODE == "projection" else decode_json,
+    MSGPACK_CONTENT_TYPE: decode_msgpack,
+}
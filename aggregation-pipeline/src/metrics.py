@@ -0,0 +1,58 @@
+from prometheus_client import Counter, Histogram
+
+# Prometheus Metrics for each step of the dataflow
+RECEIVE_BATCH_SIZE = Histogram(
+    "pipeline_receive_batch_size",
+    "Number of messages returned per source batch",
+    buckets=(0, 1, 2, 5, 10, 25, 50, 100, 250, 500, 1000),
+)
+DESERIALIZE_FAILURES = Counter(
+    "pipeline_deserialize_failures_total", "Number of messages that could not be deserialized"
+)
+PROJECTION_FALLBACKS = Counter(
+    "pipeline_projection_fallbacks_total",
+    "Number of JSON messages decoded with a full parse because the projection did not match",
+)
+PARTIAL_AGGREGATES = Counter(
+    "pipeline_partial_aggregates_total",
+    "Number of received partial aggregates of the edge pre-aggregation, folded or ignored",
+    ["action"],
+)
+EVENTS_PER_STORE = Counter(
+    "pipeline_events_total", "Number of valid events keyed per store", ["store_id"]
+)
+LATE_EVENTS = Counter(
+    "pipeline_late_events_total", "Number of events that arrived after their window closed"
+)
+WINDOW_FOLD_LATENCY = Histogram(
+    "pipeline_window_fold_latency_seconds",
+    "Time spent folding a single event into its window accumulator (sampled every FOLD_LATENCY_SAMPLE_INTERVAL events)",
+    buckets=(0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.005, 0.01),
+)
+WINDOW_EMIT_LAG = Histogram(
+    "pipeline_window_emit_lag_seconds",
+    "Wall clock time minus window end when a window is emitted",
+    buckets=(0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300),
+)
+SINK_POST_LATENCY = Histogram(
+    "pipeline_sink_post_latency_seconds", "Latency of aggregated event POST requests in seconds"
+)
+SINK_POST_ERRORS = Counter(
+    "pipeline_sink_post_errors_total", "Number of failed aggregated event POST requests"
+)
+
+# Label children are created once per store and reused for every event
+_store_event_counters = {}
+
+
+def count_store_event(store_id):
+    """
+    Increments the event counter for a store without allocating labels per event.
+
+    Args:
+        store_id (str): The store identifier of the event.
+    """
+    counter = _store_event_counters.get(store_id)
+    if counter is None:
+        counter = _store_event_counters[store_id] = EVENTS_PER_STORE.labels(store_id=store_id)
+    counter.inc()
@@ -13,9 +13,23 @@ from solace_otel.messaging.trace.propagation import (
     InboundMessageGetter,
 )
 from bytewax.inputs import DynamicSource, StatelessSourcePartition
-from opentelemetry import propagate, context, trace
+from opentelemetry import propagate, trace
 from opentelemetry.trace import StatusCode, SpanKind
 from logger_config import setup_logger
+from metrics import DESERIALIZE_FAILURES, PARTIAL_AGGREGATES, RECEIVE_BATCH_SIZE
+from message_codecs import (
+    CONTENT_TYPE_PROPERTY,
+    JSON_CONTENT_TYPE,
+    STORE_ID_PROPERTY,
+    EVENT_TIME_PROPERTY,
+    TOTAL_CENTS_PROPERTY,
+    PARTIAL_AGGREGATE_PROPERTY,
+    RECEIPTS_SUPPRESSED_PROPERTY,
+    event_from_properties,
+    event_from_topic,
+)
+from trace_links import sampled_link, to_links
+from utils import deserialize_message
 import os
 
 # Initialize logger and tracer
@@ -31,6 +45,17 @@ POS_TRANSACTION_CONFIG = {
 }
 POS_QUEUE_NAME = os.getenv('BROKER_QUEUE_NAME')
 
+# Source mode: "payload" emits message payloads for the deserialize step, "properties"
+# emits events built from the routing properties and topic without reading the payload
+SOURCE_MODE = os.getenv("SOURCE_MODE", "payload")
+
+# Maximum number of messages received and processed per source batch
+SOURCE_BATCH_SIZE = int(os.getenv("SOURCE_BATCH_SIZE", "100"))
+
+# Time in milliseconds a batch waits for its first message (the Solace receive
+# timeout is in milliseconds); further messages are only taken if already received
+SOURCE_RECEIVE_TIMEOUT_MS = int(os.getenv("SOURCE_RECEIVE_TIMEOUT_MS", "1"))
+
 
 class SolaceSourcePartition(StatelessSourcePartition):
     """
@@ -102,54 +127,161 @@ class SolaceSourcePartition(StatelessSourcePartition):
         """
         Receives the next batch of messages from the queue.
 
-        Processes messages with tracing and acknowledges them upon successful processing.
+        Waits up to `SOURCE_RECEIVE_TIMEOUT_MS` for the first message, then takes the
+        messages that have already arrived without waiting, so that a batch never
+        stalls the worker. Up to `SOURCE_BATCH_SIZE` messages are processed under a
+        single `process_batch` span, which links to the producer spans of the messages
+        that were sampled.
+        Each message is acknowledged once processed.
 
         Returns:
-            list[str]: A list of payloads from the processed messages.
+            list: Per processed message, its content type, payload and link reference
+                (`payload` mode), or its event (`properties` mode, see `read_event`).
+                Partial aggregates are always returned as events (see `read_partial`),
+                or left out if they are not folded.
         """
+        messages = []
         try:
-            message = self.receiver.receive_message(timeout=1)
-            if message:
-                PROPAGATOR = propagate.get_global_textmap()
-                carrier = InboundMessageCarrier(message)
-                extracted_ctx = PROPAGATOR.extract(
-                    carrier=carrier, getter=InboundMessageGetter()
-                )
+            message = self.receiver.receive_message(timeout=SOURCE_RECEIVE_TIMEOUT_MS)
+            while message:
+                messages.append(message)
+                if len(messages) >= SOURCE_BATCH_SIZE:
+                    break
+                message = self.receiver.receive_message(timeout=0)
+        except Exception as e:
+            logger.error(f"Error receiving message: {e}")
+
+        RECEIVE_BATCH_SIZE.observe(len(messages))
+        if not messages:
+            return []
 
-                token = context.attach(extracted_ctx)
+        trace_links = [self.read_link(message) for message in messages]
+        items = []
+        with tracer.start_as_current_span(
+            "process_batch",
+            kind=SpanKind.CONSUMER,
+            links=to_links(link for link in trace_links if link is not None),
+        ) as span:
+            span.set_attribute("messaging.system", "PubSub+")
+            span.set_attribute("messaging.destination_kind", "queue")
+            span.set_attribute("messaging.destination", POS_QUEUE_NAME)
+            span.set_attribute("messaging.operation", "process")
+            span.set_attribute("messaging.batch.message_count", len(messages))
+
+            for message, trace_link in zip(messages, trace_links):
                 try:
-                    with tracer.start_as_current_span(
-                        "process_message", kind=SpanKind.CONSUMER
-                    ) as span:
-                        span.set_attribute("messaging.system", "PubSub+")
-                        span.set_attribute("messaging.destination_kind", "queue")
-                        span.set_attribute(
-                            "messaging.destination", message.get_destination_name()
-                        )
-                        span.set_attribute("messaging.operation", "process")
-
-                        # Extract message payload
-                        payload = (
-                            message.get_payload_as_string()
-                            or message.get_payload_as_bytes().decode()
-                        )
-                        logger.info(f"Received message: {payload}")
-
-                        # Acknowledge the message
-                        self.receiver.ack(message)
-
-                        # Set trace status to OK
-                        span.set_status(StatusCode.OK)
-                        return [payload]
+                    if message.get_property(PARTIAL_AGGREGATE_PROPERTY):
+                        item = self.read_partial(message)
+                        if item is not None:
+                            item["trace_link"] = trace_link
+                    elif SOURCE_MODE == "properties":
+                        item = self.read_event(message)
+                        if item is not None:
+                            item["trace_link"] = trace_link
+                    else:
+                        item = (*self.read_payload(message), trace_link)
+
+                    # Acknowledge the message
+                    self.receiver.ack(message)
+                    if item is not None:
+                        items.append(item)
                 except Exception as e:
                     logger.error(f"Error processing message: {e}")
                     span.set_status(StatusCode.ERROR)
                     span.record_exception(e)
-            else:
-                return []
-        except Exception as e:
-            logger.error(f"Error receiving message: {e}")
-            return []
+        return items
+
+    def read_link(self, message):
+        """
+        Extracts the propagated producer span context of a message as a link reference.
+
+        Args:
+            message (InboundMessage): The received message.
+
+        Returns:
+            tuple[int, int] or None: The trace ID and span ID of the producer span,
+                or None if it was not propagated or not sampled.
+        """
+        extracted_ctx = propagate.get_global_textmap().extract(
+            carrier=InboundMessageCarrier(message), getter=InboundMessageGetter()
+        )
+        return sampled_link(trace.get_current_span(extracted_ctx).get_span_context())
+
+    def read_payload(self, message):
+        """
+        Extracts the payload of a message: JSON as text, binary encodings as bytes.
+
+        Args:
+            message (InboundMessage): The received message.
+
+        Returns:
+            tuple[str, str | bytes]: The content type and payload of the message.
+        """
+        content_type = message.get_property(CONTENT_TYPE_PROPERTY) or JSON_CONTENT_TYPE
+        if content_type == JSON_CONTENT_TYPE:
+            payload = (
+                message.get_payload_as_string()
+                or message.get_payload_as_bytes().decode()
+            )
+        else:
+            payload = message.get_payload_as_bytes()
+        logger.debug("Received %s message: %s", content_type, payload)
+        return content_type, payload
+
+    def read_event(self, message):
+        """
+        Builds the event of a message without reading its payload if possible.
+
+        - Uses the typed `store_id`, `event_time_ms` and `total_cents` properties.
+        - Falls back to the levels of the receipt topic for messages without them.
+        - Decodes the payload only if neither is available.
+
+        Args:
+            message (InboundMessage): The received message.
+
+        Returns:
+            dict or None: The event with `store_id`, `timestamp` and `total_amount`,
+                or None if it could not be built.
+        """
+        store_id = message.get_property(STORE_ID_PROPERTY)
+        event_time_ms = message.get_property(EVENT_TIME_PROPERTY)
+        total_cents = message.get_property(TOTAL_CENTS_PROPERTY)
+        if store_id is not None and event_time_ms is not None and total_cents is not None:
+            return event_from_properties(store_id, event_time_ms, total_cents)
+
+        event = event_from_topic(message.get_destination_name())
+        if event is not None:
+            return event
+        return deserialize_message(self.read_payload(message))
+
+    def read_partial(self, message):
+        """
+        Builds the event of a partial aggregate of the validation service's edge pre-aggregation.
+
+        - A partial is folded like a receipt, with the start of its window as event time,
+          so that it lands in the same window as the receipts it sums.
+        - It is only folded if its receipts were not published individually
+          (`receipts_suppressed`); otherwise they are aggregated and it is ignored.
+
+        Args:
+            message (InboundMessage): The received partial aggregate.
+
+        Returns:
+            dict or None: The event with `store_id`, `timestamp` and `total_amount`,
+                or None if the partial is ignored or lacks its routing properties.
+        """
+        if not message.get_property(RECEIPTS_SUPPRESSED_PROPERTY):
+            PARTIAL_AGGREGATES.labels(action="ignored").inc()
+            return None
+        store_id = message.get_property(STORE_ID_PROPERTY)
+        event_time_ms = message.get_property(EVENT_TIME_PROPERTY)
+        total_cents = message.get_property(TOTAL_CENTS_PROPERTY)
+        if store_id is None or event_time_ms is None or total_cents is None:
+            logger.error(f"Partial aggregate without routing properties on {message.get_destination_name()}")
+            DESERIALIZE_FAILURES.inc()
+            return None
+        PARTIAL_AGGREGATES.labels(action="folded").inc()
+        return event_from_properties(store_id, event_time_ms, total_cents)
 
     def close(self):
         """
@@ -0,0 +1,50 @@
+import os
+from opentelemetry.trace import Link, SpanContext, TraceFlags
+
+# Maximum number of receipt links kept per aggregation window
+WINDOW_LINK_LIMIT = int(os.getenv("WINDOW_LINK_LIMIT", "32"))
+
+
+def sampled_link(span_context: SpanContext):
+    """
+    Reduces a propagated producer span context to a link reference if it was sampled.
+
+    Unsampled producer spans are never exported, so links to them would dangle.
+    The reference is a plain tuple, so that it can be carried in events and
+    window state.
+
+    Args:
+        span_context (SpanContext): The extracted span context of a message.
+
+    Returns:
+        tuple[int, int] or None: The trace ID and span ID, or None if the context
+            is invalid or was not sampled.
+    """
+    if not span_context.is_valid or not span_context.trace_flags.sampled:
+        return None
+    return span_context.trace_id, span_context.span_id
+
+
+def to_links(references, attributes=None):
+    """
+    Builds span links from link references (see `sampled_link`).
+
+    Args:
+        references (Iterable[tuple[int, int]]): The trace and span IDs to link.
+        attributes (dict, optional): Attributes set on every link.
+
+    Returns:
+        list[Link]: The span links.
+    """
+    return [
+        Link(
+            SpanContext(
+                trace_id=trace_id,
+                span_id=span_id,
+                is_remote=True,
+                trace_flags=TraceFlags(TraceFlags.SAMPLED),
+            ),
+            attributes,
+        )
+        for trace_id, span_id in references
+    ]
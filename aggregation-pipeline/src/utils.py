@@ -1,41 +1,101 @@
+import itertools
 import json
-from datetime import datetime
+from datetime import datetime, timezone
+import time
 import uuid
 import requests
 from logger_config import setup_logger
+from common.compression import create_compressor
+from message_codecs import DECODERS
+from trace_links import WINDOW_LINK_LIMIT
+from metrics import (
+    DESERIALIZE_FAILURES,
+    LATE_EVENTS,
+    WINDOW_FOLD_LATENCY,
+    WINDOW_EMIT_LAG,
+    SINK_POST_LATENCY,
+    SINK_POST_ERRORS,
+    count_store_event,
+)
 import os
 
 # Initialize logger
 logger = setup_logger()
 
+# Request body compression of the API sink (None if disabled)
+SINK_COMPRESSOR = create_compressor()
 
-def deserialize_message(event: str):
+# Every n-th window fold is timed for `pipeline_window_fold_latency_seconds`, so that
+# the histogram does not cost more than the fold itself
+FOLD_LATENCY_SAMPLE_INTERVAL = int(os.getenv("FOLD_LATENCY_SAMPLE_INTERVAL", "100"))
+_folds = itertools.count()
+
+
+def deserialize_message(message):
     """
-    Deserializes a JSON-formatted string into a Python dictionary.
+    Decodes a received message into an event with the fields the aggregation reads.
+
+    Events the source already built (partial aggregates, see `read_partial`) are
+    passed through.
 
     Args:
-        event (str): The JSON-formatted string.
+        message (tuple | dict): The content type and payload of the message, optionally
+            followed by the link reference to its producer span (see `sampled_link`),
+            or an event.
 
     Returns:
-        dict or None: The deserialized dictionary if successful, otherwise None.
+        dict or None: The `store_id`, `timestamp` and `total_amount` of the event,
+            and its `trace_link` if given, if successful, otherwise None.
     """
+    if isinstance(message, dict):
+        return message
+    content_type, payload, *trace_link = message
+    decoder = DECODERS.get(content_type)
+    if decoder is None:
+        logger.error(f"Unsupported content type: {content_type}")
+        DESERIALIZE_FAILURES.inc()
+        return None
     try:
-        return json.loads(event)
-    except json.JSONDecodeError:
-        logger.error("Error decoding JSON")
+        event = decoder(payload)
+        if trace_link:
+            event["trace_link"] = trace_link[0]
+        return event
+    except (ValueError, KeyError, TypeError) as e:
+        logger.error(f"Error decoding {content_type} message: {e}")
+        DESERIALIZE_FAILURES.inc()
         return None
 
 
+def key_by_store(event):
+    """
+    Returns the store ID used to key an event and counts the event per store.
+
+    Args:
+        event (dict): The deserialized event.
+
+    Returns:
+        str: The store ID of the event.
+    """
+    store_id = event["store_id"]
+    count_store_event(store_id)
+    return store_id
+
+
 def extract_timestamp(timestamp_str):
     """
     Extracts a datetime object from an ISO 8601-formatted timestamp string.
 
+    Events built from message properties already carry a datetime, which is
+    returned unchanged.
+
     Args:
-        timestamp_str (str): The ISO 8601-formatted timestamp.
+        timestamp_str (str | datetime): The ISO 8601-formatted timestamp.
 
     Returns:
         datetime: The corresponding datetime object.
     """
+    if isinstance(timestamp_str, datetime):
+        return timestamp_str
     return datetime.fromisoformat(timestamp_str.replace("Z", "+00:00"))
 
 
@@ -46,13 +106,20 @@ def accumulator_builder():
     Returns:
         dict: A dictionary with initialized fields for aggregation.
     """
-    return {"total_amount": 0.0, "min_timestamp": None, "max_timestamp": None}
+    return {
+        "total_amount": 0.0,
+        "min_timestamp": None,
+        "max_timestamp": None,
+        "trace_links": [],
+    }
 
 
 def aggregate_sales(accumulator, event):
     """
     Aggregates sales data by updating the accumulator with the event details.
 
+    Every `FOLD_LATENCY_SAMPLE_INTERVAL`-th call is timed for the fold latency histogram.
+
     Args:
         accumulator (dict): The current state of the accumulator.
         event (dict): The new event data to include in the aggregation.
@@ -60,6 +127,8 @@ def aggregate_sales(accumulator, event):
     Returns:
         dict: The updated accumulator.
     """
+    timed = next(_folds) % FOLD_LATENCY_SAMPLE_INTERVAL == 0
+    start_time = time.perf_counter() if timed else None
     amount = event["total_amount"]
     event_time = extract_timestamp(event["timestamp"])
 
@@ -80,6 +149,13 @@ def aggregate_sales(accumulator, event):
     ):
         accumulator["max_timestamp"] = event_time
 
+    # Keep links to the first sampled receipts of the window
+    trace_link = event.get("trace_link")
+    if trace_link is not None and len(accumulator["trace_links"]) < WINDOW_LINK_LIMIT:
+        accumulator["trace_links"].append(trace_link)
+
+    if timed:
+        WINDOW_FOLD_LATENCY.observe(time.perf_counter() - start_time)
     return accumulator
 
 
@@ -104,9 +180,35 @@ def merger(acc1, acc2):
             acc1["max_timestamp"] or acc2["max_timestamp"],
             acc2["max_timestamp"] or acc1["max_timestamp"],
         ),
+        "trace_links": (acc1["trace_links"] + acc2["trace_links"])[:WINDOW_LINK_LIMIT],
     }
 
 
+def observe_window_close(step_id, item):
+    """
+    Records the emit lag of a closed window (wall clock minus window end).
+
+    Args:
+        step_id (str): The ID of the inspecting step.
+        item (tuple): A tuple containing the store key and (window ID, window metadata).
+    """
+    _, (_, metadata) = item
+    WINDOW_EMIT_LAG.observe(
+        (datetime.now(timezone.utc) - metadata.close_time).total_seconds()
+    )
+
+
+def count_late_event(step_id, item):
+    """
+    Counts an event that arrived after its window was closed.
+
+    Args:
+        step_id (str): The ID of the inspecting step.
+        item (tuple): A tuple containing the store key and (window ID, event).
+    """
+    LATE_EVENTS.inc()
+
+
 def format_aggregated_event(item):
     """
     Formats aggregated sales data into the required structure.
@@ -115,7 +217,8 @@ def format_aggregated_event(item):
         item (tuple): A tuple containing the store key and (window, accumulator).
 
     Returns:
-        dict: A dictionary with the formatted aggregated data.
+        dict: A dictionary with the formatted aggregated data. Its `trace_links`
+            are removed by the sink before sending.
     """
     key, (window, accumulator) = item
     accumulator["event_id"] = str(uuid.uuid4())
@@ -140,19 +243,30 @@ def send_to_api(aggregated_data):
     """
     Sends aggregated sales data to a remote API.
 
+    The body is compressed if `HTTP_COMPRESSION` is set (see `create_compressor`).
+
     Args:
         aggregated_data (dict): The data to be sent to the API.
     """
     url = f"{os.getenv('API_PROTOCOL')}://{os.getenv('API_HOST')}:{os.getenv('API_PORT')}/validation-service/api/v1/pos/amount-per-store"
+    headers = {"Content-Type": "application/json"}
+    body = json.dumps(aggregated_data).encode()
+    if SINK_COMPRESSOR:
+        headers = SINK_COMPRESSOR.headers(headers)
+        body = SINK_COMPRESSOR.compress(body)
 
+    start_time = time.perf_counter()
     try:
         response = requests.post(
             url,
-            headers={"Content-Type": "application/json"},
-            json=aggregated_data,
+            headers=headers,
+            data=body,
             auth=(os.getenv("API_USERNAME"), os.getenv("API_PASSWORD")),
         )
         response.raise_for_status()
         logger.info(f"Data sent successfully: {aggregated_data}")
     except requests.exceptions.RequestException as e:
         logger.error(f"Failed to send data: {e}")
+        SINK_POST_ERRORS.inc()
+    finally:
+        SINK_POST_LATENCY.observe(time.perf_counter() - start_time)
@@ -0,0 +1,58 @@
+import json
+import pytest
+from message_codecs import decode_json, decode_json_projection
+from metrics import PROJECTION_FALLBACKS
+
+RECEIPT = {
+    "transaction_id": "tx-1",
+    "store_id": "STORE_01",
+    "timestamp": "2024-01-01T12:00:00Z",
+    "items": [{"item_id": "A1", "name": "Milk", "price": 1.25, "quantity": 2}],
+    "total_amount": 12.5,
+    "receipt": {"receipt_id": "r-1", "date": "2024-01-01T12:00:00Z", "total_amount": 99.0},
+}
+
+
+def fallbacks():
+    return PROJECTION_FALLBACKS._value.get()
+
+
+def test_projection_matches_full_parse():
+    payload = json.dumps(RECEIPT)
+    before = fallbacks()
+
+    assert decode_json_projection(payload) == decode_json(payload)
+    assert decode_json_projection(payload.encode())["total_amount"] == 12.5
+    assert fallbacks() == before
+
+
+@pytest.mark.parametrize(
+    "receipt",
+    [
+        {**RECEIPT, "store_id": 'STORE_"01"'},
+        {key: value for key, value in RECEIPT.items() if key != "timestamp"},
+        {"receipt": RECEIPT["receipt"], **RECEIPT},
+    ],
+    ids=["escaped_string", "missing_field", "receipt_before_total_amount"],
+)
+def test_unexpected_shape_falls_back_to_full_parse(receipt):
+    payload = json.dumps(receipt)
+    before = fallbacks()
+
+    if "timestamp" in receipt:
+        assert decode_json_projection(payload) == decode_json(payload)
+    else:
+        with pytest.raises(KeyError):
+            decode_json_projection(payload)
+    assert fallbacks() == before + 1
+
+
+def test_malformed_json_is_rejected_by_the_full_parse():
+    with pytest.raises(json.JSONDecodeError):
+        decode_json_projection('{"store_id": "STORE_01", "total_amount": 1, ')
+
+
+def test_projection_does_not_validate_the_document():
+    payload = json.dumps(RECEIPT)[:-10]
+
+    assert decode_json_projection(payload)["store_id"] == "STORE_01"
@@ -1,7 +1,8 @@
 # ------------------------------------------------------------------------------
 # Terraform configuration for creating queues and subscriptions in Solace Message Broker.
 # This setup includes:
-# - A queue for receipt messages with a corresponding subscription.
+# - A queue for receipt messages with a corresponding subscription, which also
+#   receives the partial aggregates of the edge pre-aggregation.
 # - Per-store queues and subscriptions for aggregations.
 # ------------------------------------------------------------------------------
 
@@ -21,6 +22,12 @@ resource "solacebroker_msg_vpn_queue_subscription" "receipts_subscription" {
     subscription_topic = "${data.vault_generic_secret.message_broker_config.data["pos_topic_prefix"]}/receipt/>"
 }
 
+resource "solacebroker_msg_vpn_queue_subscription" "partial_aggregates_subscription" {
+    queue_name        = solacebroker_msg_vpn_queue.receipts_queue.queue_name
+    msg_vpn_name      = data.vault_generic_secret.message_broker_config.data["msg_vpn"]
+    subscription_topic = "${data.vault_generic_secret.message_broker_config.data["pos_topic_prefix"]}/aggregations/partial/>"
+}
+
 resource "solacebroker_msg_vpn_queue" "store_queue" {
     count = var.number_of_stores
 
@@ -0,0 +1,159 @@
+import os
+import zlib
+
+# Content encodings supported by the validation service
+SUPPORTED_ENCODINGS = ("gzip", "zstd")
+
+
+class RequestCompressor:
+    """
+    Compresses HTTP request bodies with gzip or zstd.
+
+    Attributes:
+        encoding (str): The `Content-Encoding` of compressed bodies.
+        level (int): The compression level.
+    """
+
+    def __init__(self, encoding: str, level: int):
+        """
+        Initializes the compressor.
+
+        The `zstandard` package is imported lazily, so that it is only required
+        when zstd is used.
+
+        Args:
+            encoding (str): "gzip" or "zstd".
+            level (int): The compression level (gzip 1 - 9, zstd 1 - 22).
+
+        Raises:
+            ValueError: If the encoding is not supported.
+        """
+        if encoding not in SUPPORTED_ENCODINGS:
+            raise ValueError(f"Unsupported content encoding: {encoding}")
+        self.encoding = encoding
+        self.level = level
+        if encoding == "zstd":
+            import zstandard
+
+            self._zstd = zstandard.ZstdCompressor(level=level)
+
+    def compress(self, body: bytes) -> bytes:
+        """
+        Compresses a request body.
+
+        Args:
+            body (bytes): The uncompressed body.
+
+        Returns:
+            bytes: The compressed body.
+        """
+        if self.encoding == "zstd":
+            return self._zstd.compress(body)
+        # wbits 31 writes the gzip container around the deflate stream
+        compressor = zlib.compressobj(self.level, zlib.DEFLATED, 31)
+        return compressor.compress(body) + compressor.flush()
+
+    def headers(self, headers: dict) -> dict:
+        """
+        Adds the `Content-Encoding` header to request headers.
+
+        Args:
+            headers (dict): The request headers.
+
+        Returns:
+            dict: The headers including `Content-Encoding`.
+        """
+        return {**headers, "Content-Encoding": self.encoding}
+
+
+def create_compressor():
+    """
+    Creates the request compressor from environment variables.
+
+    - `HTTP_COMPRESSION`: "none" (default), "gzip" or "zstd".
+    - `HTTP_COMPRESSION_LEVEL`: The compression level (default 3; fast levels suit small bodies).
+
+    Returns:
+        RequestCompressor or None: The compressor, or None if compression is disabled.
+    """
+    encoding = os.getenv("HTTP_COMPRESSION", "none")
+    if encoding == "none":
+        return None
+    return RequestCompressor(encoding, level=int(os.getenv("HTTP_COMPRESSION_LEVEL", "3")))
+
+
+def decompress_gzip(body: bytes, max_size: int) -> bytes:
+    """
+    Decompresses a gzip body up to a maximum size.
+
+    Args:
+        body (bytes): The compressed body.
+        max_size (int): Maximum size of the decompressed body.
+
+    Returns:
+        bytes: The decompressed body, truncated to `max_size + 1` bytes if it is larger.
+
+    Raises:
+        zlib.error: If the body is not valid gzip or is truncated.
+    """
+    decompressor = zlib.decompressobj(wbits=31)
+    decompressed = decompressor.decompress(body, max_size + 1)
+    if len(decompressed) <= max_size and not decompressor.eof:
+        raise zlib.error("Incomplete gzip stream")
+    return decompressed
+
+
+def decompress_zstd(body: bytes, max_size: int) -> bytes:
+    """
+    Decompresses a zstd body of one or more frames up to a maximum size.
+
+    The `zstandard` package is imported lazily, so that it is only loaded once
+    the first zstd request arrives.
+
+    The stream reader stops silently at the end of truncated input, so a body
+    within the size limit is decoded a second time frame by frame to check
+    that every frame is complete. This pass is bounded by the size limit too.
+
+    Args:
+        body (bytes): The compressed body.
+        max_size (int): Maximum size of the decompressed body.
+
+    Returns:
+        bytes: The decompressed body, truncated to `max_size + 1` bytes if it is larger.
+
+    Raises:
+        zstandard.ZstdError: If the body is not valid zstd or is truncated.
+    """
+    import io
+    import zstandard
+
+    decompressor = zstandard.ZstdDecompressor()
+    chunks = []
+    size = 0
+    with decompressor.stream_reader(io.BytesIO(body), read_across_frames=True) as reader:
+        while size <= max_size:
+            chunk = reader.read(max_size + 1 - size)
+            if not chunk:
+                break
+            chunks.append(chunk)
+            size += len(chunk)
+    decompressed = b"".join(chunks)
+    if size > max_size:
+        return decompressed
+
+    remaining = body
+    while True:
+        frame = decompressor.decompressobj()
+        frame.decompress(remaining)
+        if not frame.eof:
+            raise zstandard.ZstdError("Incomplete zstd stream")
+        remaining = frame.unused_data
+        if not remaining:
+            return decompressed
+
+
+# Supported request content encodings
+DECOMPRESSORS = {
+    b"gzip": decompress_gzip,
+    b"zstd": decompress_zstd,
+}
@@ -0,0 +1,335 @@
+import json
+import os
+import signal
+import sys
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+from logger_config import setup_logger
+
+# Initialize logger
+logger = setup_logger()
+
+# Profiling is opt-in: the triggers and the admin route are only active if enabled
+PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "false").lower() == "true"
+
+# Sampling interval and upper bound of the profile duration in seconds
+PROFILE_INTERVAL = float(os.getenv("PROFILE_INTERVAL", "0.005"))
+PROFILE_MAX_SECONDS = float(os.getenv("PROFILE_MAX_SECONDS", "60"))
+
+# Output formats: collapsed stacks (flamegraph.pl, speedscope) and the speedscope file format
+PROFILE_FORMATS = {
+    "collapsed": ("text/plain", "txt"),
+    "speedscope": ("application/json", "speedscope.json"),
+}
+
+# Sampling modes: "cpu" only counts threads that used CPU since the previous sample,
+# "wall" counts every thread, including threads waiting on I/O or locks
+PROFILE_MODES = ("cpu", "wall")
+
+# Only one profile is captured at a time per process
+_capture_lock = threading.Lock()
+
+
+class ProfileInProgress(RuntimeError):
+    """
+    Raised if a profile is requested while another one is being captured.
+    """
+
+
+def _thread_cpu_time(ident):
+    """
+    Returns the CPU time consumed by a thread, if the platform supports it.
+
+    Args:
+        ident (int): The thread identifier (`threading.get_ident`).
+
+    Returns:
+        float or None: The CPU time in seconds, or None if unavailable.
+    """
+    try:
+        return time.clock_gettime(time.pthread_getcpuclockid(ident))
+    except (AttributeError, OSError, OverflowError):
+        return None
+
+
+def _frame_name(code):
+    """
+    Formats the frame of a code object as `function (file:line)`.
+    """
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def sample_stacks(seconds: float, interval: float = PROFILE_INTERVAL, mode: str = "cpu") -> Counter:
+    """
+    Samples the Python stacks of all threads of the process for a period of time.
+
+    The stacks are read with `sys._current_frames` from a separate thread, so that
+    the profiled code is not instrumented and the overhead is bounded by the interval.
+    In `cpu` mode, threads whose CPU time did not advance since the previous sample
+    are skipped. Platforms without per-thread CPU clocks fall back to `wall` mode.
+
+    Args:
+        seconds (float): Duration of the profile.
+        interval (float): Time between two samples.
+        mode (str): "cpu" or "wall".
+
+    Returns:
+        Counter: Number of samples per stack, a tuple of frame names from the thread
+            name (root) to the innermost frame.
+    """
+    own_ident = threading.get_ident()
+    cpu_times = {}
+    samples = Counter()
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        thread_names = {thread.ident: thread.name for thread in threading.enumerate()}
+        for ident, frame in sys._current_frames().items():
+            if ident == own_ident:
+                continue
+            if mode == "cpu":
+                cpu_time = _thread_cpu_time(ident)
+                previous = cpu_times.get(ident)
+                cpu_times[ident] = cpu_time
+                if cpu_time is not None and (previous is None or cpu_time <= previous):
+                    continue
+
+            stack = []
+            while frame is not None:
+                stack.append(_frame_name(frame.f_code))
+                frame = frame.f_back
+            stack.append(thread_names.get(ident, f"thread-{ident}"))
+            samples[tuple(reversed(stack))] += 1
+        time.sleep(interval)
+    return samples
+
+
+def to_collapsed(samples: Counter) -> str:
+    """
+    Formats samples as collapsed stacks (`frame;frame;frame count` per line).
+
+    Args:
+        samples (Counter): Samples per stack (see `sample_stacks`).
+
+    Returns:
+        str: The collapsed stacks.
+    """
+    return "".join(
+        f"{';'.join(frame.replace(';', ':') for frame in stack)} {count}\n"
+        for stack, count in samples.most_common()
+    )
+
+
+def to_speedscope(samples: Counter, interval: float, name: str) -> str:
+    """
+    Formats samples as a sampled profile in the speedscope file format.
+
+    Args:
+        samples (Counter): Samples per stack (see `sample_stacks`).
+        interval (float): The sampling interval, used as the weight of a sample.
+        name (str): The name of the profile.
+
+    Returns:
+        str: The speedscope JSON document.
+    """
+    frame_indexes = {}
+    stacks, weights = [], []
+    for stack, count in samples.most_common():
+        stacks.append([frame_indexes.setdefault(frame, len(frame_indexes)) for frame in stack])
+        weights.append(count * interval)
+    return json.dumps(
+        {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "name": name,
+            "exporter": "profiling.py",
+            "shared": {"frames": [{"name": frame} for frame in frame_indexes]},
+            "profiles": [
+                {
+                    "type": "sampled",
+                    "name": name,
+                    "unit": "seconds",
+                    "startValue": 0,
+                    "endValue": sum(weights),
+                    "samples": stacks,
+                    "weights": weights,
+                }
+            ],
+        }
+    )
+
+
+def capture_profile(seconds: float, fmt: str = "speedscope", mode: str = "cpu", name: str = "profile"):
+    """
+    Captures a time-bounded sampling profile of the current process.
+
+    Blocks for the duration of the profile.
+
+    Args:
+        seconds (float): Duration of the profile (at most `PROFILE_MAX_SECONDS`).
+        fmt (str): "collapsed" or "speedscope".
+        mode (str): "cpu" or "wall" (see `sample_stacks`).
+        name (str): The name of the profile.
+
+    Returns:
+        tuple[str, str]: The media type and content of the profile.
+
+    Raises:
+        ValueError: If the duration, format or mode is invalid.
+        ProfileInProgress: If another profile is being captured.
+    """
+    if not 0 < seconds <= PROFILE_MAX_SECONDS:
+        raise ValueError(f"Profile duration must be in (0, {PROFILE_MAX_SECONDS}] seconds")
+    if fmt not in PROFILE_FORMATS:
+        raise ValueError(f"Unsupported profile format: {fmt}")
+    if mode not in PROFILE_MODES:
+        raise ValueError(f"Unsupported profile mode: {mode}")
+    if not _capture_lock.acquire(blocking=False):
+        raise ProfileInProgress("A profile is already being captured")
+
+    try:
+        logger.info(f"Capturing {mode} profile for {seconds} seconds")
+        samples = sample_stacks(seconds, PROFILE_INTERVAL, mode)
+    finally:
+        _capture_lock.release()
+
+    media_type, _ = PROFILE_FORMATS[fmt]
+    if fmt == "collapsed":
+        return media_type, to_collapsed(samples)
+    return media_type, to_speedscope(samples, PROFILE_INTERVAL, name)
+
+
+def profile_filename(service_name: str, fmt: str) -> str:
+    """
+    Builds the file name of a profile, e.g. `pos-service-12-20241115T100000.speedscope.json`.
+
+    Args:
+        service_name (str): The name of the profiled service.
+        fmt (str): The profile format.
+
+    Returns:
+        str: The file name.
+    """
+    _, extension = PROFILE_FORMATS[fmt]
+    return f"{service_name}-{os.getpid()}-{time.strftime('%Y%m%dT%H%M%S')}.{extension}"
+
+
+def install_signal_trigger(service_name: str, signum=signal.SIGUSR1):
+    """
+    Captures a profile in the background whenever the process receives a signal.
+
+    The profile runs for `PROFILE_SIGNAL_SECONDS` (default 30) in the `PROFILE_FORMAT`
+    (default "speedscope") and `PROFILE_MODE` (default "cpu"), and is written to
+    `PROFILE_OUTPUT_DIR` (default /tmp). Must be called from the main thread.
+
+    Args:
+        service_name (str): The name of the profiled service.
+        signum (int): The signal that triggers a profile.
+    """
+    seconds = float(os.getenv("PROFILE_SIGNAL_SECONDS", "30"))
+    fmt = os.getenv("PROFILE_FORMAT", "speedscope")
+    mode = os.getenv("PROFILE_MODE", "cpu")
+    output_dir = os.getenv("PROFILE_OUTPUT_DIR", "/tmp")
+
+    def write_profile():
+        try:
+            _, content = capture_profile(seconds, fmt, mode, service_name)
+        except (ValueError, ProfileInProgress) as e:
+            logger.warning(f"Profile not captured: {e}")
+            return
+        path = os.path.join(output_dir, profile_filename(service_name, fmt))
+        with open(path, "w") as file:
+            file.write(content)
+        logger.info(f"Profile written to {path}")
+
+    def handle_signal(signum, frame):
+        threading.Thread(target=write_profile, name="profiler", daemon=True).start()
+
+    signal.signal(signum, handle_signal)
+    logger.info(f"Profiling on signal {signal.Signals(signum).name} enabled")
+
+
+class ProfileRequestHandler(BaseHTTPRequestHandler):
+    """
+    Serves `GET /profile?seconds=10&format=speedscope&mode=cpu` with a profile of the process.
+    """
+
+    service_name = "profile"
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path != "/profile":
+            self.send_error(404)
+            return
+        query = parse_qs(url.query)
+        try:
+            fmt = query.get("format", ["speedscope"])[0]
+            media_type, content = capture_profile(
+                float(query.get("seconds", ["10"])[0]),
+                fmt,
+                query.get("mode", ["cpu"])[0],
+                self.service_name,
+            )
+        except ValueError as e:
+            self.send_error(400, str(e))
+            return
+        except ProfileInProgress as e:
+            self.send_error(409, str(e))
+            return
+
+        body = content.encode()
+        self.send_response(200)
+        self.send_header("Content-Type", media_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header(
+            "Content-Disposition",
+            f'attachment; filename="{profile_filename(self.service_name, fmt)}"',
+        )
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        logger.info(f"Profile request: {format % args}")
+
+
+def start_profile_server(service_name: str, port: int):
+    """
+    Starts an HTTP server in a background thread that serves profiles on `/profile`.
+
+    The server is unauthenticated and must only be reachable from the internal network.
+
+    Args:
+        service_name (str): The name of the profiled service.
+        port (int): The port to listen on.
+
+    Returns:
+        ThreadingHTTPServer: The running server.
+    """
+    handler = type("ServiceProfileRequestHandler", (ProfileRequestHandler,), {"service_name": service_name})
+    server = ThreadingHTTPServer(("0.0.0.0", port), handler)
+    threading.Thread(target=server.serve_forever, name="profile-server", daemon=True).start()
+    logger.info(f"Profile server listening on port {port}")
+    return server
+
+
+def enable_profiling(service_name: str):
+    """
+    Enables the profiling triggers of a worker process if `PROFILING_ENABLED` is set.
+
+    - Installs the `SIGUSR1` trigger (see `install_signal_trigger`).
+    - Starts the HTTP trigger on `PROFILE_PORT`, if set (see `start_profile_server`).
+
+    Args:
+        service_name (str): The name of the profiled service.
+    """
+    if not PROFILING_ENABLED:
+        return
+    try:
+        install_signal_trigger(service_name)
+    except ValueError as e:
+        # Signal handlers can only be installed from the main thread
+        logger.warning(f"Profiling on signal not enabled: {e}")
+    port = os.getenv("PROFILE_PORT")
+    if port:
+        start_profile_server(service_name, int(port))
@@ -0,0 +1,178 @@
+import os
+import threading
+import time
+from opentelemetry import trace
+from opentelemetry.sdk.trace import ReadableSpan
+from opentelemetry.sdk.trace.export import BatchSpanProcessor
+from opentelemetry.sdk.trace.sampling import (
+    Decision,
+    Sampler,
+    SamplingResult,
+    TraceIdRatioBased,
+)
+from opentelemetry.trace import SpanContext, StatusCode, TraceFlags
+
+# Span attribute that forces a root span (and so its whole trace) to be sampled, and a
+# span of an unsampled trace to be exported, e.g. for failed or corrected transactions
+FORCE_SAMPLE_ATTRIBUTE = "sampling.priority"
+
+
+class RateLimitingSampler(Sampler):
+    """
+    Samples at most `max_per_second` root traces per second using a token bucket.
+
+    Args:
+        max_per_second (float): Maximum number of sampled root traces per second.
+    """
+
+    def __init__(self, max_per_second: float):
+        self._max_per_second = max_per_second
+        self._tokens = max_per_second
+        self._last_refill = time.monotonic()
+        self._lock = threading.Lock()
+
+    def should_sample(
+        self, parent_context, trace_id, name, kind=None, attributes=None, links=None, trace_state=None
+    ):
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(
+                self._max_per_second,
+                self._tokens + (now - self._last_refill) * self._max_per_second,
+            )
+            self._last_refill = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return SamplingResult(Decision.RECORD_AND_SAMPLE, attributes)
+        return SamplingResult(Decision.DROP)
+
+    def get_description(self):
+        return f"RateLimitingSampler{{{self._max_per_second}}}"
+
+
+class PrioritySampler(Sampler):
+    """
+    A parent-based sampler with a ratio and optional rate limit for root spans.
+
+    - Child spans follow the sampling decision of their (local or remote) parent,
+      so that traces are sampled as a whole and never exported without their root.
+    - Root spans carrying `FORCE_SAMPLE_ATTRIBUTE` are always sampled. A child span
+      cannot change the decision of its trace.
+    - Other root spans are sampled by trace ID ratio and, if configured, a rate limit.
+    - Unsampled spans are recorded but not exported when `keep_errors` is set (the
+      default), so that `ErrorSpanProcessor` can still export those that end with an
+      error or carry `FORCE_SAMPLE_ATTRIBUTE`. This records every span, so the CPU
+      cost of unsampled traces is close to that of sampled ones; without it,
+      unsampled spans are not recorded at all.
+
+    Args:
+        ratio (float): Fraction of root traces to sample (0.0 - 1.0).
+        max_per_second (float): Maximum sampled root traces per second (0 disables the limit).
+        keep_errors (bool): Whether unsampled spans are recorded to keep errors.
+    """
+
+    def __init__(self, ratio: float, max_per_second: float = 0, keep_errors: bool = True):
+        self._ratio_sampler = TraceIdRatioBased(ratio)
+        self._rate_sampler = RateLimitingSampler(max_per_second) if max_per_second > 0 else None
+        self._not_sampled = Decision.RECORD_ONLY if keep_errors else Decision.DROP
+
+    def should_sample(
+        self, parent_context, trace_id, name, kind=None, attributes=None, links=None, trace_state=None
+    ):
+        parent_span_context = trace.get_current_span(parent_context).get_span_context()
+        parent_trace_state = parent_span_context.trace_state if parent_span_context.is_valid else None
+
+        if parent_span_context.is_valid:
+            sampled = parent_span_context.trace_flags.sampled
+        elif attributes and attributes.get(FORCE_SAMPLE_ATTRIBUTE):
+            sampled = True
+        else:
+            sampled = self._ratio_sampler.should_sample(
+                parent_context, trace_id, name
+            ).decision.is_sampled() and (
+                self._rate_sampler is None
+                or self._rate_sampler.should_sample(parent_context, trace_id, name).decision.is_sampled()
+            )
+
+        if sampled:
+            return SamplingResult(Decision.RECORD_AND_SAMPLE, attributes, parent_trace_state)
+        return SamplingResult(self._not_sampled, attributes, parent_trace_state)
+
+    def get_description(self):
+        return (
+            f"PrioritySampler{{root={self._ratio_sampler.get_description()},"
+            f"rate_limit={self._rate_sampler.get_description() if self._rate_sampler else None}}}"
+        )
+
+
+class ErrorSpanProcessor(BatchSpanProcessor):
+    """
+    A batch span processor that also exports unsampled spans which ended with an error
+    or carry `FORCE_SAMPLE_ATTRIBUTE`.
+
+    Works together with `PrioritySampler(keep_errors=True)`, which records
+    unsampled spans without exporting them. The exported spans arrive without the
+    rest of their trace; the collector's tail sampling keeps them (`errors` and
+    `forced` policies).
+    """
+
+    def on_end(self, span: ReadableSpan):
+        if not span.context.trace_flags.sampled:
+            if span.status.status_code is not StatusCode.ERROR and not span.attributes.get(
+                FORCE_SAMPLE_ATTRIBUTE
+            ):
+                return
+            span = _as_sampled(span)
+        super().on_end(span)
+
+
+def _as_sampled(span: ReadableSpan) -> ReadableSpan:
+    """
+    Returns a copy of a recorded span with the sampled trace flag set.
+
+    Args:
+        span (ReadableSpan): The recorded, unsampled span.
+
+    Returns:
+        ReadableSpan: A copy of the span that the batch processor will export.
+    """
+    context = SpanContext(
+        trace_id=span.context.trace_id,
+        span_id=span.context.span_id,
+        is_remote=span.context.is_remote,
+        trace_flags=TraceFlags(TraceFlags.SAMPLED),
+        trace_state=span.context.trace_state,
+    )
+    return ReadableSpan(
+        name=span.name,
+        context=context,
+        parent=span.parent,
+        resource=span.resource,
+        attributes=span.attributes,
+        events=span.events,
+        links=span.links,
+        kind=span.kind,
+        status=span.status,
+        start_time=span.start_time,
+        end_time=span.end_time,
+        instrumentation_scope=span.instrumentation_scope,
+    )
+
+
+def create_sampler():
+    """
+    Creates the trace sampler from environment variables.
+
+    - `TRACE_SAMPLING_RATIO`: Fraction of root traces to sample (default 1.0).
+    - `TRACE_SAMPLING_RATE_LIMIT`: Maximum sampled root traces per second (default 0, disabled).
+    - `TRACE_SAMPLING_KEEP_ERRORS`: Record unsampled spans to export those that end
+      with an error or are forced (default true, see `PrioritySampler`).
+
+    Returns:
+        PrioritySampler: The configured sampler.
+    """
+    return PrioritySampler(
+        ratio=float(os.getenv("TRACE_SAMPLING_RATIO", "1.0")),
+        max_per_second=float(os.getenv("TRACE_SAMPLING_RATE_LIMIT", "0")),
+        keep_errors=os.getenv("TRACE_SAMPLING_KEEP_ERRORS", "true").lower() == "true",
+    )
@@ -42,7 +42,7 @@ done
 # URLs for Solace broker's health check endpoints
 SOLACE_BROKER_URL_GUARANTEED="$BROKER_PROTOCOL://$BROKER_HOST:$BROKER_PORT/health-check/guaranteed-active"
 SOLACE_BROKER_URL_DIRECT="$BROKER_PROTOCOL://$BROKER_HOST:$BROKER_PORT/health-check/direct-active"
-VALIDATION_SERVICE_URL="$API_PROTOCOL://$API_HOST:$API_PORT/validation-service/api/v1/health"
+VALIDATION_SERVICE_URL="$API_PROTOCOL://$API_HOST:$API_PORT/validation-service/api/v1/ready"
 
 # Retry mechanism for health checks
 MAX_ATTEMPTS=10          # Maximum number of attempts to verify health
@@ -1,16 +1,24 @@
-import json
 import requests
 import time
-from utils import generate_transaction
-from prometheus_client import start_http_server, Counter, Histogram
+from prometheus_client import start_http_server, Counter, Gauge, Histogram
 from opentelemetry import trace
+from opentelemetry.trace import StatusCode
 from opentelemetry.instrumentation.requests import RequestsInstrumentor
 from opentelemetry.sdk.trace import TracerProvider
 from opentelemetry.sdk.resources import Resource
-from opentelemetry.sdk.trace.export import BatchSpanProcessor
 from opentelemetry.exporter.otlp.proto.grpc.trace_exporter import OTLPSpanExporter
 from logger_config import setup_logger
+from common.tracing_config import create_sampler, ErrorSpanProcessor
+from rate_control import create_rate_controller
+from http_client import HTTP_VERSION, STORE_AFFINITY, StoreAffinity, create_http_session
+from common.compression import create_compressor
+from corpus import replay_corpus
+from traffic_profiles import create_traffic_profile, shaped_transactions
+from common.profiling import enable_profiling
 import os
+import queue
+import threading
+import zlib
 
 # Initialize logger
 logger = setup_logger()
@@ -18,15 +26,81 @@ logger = setup_logger()
 # Prometheus Metrics
 REQUEST_COUNT = Counter("request_count", "Number of requests sent", ["status"])
 REQUEST_LATENCY = Histogram("request_latency_seconds", "Latency of requests in seconds")
+SEND_RATE = Gauge("send_rate", "Current target send rate in transactions per second (rate-controlled mode)")
+RESENT_REQUESTS = Counter("resent_requests", "Number of transactions sent again after a 429/503 response")
+
+# Sender mode: "unpaced" sends as fast as possible, "aimd" uses closed-loop rate control
+SENDER_MODE = os.getenv("SENDER_MODE", "unpaced")
+
+# Number of send lanes with one request in flight each; a store always uses the same lane
+SEND_CONCURRENCY = int(os.getenv("SEND_CONCURRENCY", "1"))
+
+# Maximum number of attempts to send a transaction rejected with 429/503
+SEND_MAX_ATTEMPTS = int(os.getenv("SEND_MAX_ATTEMPTS", "5"))
+
+# Transaction source: "generate" creates transactions on the fly, "replay" streams a pre-generated corpus
+TRANSACTION_SOURCE = os.getenv("TRANSACTION_SOURCE", "generate")
+
+
+def parse_retry_after(response):
+    """
+    Extracts the `Retry-After` delay of a 429/503 response.
+
+    Args:
+        response (requests.Response or httpx.Response): The HTTP response.
+
+    Returns:
+        float or None: The delay in seconds, or None if the server did not ask to back off.
+    """
+    if response is None or response.status_code not in (429, 503):
+        return None
+    try:
+        return float(response.headers.get("Retry-After", 1))
+    except ValueError:
+        return 1.0
+
+
+def generate_transactions():
+    """
+    Generates random POS transactions on the fly.
+
+    Transactions are generated vectorized and shaped by the replica's traffic profile
+    (see `create_traffic_profile`). Unpaced profiles generate batches of
+    `GENERATOR_BATCH_SIZE` (default 1000) transactions.
+
+    Returns:
+        Iterator[tuple[bytes, dict]]: Serialized transactions with their span attributes.
+    """
+    profile = create_traffic_profile()
+    logger.info(f"Using traffic profile {'+'.join(sorted(profile.components))}")
+    return shaped_transactions(profile, batch_size=int(os.getenv("GENERATOR_BATCH_SIZE", "1000")))
+
+
+def transaction_source():
+    """
+    Creates the transaction source configured via `TRANSACTION_SOURCE`.
+
+    - `generate` (default): Generates random transactions on the fly, shaped by `TRAFFIC_PROFILE`.
+    - `replay`: Streams the pre-serialized transactions of the corpus at `CORPUS_PATH`,
+      rewriting timestamps according to `CORPUS_TIMESTAMPS` (`keep`, `now` or `shift`).
+
+    Returns:
+        Iterator[tuple[bytes, dict]]: Serialized transactions with their span attributes.
+    """
+    if TRANSACTION_SOURCE == "replay":
+        path = os.getenv("CORPUS_PATH", "corpus/transactions.ndjson")
+        logger.info(f"Replaying transaction corpus {path}")
+        return replay_corpus(path, timestamps=os.getenv("CORPUS_TIMESTAMPS", "shift"))
+    return generate_transactions()
 
 
 def init_tracing():
     """
     Initializes OpenTelemetry tracing with an OTLP exporter.
 
-    - Sets up a tracer provider with resource attributes.
+    - Sets up a tracer provider with resource attributes and the shared sampler.
     - Configures the OTLP exporter for sending traces to a collector.
-    - Instruments the `requests` library for automatic tracing.
+    - Instruments the `requests` library (and `httpx` for HTTP/2) for automatic tracing.
 
     Raises:
         Exception: If tracing initialization fails.
@@ -34,13 +108,13 @@ def init_tracing():
     resource = Resource.create(attributes={"service.name": "pos-service"})
 
     # Set up the tracer provider
-    trace.set_tracer_provider(TracerProvider(resource=resource))
+    trace.set_tracer_provider(TracerProvider(resource=resource, sampler=create_sampler()))
 
     # Configure the OTLP exporter
     otlp_exporter = OTLPSpanExporter(
         endpoint=f"{os.getenv('OTEL_COLLECTOR_PROTOCOL')}://{os.getenv('OTEL_COLLECTOR_HOST')}:{os.getenv('OTEL_COLLECTOR_PORT')}", insecure=True
     )
-    span_processor = BatchSpanProcessor(
+    span_processor = ErrorSpanProcessor(
         otlp_exporter,
         max_queue_size=1000,
         max_export_batch_size=500,
@@ -48,16 +122,136 @@ def init_tracing():
     )
     trace.get_tracer_provider().add_span_processor(span_processor)
 
-    # Instrument the `requests` library
+    # Instrument the `requests` library, or `httpx` for HTTP/2
     RequestsInstrumentor().instrument()
+    if HTTP_VERSION == "h2c":
+        from opentelemetry.instrumentation.httpx import HTTPXClientInstrumentor
+
+        HTTPXClientInstrumentor().instrument()
+
+
+def send_transaction(tracer, session, url, headers, body, span_attributes, rate_controller, affinity):
+    """
+    Sends a transaction to the validation service, resending it if it was rejected.
+
+    A transaction rejected with 429/503 (e.g. by admission control or a full publish
+    queue) was not accepted, so it is sent again after the `Retry-After` delay, up to
+    `SEND_MAX_ATTEMPTS` attempts in total. Other errors are not retried.
+
+    Args:
+        tracer (Tracer): The tracer of the sender.
+        session (requests.Session or H2cSession): The HTTP session (see `create_http_session`).
+        url (str): The URL of the validation endpoint.
+        headers (dict): The request headers.
+        body (bytes): The (compressed) serialized transaction.
+        span_attributes (dict): The span attributes of the transaction.
+        rate_controller (AimdRateController): The rate controller, or None if unpaced.
+        affinity (StoreAffinity): The store affinity, or None if disabled.
+    """
+    store_id = span_attributes["transaction.store_id"]
+    for attempt in range(1, SEND_MAX_ATTEMPTS + 1):
+        # Wait for the next send slot in rate-controlled mode
+        if rate_controller:
+            rate_controller.wait()
+
+        # Create a tracing span for the transaction (the attributes are passed to the
+        # sampler, so that failed payments sample the whole trace)
+        with tracer.start_as_current_span("send_transaction", attributes=span_attributes) as span:
+            span.set_attribute("http.resend_count", attempt - 1)
+            start_time = time.time()
+            error = True
+            retry_after = None
+            try:
+                # Send transaction via HTTP POST
+                response = session.post(url, headers=headers, data=body)
+                response.raise_for_status()
+                if affinity:
+                    affinity.update(store_id, response)
+                logger.info(
+                    f"Transaction sent successfully: {span_attributes['transaction.id']}"
+                )
+                span.set_status(StatusCode.OK)
+                REQUEST_COUNT.labels(status="success").inc()
+                error = False
+            except requests.HTTPError as e:
+                logger.error(f"HTTP error: {e}")
+                retry_after = parse_retry_after(e.response)
+                span.record_exception(e)
+                span.set_status(StatusCode.ERROR)
+                REQUEST_COUNT.labels(status="http_error").inc()
+            except requests.RequestException as e:
+                logger.error(f"Request error: {e}")
+                span.record_exception(e)
+                span.set_status(StatusCode.ERROR)
+                REQUEST_COUNT.labels(status="request_error").inc()
+            finally:
+                latency = time.time() - start_time
+                REQUEST_LATENCY.observe(latency)
+                if rate_controller:
+                    rate_controller.record(latency, error, retry_after)
+                    SEND_RATE.set(rate_controller.rate)
+
+        if retry_after is None:
+            return
+        if attempt < SEND_MAX_ATTEMPTS:
+            RESENT_REQUESTS.inc()
+            # The rate controller already pauses for the Retry-After delay
+            if not rate_controller:
+                time.sleep(retry_after)
+    logger.error(
+        f"Giving up on transaction {span_attributes['transaction.id']} after {SEND_MAX_ATTEMPTS} attempts"
+    )
+    REQUEST_COUNT.labels(status="rejected").inc()
+
+
+def run_send_lane(lane, tracer, session, url, headers, rate_controller, affinity):
+    """
+    Sends the transactions of a send lane one after another until it receives None.
+
+    Args:
+        lane (queue.Queue): The lane's queue of (body, span attributes) pairs.
+        tracer (Tracer): The tracer of the sender.
+        session (requests.Session or H2cSession): The HTTP session of the lane.
+        url (str): The URL of the validation endpoint.
+        headers (dict): The common request headers.
+        rate_controller (AimdRateController): The shared rate controller, or None if unpaced.
+        affinity (StoreAffinity): The store affinity, or None if disabled.
+    """
+    while True:
+        item = lane.get()
+        if item is None:
+            return
+        body, span_attributes = item
+        store_id = span_attributes["transaction.store_id"]
+        send_transaction(
+            tracer,
+            session,
+            url,
+            affinity.headers(headers, store_id) if affinity else headers,
+            body,
+            span_attributes,
+            rate_controller,
+            affinity,
+        )
 
 
 def send_1_million_messages():
     """
     Simulates sending POS transactions to a validation service.
 
-    - Generates POS transactions.
-    - Sends each transaction to the validation service via HTTP POST.
+    - Generates POS transactions or replays a pre-generated corpus (see `transaction_source`).
+    - Sends each transaction to the validation service via HTTP POST over a persistent
+      HTTP/1.1 connection or multiplexed HTTP/2 (see `create_http_session`),
+      optionally gzip/zstd-compressed (see `create_compressor`).
+    - Sends on `SEND_CONCURRENCY` lanes in parallel, each with one request in flight.
+      The transactions of a store always use the same lane, which keeps their order.
+      HTTP/1.1 lanes have a connection each, HTTP/2 lanes share the multiplexed
+      connections of one session.
+    - With `STORE_AFFINITY`, sends the store ID header and the store's sticky cookie, so that
+      the transactions of a store are validated by the same replica (see `StoreAffinity`).
+    - In the `aimd` sender mode, paces the requests with a closed-loop rate controller
+      that reacts to latency, errors and `Retry-After` headers.
+    - Sends transactions rejected with 429/503 again after `Retry-After` (see `send_transaction`).
     - Tracks performance and request metrics using Prometheus.
     - Uses OpenTelemetry for distributed tracing.
 
@@ -66,53 +260,49 @@ def send_1_million_messages():
     """
     count = 0
     tracer = trace.get_tracer(__name__)
+    rate_controller = create_rate_controller() if SENDER_MODE == "aimd" else None
+    transactions = transaction_source()
+    auth = (os.getenv("API_USERNAME"), os.getenv("API_PASSWORD"))
+    shared_session = create_http_session(auth) if HTTP_VERSION == "h2c" else None
+    compressor = create_compressor()
+    headers = {"Content-Type": "application/json"}
+    if compressor:
+        headers = compressor.headers(headers)
+    affinity = StoreAffinity() if STORE_AFFINITY else None
+    url = f"{os.getenv('API_PROTOCOL')}://{os.getenv('API_HOST')}:{os.getenv('API_PORT')}/validation-service/api/v1/pos/validate_transaction"
+
+    lanes = [queue.Queue(maxsize=100) for _ in range(SEND_CONCURRENCY)]
+    threads = [
+        threading.Thread(
+            target=run_send_lane,
+            args=(lane, tracer, shared_session or create_http_session(auth), url, headers),
+            kwargs={"rate_controller": rate_controller, "affinity": affinity},
+            name=f"send-lane-{index}",
+            daemon=True,
+        )
+        for index, lane in enumerate(lanes)
+    ]
+    for thread in threads:
+        thread.start()
 
     try:
-        while count < 200000: # 1 million transactions in total (5 replicas)
-            # Generate a transaction
-            transaction = generate_transaction()
-            transaction_json = json.dumps(transaction)
-            logger.info(f"Sending transaction: {transaction_json}")
-
-            # Create a tracing span for the transaction
-            with tracer.start_as_current_span("send_transaction") as span:
-                span.set_attribute("transaction.id", transaction["transaction_id"])
-                span.set_attribute("transaction.store_id", transaction["store_id"])
-                span.set_attribute("transaction.total_amount", transaction["total_amount"])
-
-                start_time = time.time()
-                try:
-                    # Send transaction via HTTP POST
-                    response = requests.post(
-                        f"{os.getenv('API_PROTOCOL')}://{os.getenv('API_HOST')}:{os.getenv('API_PORT')}/validation-service/api/v1/pos/validate_transaction",
-                        headers={"Content-Type": "application/json"},
-                        data=transaction_json,
-                        auth=(os.getenv("API_USERNAME"), os.getenv("API_PASSWORD")),
-                    )
-                    response.raise_for_status()
-                    logger.info(
-                        f"Transaction sent successfully: {transaction['transaction_id']}"
-                    )
-                    span.set_status("OK")
-                    REQUEST_COUNT.labels(status="success").inc()
-                except requests.HTTPError as e:
-                    logger.error(f"HTTP error: {e}")
-                    span.record_exception(e)
-                    span.set_status("ERROR")
-                    REQUEST_COUNT.labels(status="http_error").inc()
-                except requests.RequestException as e:
-                    logger.error(f"Request error: {e}")
-                    span.record_exception(e)
-                    span.set_status("ERROR")
-                    REQUEST_COUNT.labels(status="request_error").inc()
-                finally:
-                    latency = time.time() - start_time
-                    REQUEST_LATENCY.observe(latency)
+        for transaction_json, span_attributes in transactions:
+            if count >= 200000: # 1 million transactions in total (5 replicas)
+                break
+            logger.debug("Sending transaction: %s", transaction_json)
+            store_id = span_attributes["transaction.store_id"]
+            body = compressor.compress(transaction_json) if compressor else transaction_json
+            lanes[zlib.crc32(store_id.encode()) % len(lanes)].put((body, span_attributes))
 
             count += 1
             if count % 1000 == 0:
                 logger.info(f"Sent {count} messages")
 
+        # Wait for the lanes to send their remaining transactions
+        for lane in lanes:
+            lane.put(None)
+        for thread in threads:
+            thread.join()
     except KeyboardInterrupt:
         logger.warning("Message streaming interrupted.")
     finally:
@@ -124,9 +314,11 @@ if __name__ == "__main__":
     Main entry point for the POS service simulation script.
 
     - Starts Prometheus metrics server on port 8000.
+    - Enables the profiling triggers, if configured.
     - Initializes tracing.
     - Sends simulated transactions to the validation service.
     """
     start_http_server(8000)
+    enable_profiling("pos-service")
     init_tracing()
     send_1_million_messages()
@@ -0,0 +1,197 @@
+import argparse
+import json
+import mmap
+import random
+from datetime import datetime, timedelta, timezone
+from common.tracing_config import FORCE_SAMPLE_ATTRIBUTE
+from utils import generate_transaction
+
+# Fixed-width timestamp format of the corpus (always with microseconds), so that
+# timestamps can be rewritten in place without parsing the transaction
+TIMESTAMP_FORMAT = "%Y-%m-%dT%H:%M:%S.%f"
+TIMESTAMP_KEY = b'"timestamp":"'
+TRANSACTION_ID_KEY = b'"transaction_id":"'
+STORE_ID_KEY = b'"store_id":"'
+PAYMENT_FAILED = b'"payment_status":"failure"'
+
+
+def id_weights(count, distribution):
+    """
+    Computes the sampling weights of `count` IDs for a distribution.
+
+    Args:
+        count (int): Number of IDs.
+        distribution (str): "uniform" or "zipf:<exponent>", e.g. "zipf:1.1".
+
+    Returns:
+        list[float]: The weight of each ID (1-based order).
+
+    Raises:
+        ValueError: If the distribution is unknown.
+    """
+    if distribution == "uniform":
+        return [1.0] * count
+    if distribution.startswith("zipf:"):
+        exponent = float(distribution.split(":", 1)[1])
+        return [1 / rank**exponent for rank in range(1, count + 1)]
+    raise ValueError(f"Unknown distribution: {distribution}")
+
+
+def build_corpus(
+    path,
+    count,
+    stores=10,
+    store_distribution="uniform",
+    cashiers=8,
+    cashier_distribution="uniform",
+    customers=500,
+    customer_distribution="uniform",
+    events_per_second=1000,
+    start=None,
+    seed=None,
+):
+    """
+    Pre-generates transactions into an NDJSON corpus file.
+
+    - One compact, pre-serialized transaction per line.
+    - Store, cashier and customer IDs follow the configured distributions.
+    - Timestamps advance by `1 / events_per_second` from `start` in a fixed-width format.
+
+    Args:
+        path (str): Output file path.
+        count (int): Number of transactions.
+        stores (int): Number of stores (STORE_1 to STORE_<stores>).
+        store_distribution (str): Distribution of store IDs ("uniform" or "zipf:<exponent>").
+        cashiers (int): Number of cashiers per store.
+        cashier_distribution (str): Distribution of cashier IDs.
+        customers (int): Number of customers.
+        customer_distribution (str): Distribution of customer IDs.
+        events_per_second (float): Event-time rate of the corpus.
+        start (datetime): Timestamp of the first transaction (default: now in UTC).
+        seed (int): Optional random seed for reproducible corpora (together with `start`).
+    """
+    if seed is not None:
+        random.seed(seed)
+    start = start or datetime.now(timezone.utc).replace(tzinfo=None)
+    store_ids = [f"STORE_{i}" for i in range(1, stores + 1)]
+    cashier_ids = [f"CASHIER_{i}" for i in range(1, cashiers + 1)]
+    customer_ids = [f"CUSTOMER_{i}" for i in range(1, customers + 1)]
+    store_weights = id_weights(stores, store_distribution)
+    cashier_weights = id_weights(cashiers, cashier_distribution)
+    customer_weights = id_weights(customers, customer_distribution)
+
+    with open(path, "wb", buffering=1024 * 1024) as f:
+        for index in range(count):
+            timestamp = start + timedelta(seconds=index / events_per_second)
+            transaction = generate_transaction(
+                store_id=random.choices(store_ids, store_weights)[0],
+                cashier_id=random.choices(cashier_ids, cashier_weights)[0],
+                customer_id=random.choices(customer_ids, customer_weights)[0],
+                timestamp=timestamp.strftime(TIMESTAMP_FORMAT) + "Z",
+                now=start,
+            )
+            f.write(json.dumps(transaction, separators=(",", ":")).encode())
+            f.write(b"\n")
+
+
+def _field(line, key):
+    """
+    Returns the string value following `key` in a serialized transaction.
+
+    Args:
+        line (bytes): The serialized transaction.
+        key (bytes): The JSON key including the opening quote of the value.
+
+    Returns:
+        tuple[int, int]: The start and end offset of the value.
+    """
+    start = line.find(key) + len(key)
+    return start, line.find(b'"', start)
+
+
+def replay_corpus(path, timestamps="keep"):
+    """
+    Streams the pre-serialized transactions of a corpus file via a memory map.
+
+    Args:
+        path (str): The corpus file path.
+        timestamps (str): Timestamp rewriting mode:
+            - "keep": Send the corpus timestamps unchanged.
+            - "now": Replace each timestamp with the current time.
+            - "shift": Shift all timestamps so that the first one is the replay start time,
+              keeping the original spacing.
+
+    Yields:
+        tuple[bytes, dict]: The transaction payload and its span attributes
+            (`transaction.id`, `transaction.store_id`, and `FORCE_SAMPLE_ATTRIBUTE`
+            for failed payments).
+    """
+    offset = None
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        position = 0
+        size = mm.size()
+        while position < size:
+            end = mm.find(b"\n", position)
+            if end == -1:
+                end = size
+            line = mm[position:end]
+            position = end + 1
+            if not line:
+                continue
+
+            if timestamps != "keep":
+                start, stop = _field(line, TIMESTAMP_KEY)
+                now = datetime.now(timezone.utc).replace(tzinfo=None)
+                if timestamps == "now":
+                    timestamp = now
+                else:
+                    original = datetime.strptime(line[start:stop - 1].decode(), TIMESTAMP_FORMAT)
+                    if offset is None:
+                        offset = now - original
+                    timestamp = original + offset
+                line = line[:start] + timestamp.strftime(TIMESTAMP_FORMAT).encode() + line[stop - 1:]
+
+            id_start, id_stop = _field(line, TRANSACTION_ID_KEY)
+            store_start, store_stop = _field(line, STORE_ID_KEY)
+            span_attributes = {
+                "transaction.id": line[id_start:id_stop].decode(),
+                "transaction.store_id": line[store_start:store_stop].decode(),
+            }
+            if PAYMENT_FAILED in line:
+                span_attributes[FORCE_SAMPLE_ATTRIBUTE] = 1
+            yield line, span_attributes
+
+
+if __name__ == "__main__":
+    """
+    Command line entry point for building a transaction corpus.
+
+    Example (from the pos-service directory):
+        python src/corpus.py --output corpus/transactions.ndjson --count 1000000 \
+            --store-distribution zipf:1.1 --seed 42
+    """
+    parser = argparse.ArgumentParser(description="Pre-generate a POS transaction corpus.")
+    parser.add_argument("--output", required=True, help="Output NDJSON file")
+    parser.add_argument("--count", type=int, default=1000000, help="Number of transactions")
+    parser.add_argument("--stores", type=int, default=10)
+    parser.add_argument("--store-distribution", default="uniform")
+    parser.add_argument("--cashiers", type=int, default=8)
+    parser.add_argument("--cashier-distribution", default="uniform")
+    parser.add_argument("--customers", type=int, default=500)
+    parser.add_argument("--customer-distribution", default="uniform")
+    parser.add_argument("--events-per-second", type=float, default=1000)
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args()
+
+    build_corpus(
+        args.output,
+        args.count,
+        stores=args.stores,
+        store_distribution=args.store_distribution,
+        cashiers=args.cashiers,
+        cashier_distribution=args.cashier_distribution,
+        customers=args.customers,
+        customer_distribution=args.customer_distribution,
+        events_per_second=args.events_per_second,
+        seed=args.seed,
+    )
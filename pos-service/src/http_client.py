@@ -0,0 +1,156 @@
+import os
+from http.cookiejar import CookieJar, DefaultCookiePolicy
+import requests
+
+# HTTP version of the sender: "http1" uses a keep-alive session per send lane, "h2c" multiplexes
+# the send lanes over HTTP/2 cleartext connections
+HTTP_VERSION = os.getenv("HTTP_VERSION", "http1")
+
+# Store affinity: send the store ID header and the sticky cookie of the store's validation replica
+STORE_AFFINITY = os.getenv("STORE_AFFINITY", "true").lower() == "true"
+STORE_ID_HEADER = "X-Store-Id"
+AFFINITY_COOKIE = os.getenv("AFFINITY_COOKIE", "store_affinity")
+
+
+def _session_cookie_jar():
+    """
+    Creates a cookie jar that keeps no cookies.
+
+    Affinity cookies are kept per store by `StoreAffinity`; a session-wide cookie
+    would pin all stores of a sender to a single replica.
+    """
+    return CookieJar(policy=DefaultCookiePolicy(allowed_domains=[]))
+
+
+class H2cSession:
+    """
+    A minimal `requests.Session` stand-in that sends requests over HTTP/2 cleartext (h2c).
+
+    - Uses an `httpx` client with HTTP/2 prior knowledge over a few persistent
+      connections. The client is thread-safe, so the send lanes share one session and
+      their concurrent requests are multiplexed as streams of these connections.
+    - Raises `requests` exceptions, so callers handle both HTTP versions alike.
+
+    Attributes:
+        auth (tuple): Basic auth credentials sent with every request.
+    """
+
+    def __init__(self, max_connections: int):
+        """
+        Initializes the HTTP/2 client.
+
+        Args:
+            max_connections (int): Maximum number of connections to keep open.
+        """
+        import httpx
+
+        self._httpx = httpx
+        self.auth = None
+        self.client = httpx.Client(
+            http1=False,
+            http2=True,
+            cookies=_session_cookie_jar(),
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+        )
+
+    def post(self, url, headers=None, data=None):
+        """
+        Sends a POST request.
+
+        Args:
+            url (str): The request URL.
+            headers (dict): Request headers.
+            data (bytes): The request body.
+
+        Returns:
+            httpx.Response: The response of a successful request.
+
+        Raises:
+            requests.HTTPError: If the response has an error status code.
+            requests.ConnectionError: If the request could not be sent.
+        """
+        try:
+            response = self.client.post(url, headers=headers, content=data, auth=self.auth)
+        except self._httpx.HTTPError as e:
+            raise requests.ConnectionError(str(e)) from e
+        if response.is_error:
+            raise requests.HTTPError(f"{response.status_code} Error for url: {url}", response=response)
+        return response
+
+
+class StoreAffinity:
+    """
+    Keeps the sticky load balancer cookie of every store, so that all transactions of a
+    store are validated by the same replica and published in order.
+
+    Traefik assigns a replica to the first request without a valid cookie and returns it
+    in the `AFFINITY_COOKIE` cookie. The cookie is then sent with every request of the
+    store, and replaced if Traefik assigns a new replica (e.g. when one is unhealthy).
+
+    The affinity is shared by the send lanes; a store is always sent by the same lane,
+    so its entry is only ever accessed by one thread.
+    """
+
+    def __init__(self, cookie_name: str = AFFINITY_COOKIE):
+        """
+        Initializes the affinity without any assigned replicas.
+
+        Args:
+            cookie_name (str): The name of the sticky cookie.
+        """
+        self.cookie_name = cookie_name
+        self._cookies = {}
+
+    def headers(self, headers: dict, store_id: str) -> dict:
+        """
+        Adds the store ID header and the store's sticky cookie to the request headers.
+
+        Args:
+            headers (dict): The common request headers.
+            store_id (str): The store of the transaction.
+
+        Returns:
+            dict: A copy of the headers for the store.
+        """
+        headers = {**headers, STORE_ID_HEADER: store_id}
+        cookie = self._cookies.get(store_id)
+        if cookie:
+            headers["Cookie"] = f"{self.cookie_name}={cookie}"
+        return headers
+
+    def update(self, store_id: str, response):
+        """
+        Records the replica assigned to a store from a response.
+
+        Args:
+            store_id (str): The store of the transaction.
+            response (requests.Response or httpx.Response): The response.
+        """
+        cookie = response.cookies.get(self.cookie_name)
+        if cookie:
+            self._cookies[store_id] = cookie
+
+
+def create_http_session(auth):
+    """
+    Creates the HTTP session of the sender configured via `HTTP_VERSION`.
+
+    - `http1` (default): A `requests.Session` that reuses its keep-alive connection
+      instead of opening a new connection per transaction. It is not thread-safe, so
+      every send lane creates its own.
+    - `h2c`: An `H2cSession` multiplexing the requests of all send lanes over
+      `HTTP_MAX_CONNECTIONS` (default 2) HTTP/2 cleartext connections.
+
+    Args:
+        auth (tuple): Basic auth credentials (username, password).
+
+    Returns:
+        requests.Session or H2cSession: The session; its `post` raises `requests` exceptions.
+    """
+    if HTTP_VERSION == "h2c":
+        session = H2cSession(max_connections=int(os.getenv("HTTP_MAX_CONNECTIONS", "2")))
+    else:
+        session = requests.Session()
+        session.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+    session.auth = auth
+    return session
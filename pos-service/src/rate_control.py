@@ -0,0 +1,139 @@
+import math
+import os
+import threading
+import time
+
+
+class AimdRateController:
+    """
+    Closed-loop send rate controller using additive increase / multiplicative decrease.
+
+    - Paces requests to the current target rate.
+    - Evaluates the p99 latency and error rate of the requests sent in each window.
+    - Increases the rate additively while both stay below their thresholds,
+      otherwise decreases it multiplicatively.
+    - Honors `Retry-After` from 429/503 responses by pausing and backing off immediately.
+
+    The controller is shared by the send lanes, so its methods are thread-safe.
+
+    Attributes:
+        rate (float): The current target rate in requests per second.
+    """
+
+    def __init__(
+        self,
+        initial_rate: float,
+        min_rate: float,
+        max_rate: float,
+        increase_step: float,
+        decrease_factor: float,
+        target_p99_latency: float,
+        max_error_rate: float,
+        window_seconds: float,
+    ):
+        """
+        Initializes the rate controller.
+
+        Args:
+            initial_rate (float): Starting rate in requests per second.
+            min_rate (float): Lower bound of the rate.
+            max_rate (float): Upper bound of the rate.
+            increase_step (float): Rate added per healthy window.
+            decrease_factor (float): Factor the rate is multiplied with on overload (0 - 1).
+            target_p99_latency (float): p99 latency in seconds above which the rate is decreased.
+            max_error_rate (float): Error ratio (0 - 1) above which the rate is decreased.
+            window_seconds (float): Length of an evaluation window in seconds.
+        """
+        self.rate = initial_rate
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.increase_step = increase_step
+        self.decrease_factor = decrease_factor
+        self.target_p99_latency = target_p99_latency
+        self.max_error_rate = max_error_rate
+        self.window_seconds = window_seconds
+
+        self._next_send = time.monotonic()
+        self._window_start = self._next_send
+        self._latencies = []
+        self._errors = 0
+        self._lock = threading.Lock()
+
+    def wait(self):
+        """
+        Blocks until the next request may be sent at the current rate.
+        """
+        with self._lock:
+            now = time.monotonic()
+            send_at = max(self._next_send, now)
+            self._next_send = send_at + 1 / self.rate
+        if send_at > now:
+            time.sleep(send_at - now)
+
+    def record(self, latency: float, error: bool, retry_after: float = None):
+        """
+        Records the outcome of a request and adjusts the rate.
+
+        Args:
+            latency (float): Latency of the request in seconds.
+            error (bool): Whether the request failed.
+            retry_after (float): Seconds from a `Retry-After` header of a 429/503 response.
+        """
+        with self._lock:
+            self._record(latency, error, retry_after)
+
+    def _record(self, latency: float, error: bool, retry_after: float = None):
+        if retry_after is not None:
+            # The server asked us to slow down: back off now and pause sending
+            self._decrease()
+            self._next_send = max(self._next_send, time.monotonic() + retry_after)
+            self._reset_window()
+            return
+
+        self._latencies.append(latency)
+        self._errors += error
+
+        if time.monotonic() - self._window_start >= self.window_seconds:
+            self._latencies.sort()
+            p99_latency = self._latencies[max(math.ceil(len(self._latencies) * 0.99) - 1, 0)]
+            error_rate = self._errors / len(self._latencies)
+            if p99_latency > self.target_p99_latency or error_rate > self.max_error_rate:
+                self._decrease()
+            else:
+                self.rate = min(self.max_rate, self.rate + self.increase_step)
+            self._reset_window()
+
+    def _decrease(self):
+        self.rate = max(self.min_rate, self.rate * self.decrease_factor)
+
+    def _reset_window(self):
+        self._window_start = time.monotonic()
+        self._latencies = []
+        self._errors = 0
+
+
+def create_rate_controller():
+    """
+    Creates the AIMD rate controller from environment variables.
+
+    - `SEND_RATE_INITIAL`: Starting rate in transactions per second (default 50).
+    - `SEND_RATE_MIN` / `SEND_RATE_MAX`: Bounds of the rate (default 1 / 5000).
+    - `SEND_RATE_INCREASE`: Additive increase per healthy window (default 10).
+    - `SEND_RATE_DECREASE_FACTOR`: Multiplicative decrease on overload (default 0.5).
+    - `SEND_TARGET_P99_LATENCY`: p99 latency threshold in seconds (default 0.25).
+    - `SEND_MAX_ERROR_RATE`: Error rate threshold (default 0.01).
+    - `SEND_RATE_WINDOW`: Evaluation window in seconds (default 2).
+
+    Returns:
+        AimdRateController: The configured rate controller.
+    """
+    return AimdRateController(
+        initial_rate=float(os.getenv("SEND_RATE_INITIAL", "50")),
+        min_rate=float(os.getenv("SEND_RATE_MIN", "1")),
+        max_rate=float(os.getenv("SEND_RATE_MAX", "5000")),
+        increase_step=float(os.getenv("SEND_RATE_INCREASE", "10")),
+        decrease_factor=float(os.getenv("SEND_RATE_DECREASE_FACTOR", "0.5")),
+        target_p99_latency=float(os.getenv("SEND_TARGET_P99_LATENCY", "0.25")),
+        max_error_rate=float(os.getenv("SEND_MAX_ERROR_RATE", "0.01")),
+        window_seconds=float(os.getenv("SEND_RATE_WINDOW", "2")),
+    )
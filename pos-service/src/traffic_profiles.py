@@ -0,0 +1,321 @@
+import math
+import os
+import socket
+import time
+import zlib
+import numpy as np
+from datetime import datetime
+from corpus import id_weights
+from common.tracing_config import FORCE_SAMPLE_ATTRIBUTE
+from utils import generate_transaction_batch
+
+# Building blocks a traffic profile can combine with "+", e.g. "hotspot+diurnal+disorder"
+PROFILE_COMPONENTS = {"uniform", "hotspot", "diurnal", "flash_sale", "outage_replay", "disorder"}
+
+# Number of stores the generator draws from (STORE_1 to STORE_10)
+STORE_COUNT = 10
+
+
+class TrafficProfile:
+    """
+    Shapes the rate, store mix and event times of generated transactions.
+
+    Components:
+    - `uniform`: Unpaced load with uniformly drawn stores (the default behavior).
+    - `hotspot`: Stores follow a Zipf distribution, so a few stores dominate the load.
+    - `diurnal`: The send rate follows a (compressed) day curve between a night and a peak rate.
+    - `flash_sale`: Periodic bursts with a multiplied rate, concentrated on a single store.
+    - `outage_replay`: Periodic outages during which transactions are held back and then
+      sent as a backlog burst with their original (backdated) event times.
+    - `disorder`: A share of the events carries an older event time than its neighbours.
+
+    Profiles with `diurnal`, `flash_sale` or `outage_replay` are paced at `base_rate`
+    transactions per second (scaled by the curve and bursts), all others are unpaced.
+    """
+
+    def __init__(
+        self,
+        components: set[str],
+        base_rate: float,
+        zipf_exponent: float,
+        day_seconds: float,
+        night_rate_ratio: float,
+        flash_sale_interval: float,
+        flash_sale_duration: float,
+        flash_sale_multiplier: float,
+        flash_sale_store_share: float,
+        outage_interval: float,
+        outage_duration: float,
+        disorder_ratio: float,
+        disorder_mean_delay: float,
+        disorder_max_delay: float,
+    ):
+        """
+        Initializes the traffic profile.
+
+        Args:
+            components (set[str]): The profile components (see `PROFILE_COMPONENTS`).
+            base_rate (float): Peak send rate in transactions per second for paced profiles.
+            zipf_exponent (float): Exponent of the Zipf store distribution of `hotspot`.
+            day_seconds (float): Length of a simulated day of `diurnal` in seconds.
+            night_rate_ratio (float): Rate at night relative to the peak rate (0 - 1).
+            flash_sale_interval (float): Seconds between the starts of two flash sales.
+            flash_sale_duration (float): Length of a flash sale in seconds.
+            flash_sale_multiplier (float): Rate multiplier during a flash sale.
+            flash_sale_store_share (float): Share of flash sale transactions of the sale's store (0 - 1).
+            outage_interval (float): Seconds between the starts of two outages.
+            outage_duration (float): Length of an outage in seconds.
+            disorder_ratio (float): Share of events with a delayed event time (0 - 1).
+            disorder_mean_delay (float): Mean event-time delay of disordered events in seconds.
+            disorder_max_delay (float): Maximum event-time delay of disordered events in seconds.
+
+        Raises:
+            ValueError: If a component is unknown.
+        """
+        unknown = components - PROFILE_COMPONENTS
+        if unknown:
+            raise ValueError(f"Unknown traffic profile components: {', '.join(sorted(unknown))}")
+        self.components = components
+        self.base_rate = base_rate
+        self.day_seconds = day_seconds
+        self.night_rate_ratio = night_rate_ratio
+        self.flash_sale_interval = flash_sale_interval
+        self.flash_sale_duration = flash_sale_duration
+        self.flash_sale_multiplier = flash_sale_multiplier
+        self.flash_sale_store_share = flash_sale_store_share
+        self.outage_interval = outage_interval
+        self.outage_duration = outage_duration
+        self.disorder_ratio = disorder_ratio
+        self.disorder_mean_delay = disorder_mean_delay
+        self.disorder_max_delay = disorder_max_delay
+
+        weights = np.array(id_weights(STORE_COUNT, f"zipf:{zipf_exponent}" if "hotspot" in components else "uniform"))
+        self.store_weights = weights / weights.sum()
+        self.paced = bool(components & {"diurnal", "flash_sale", "outage_replay"})
+
+    def rate(self, elapsed: float) -> float:
+        """
+        Returns the target send rate at a point of the run.
+
+        Args:
+            elapsed (float): Seconds since the start of the run.
+
+        Returns:
+            float: The send rate in transactions per second.
+        """
+        rate = self.base_rate
+        if "diurnal" in self.components:
+            # Cosine day curve: night rate at the start of a day, peak rate at midday
+            daylight = (1 - math.cos(2 * math.pi * elapsed / self.day_seconds)) / 2
+            rate *= self.night_rate_ratio + (1 - self.night_rate_ratio) * daylight
+        if self.flash_sale(elapsed) is not None:
+            rate *= self.flash_sale_multiplier
+        return rate
+
+    def flash_sale(self, elapsed: float):
+        """
+        Returns the running flash sale at a point of the run.
+
+        Args:
+            elapsed (float): Seconds since the start of the run.
+
+        Returns:
+            int or None: The number of the flash sale, or None outside of flash sales.
+        """
+        if "flash_sale" not in self.components:
+            return None
+        sale, offset = divmod(elapsed, self.flash_sale_interval)
+        return int(sale) if offset >= self.flash_sale_interval - self.flash_sale_duration else None
+
+    def in_outage(self, elapsed: float) -> bool:
+        """
+        Returns whether transactions are held back at a point of the run.
+
+        Args:
+            elapsed (float): Seconds since the start of the run.
+
+        Returns:
+            bool: True during an outage.
+        """
+        if "outage_replay" not in self.components:
+            return False
+        return elapsed % self.outage_interval >= self.outage_interval - self.outage_duration
+
+    def store_numbers(self, rng: np.random.Generator, size: int, elapsed: float) -> np.ndarray:
+        """
+        Draws the store numbers of a batch.
+
+        Args:
+            rng (numpy.random.Generator): The random generator.
+            size (int): Number of transactions.
+            elapsed (float): Seconds since the start of the run.
+
+        Returns:
+            numpy.ndarray: Store numbers (1-based).
+        """
+        stores = rng.choice(STORE_COUNT, size=size, p=self.store_weights) + 1
+        sale = self.flash_sale(elapsed)
+        if sale is not None:
+            # Every flash sale takes place in another store
+            sale_store = zlib.crc32(str(sale).encode()) % STORE_COUNT + 1
+            stores[rng.random(size=size) < self.flash_sale_store_share] = sale_store
+        return stores
+
+    def event_delays(self, rng: np.random.Generator, size: int) -> np.ndarray:
+        """
+        Draws the additional delays of the events of a batch.
+
+        Disordered events are delayed by an exponentially distributed time, all
+        other events (and all events without `disorder`) by 0 seconds.
+
+        Args:
+            rng (numpy.random.Generator): The random generator.
+            size (int): The batch size.
+
+        Returns:
+            numpy.ndarray: The delays in seconds.
+        """
+        if "disorder" not in self.components:
+            return np.zeros(size)
+        delays = np.minimum(rng.exponential(self.disorder_mean_delay, size=size), self.disorder_max_delay)
+        return delays * (rng.random(size=size) < self.disorder_ratio)
+
+    def event_times(self, rng: np.random.Generator, send_times: np.ndarray) -> list[str]:
+        """
+        Derives the event timestamps of a paced batch from its send times.
+
+        Events happen 10 seconds before they are sent, as with `generate_transaction`;
+        disordered events are additionally delayed (see `event_delays`).
+
+        Args:
+            rng (numpy.random.Generator): The random generator.
+            send_times (numpy.ndarray): Send times as UNIX timestamps.
+
+        Returns:
+            list[str]: Event timestamps in ISO 8601 format.
+        """
+        event_times = send_times - 10 - self.event_delays(rng, len(send_times))
+        return [datetime.fromtimestamp(event_time).isoformat() + "Z" for event_time in event_times.tolist()]
+
+
+def shaped_transactions(profile: TrafficProfile, batch_size: int):
+    """
+    Generates transactions shaped by a traffic profile.
+
+    - Unpaced profiles stream vectorized batches of `batch_size` transactions, each
+      stamped with its event time when it is sent.
+    - Paced profiles generate batches of about 100 ms of traffic at the profile's current rate
+      and wait until each transaction's send time.
+    - During outages, transactions are generated at their event time but held back,
+      and the backlog is sent at once when the outage ends.
+
+    Args:
+        profile (TrafficProfile): The traffic profile.
+        batch_size (int): Batch size of the unpaced vectorized generator.
+
+    Yields:
+        tuple[bytes, dict]: The serialized transaction and its span attributes.
+    """
+    rng = np.random.default_rng()
+    start = time.time()
+    next_send = start
+    backlog = []
+    while True:
+        elapsed = next_send - start
+        if profile.paced:
+            rate = profile.rate(elapsed)
+            size = max(1, int(rate / 10))
+            send_times = next_send + np.arange(size) / rate
+            next_send = float(send_times[-1]) + 1 / rate
+            batch = generate_transaction_batch(
+                size,
+                rng,
+                store_numbers=profile.store_numbers(rng, size, elapsed),
+                timestamps=profile.event_times(rng, send_times),
+            )
+        else:
+            size = batch_size
+            send_times = np.full(size, time.time())
+            batch = generate_transaction_batch(
+                size,
+                rng,
+                store_numbers=profile.store_numbers(rng, size, elapsed),
+                event_delays=profile.event_delays(rng, size).tolist(),
+            )
+
+        for (payload, summary), send_time in zip(batch, send_times.tolist()):
+            if profile.paced:
+                delay = send_time - time.time()
+                if delay > 0:
+                    time.sleep(delay)
+
+            transaction = payload, {
+                "transaction.id": summary["transaction_id"],
+                "transaction.store_id": summary["store_id"],
+                "transaction.total_amount": summary["total_amount"],
+            }
+            if summary["payment_failed"]:
+                transaction[1][FORCE_SAMPLE_ATTRIBUTE] = 1
+            if profile.in_outage(send_time - start):
+                backlog.append(transaction)
+                continue
+            if backlog:
+                yield from backlog
+                backlog = []
+            yield transaction
+
+
+def select_profile(profiles: str) -> str:
+    """
+    Selects this replica's profile from a comma-separated list of profiles.
+
+    Replicas of the same service share their configuration, so the profile is chosen
+    by a hash of the host name, which spreads the profiles over the replicas.
+
+    Args:
+        profiles (str): Comma-separated profiles, e.g. "hotspot+disorder,diurnal,flash_sale".
+
+    Returns:
+        str: The profile of this replica.
+    """
+    choices = [profile.strip() for profile in profiles.split(",") if profile.strip()]
+    return choices[zlib.crc32(socket.gethostname().encode()) % len(choices)]
+
+
+def create_traffic_profile():
+    """
+    Creates the traffic profile of this replica from environment variables.
+
+    - `TRAFFIC_PROFILE`: Profile components joined by "+", or a comma-separated list of
+      such profiles to spread over the replicas (default "uniform").
+    - `TRAFFIC_BASE_RATE`: Peak rate of paced profiles in transactions per second (default 200).
+    - `TRAFFIC_ZIPF_EXPONENT`: Zipf exponent of the store hot spots (default 1.1).
+    - `TRAFFIC_DAY_SECONDS` / `TRAFFIC_NIGHT_RATE_RATIO`: Simulated day length (default 600)
+      and night rate ratio (default 0.1).
+    - `TRAFFIC_FLASH_SALE_INTERVAL` / `_DURATION` / `_MULTIPLIER` / `_STORE_SHARE`:
+      Flash sale timing (default every 120 s for 15 s), rate multiplier (default 5)
+      and share of the sale's store (default 0.6).
+    - `TRAFFIC_OUTAGE_INTERVAL` / `TRAFFIC_OUTAGE_DURATION`: Outage timing (default every 300 s for 30 s).
+    - `TRAFFIC_DISORDER_RATIO` / `_MEAN_DELAY` / `_MAX_DELAY`: Share of delayed events
+      (default 0.1), their mean (default 5 s) and maximum delay (default 60 s).
+
+    Returns:
+        TrafficProfile: The configured traffic profile.
+    """
+    profile = select_profile(os.getenv("TRAFFIC_PROFILE", "uniform"))
+    return TrafficProfile(
+        components=set(profile.split("+")),
+        base_rate=float(os.getenv("TRAFFIC_BASE_RATE", "200")),
+        zipf_exponent=float(os.getenv("TRAFFIC_ZIPF_EXPONENT", "1.1")),
+        day_seconds=float(os.getenv("TRAFFIC_DAY_SECONDS", "600")),
+        night_rate_ratio=float(os.getenv("TRAFFIC_NIGHT_RATE_RATIO", "0.1")),
+        flash_sale_interval=float(os.getenv("TRAFFIC_FLASH_SALE_INTERVAL", "120")),
+        flash_sale_duration=float(os.getenv("TRAFFIC_FLASH_SALE_DURATION", "15")),
+        flash_sale_multiplier=float(os.getenv("TRAFFIC_FLASH_SALE_MULTIPLIER", "5")),
+        flash_sale_store_share=float(os.getenv("TRAFFIC_FLASH_SALE_STORE_SHARE", "0.6")),
+        outage_interval=float(os.getenv("TRAFFIC_OUTAGE_INTERVAL", "300")),
+        outage_duration=float(os.getenv("TRAFFIC_OUTAGE_DURATION", "30")),
+        disorder_ratio=float(os.getenv("TRAFFIC_DISORDER_RATIO", "0.1")),
+        disorder_mean_delay=float(os.getenv("TRAFFIC_DISORDER_MEAN_DELAY", "5")),
+        disorder_max_delay=float(os.getenv("TRAFFIC_DISORDER_MAX_DELAY", "60")),
+    )
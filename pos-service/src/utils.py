@@ -1,6 +1,7 @@
 import random
 import uuid
 import json
+import numpy as np
 from datetime import datetime, timedelta
 
 
@@ -22,6 +23,28 @@ def load_json_data(file_path):
 items_list = load_json_data("src/examples/items.json")
 payment_methods = load_json_data("src/examples/payment_methods.json")
 
+# Columnar views of the reference data for the batch generator
+item_names_json = [json.dumps(item["name"]) for item in items_list]
+item_prices = np.array([item["price"] for item in items_list])
+item_prices_json = [repr(item["price"]) for item in items_list]
+payment_methods_json = [json.dumps(payment_method) for payment_method in payment_methods]
+
+# Positions of the hex digits in the canonical UUID form (8-4-4-4-12)
+UUID_HEX_COLUMNS = [*range(8), *range(9, 13), *range(14, 18), *range(19, 23), *range(24, 36)]
+
+
+def random_uuid():
+    """
+    Generates a version 4 UUID from the `random` module.
+
+    Unlike `uuid.uuid4`, which reads the OS entropy source, the UUIDs follow
+    `random.seed`, so that seeded corpora are reproducible.
+
+    Returns:
+        str: The UUID in canonical string form.
+    """
+    return str(uuid.UUID(int=random.getrandbits(128), version=4))
+
 
 def generate_item():
     """
@@ -43,7 +66,7 @@ def generate_item():
     total_price = round(item["price"] * quantity, 2)
 
     return {
-        "item_id": str(uuid.uuid4()),
+        "item_id": random_uuid(),
         "name": item["name"],
         "quantity": quantity,
         "price_per_unit": item["price"],
@@ -51,16 +74,26 @@ def generate_item():
     }
 
 
-def generate_transaction():
+def generate_transaction(store_id=None, cashier_id=None, customer_id=None, timestamp=None, now=None):
     """
     Generates a random POS transaction.
 
+    Store, cashier and customer IDs and the timestamp are drawn randomly unless given.
+
     - Generates a list of items for the transaction.
     - Calculates the total amount and assigns a random payment method.
     - Simulates a >99% success rate for payments.
     - Assigns random store, cashier, and customer IDs.
     - Includes a receipt with additional details.
 
+    Args:
+        store_id (str): Optional store ID, e.g. "STORE_3".
+        cashier_id (str): Optional cashier ID, e.g. "CASHIER_2".
+        customer_id (str): Optional customer ID, e.g. "CUSTOMER_42".
+        timestamp (str): Optional transaction timestamp in ISO 8601 format.
+        now (datetime): Optional reference time of the default timestamp and the
+            receipt date (default: the current time).
+
     Returns:
         dict: A dictionary containing transaction details, including:
             - transaction_id (str): A unique transaction ID.
@@ -85,24 +118,147 @@ def generate_transaction():
     total_amount = round(sum(item["total_price"] for item in items), 2)
     payment_method = random.choice(payment_methods)
     payment_status = "success" if random.random() > 0.001 else "failure"
-    timestamp = datetime.now() - timedelta(days=random.randint(0, 30))
+    now = now or datetime.now()
+    receipt_date = now - timedelta(days=random.randint(0, 30))
 
     return {
-        "transaction_id": str(uuid.uuid4()),
-        "timestamp": (timestamp.now() - timedelta(seconds=10)).isoformat() + "Z",
-        "store_id": f"STORE_{random.randint(1, 10)}",
-        "cashier_id": f"CASHIER_{random.randint(1, 8)}",
+        "transaction_id": random_uuid(),
+        "timestamp": timestamp or (now - timedelta(seconds=10)).isoformat() + "Z",
+        "store_id": store_id or f"STORE_{random.randint(1, 10)}",
+        "cashier_id": cashier_id or f"CASHIER_{random.randint(1, 8)}",
         "items": items,
         "total_amount": total_amount,
         "payment_method": payment_method,
         "payment_status": payment_status,
-        "customer_id": f"CUSTOMER_{random.randint(1, 500)}",
+        "customer_id": customer_id or f"CUSTOMER_{random.randint(1, 500)}",
         "loyalty_points_earned": random.randint(0, 5),
         "receipt": {
-            "receipt_id": str(uuid.uuid4()),
-            "date": timestamp.isoformat() + "Z",
+            "receipt_id": random_uuid(),
+            "date": receipt_date.isoformat() + "Z",
             "total_amount": total_amount,
             "payment_method": payment_method,
-            "transaction_id": str(uuid.uuid4()),
+            "transaction_id": random_uuid(),
         },
     }
+
+
+def generate_uuids(rng, count):
+    """
+    Generates random version 4 UUIDs in bulk.
+
+    Args:
+        rng (numpy.random.Generator): The random generator.
+        count (int): Number of UUIDs.
+
+    Returns:
+        list[str]: The UUIDs in canonical string form.
+    """
+    raw = rng.integers(0, 256, size=(count, 16), dtype=np.uint8)
+    raw[:, 6] = (raw[:, 6] & 0x0F) | 0x40
+    raw[:, 8] = (raw[:, 8] & 0x3F) | 0x80
+    hexed = np.frombuffer(raw.tobytes().hex().encode(), dtype=np.uint8).reshape(count, 32)
+    chars = np.full((count, 36), ord("-"), dtype=np.uint8)
+    chars[:, UUID_HEX_COLUMNS] = hexed
+    text = chars.tobytes().decode()
+    return [text[i:i + 36] for i in range(0, count * 36, 36)]
+
+
+def generate_transaction_batch(size, rng=None, store_numbers=None, timestamps=None, event_delays=None):
+    """
+    Generates a batch of random POS transactions as pre-serialized JSON.
+
+    The transactions are statistically equivalent to `generate_transaction`, but all
+    random values (item counts, items, quantities, payment methods and statuses, IDs)
+    are drawn with NumPy for the whole batch and totals are computed vectorized.
+    The JSON of a transaction is only built when it is consumed, so that its default
+    timestamp (10 seconds ago, as with `generate_transaction`) is taken at send time.
+
+    Args:
+        size (int): Number of transactions.
+        rng (numpy.random.Generator): Optional random generator (default: a new unseeded one).
+        store_numbers (numpy.ndarray): Optional store numbers per transaction, e.g. 3 for "STORE_3".
+        timestamps (list[str]): Optional transaction timestamps in ISO 8601 format.
+        event_delays (list[float]): Optional additional delays in seconds of the default
+            timestamps, e.g. of disordered events (ignored with `timestamps`).
+
+    Yields:
+        tuple[bytes, dict]: Per transaction the JSON payload (same fields as
+            `generate_transaction`) and a summary with `transaction_id`, `store_id`,
+            `total_amount` and `payment_failed`.
+    """
+    rng = rng or np.random.default_rng()
+
+    # Items: 1 - 5 per transaction, flattened over the batch
+    item_counts = rng.integers(1, 6, size=size)
+    item_offsets = np.concatenate(([0], np.cumsum(item_counts)))
+    item_indices = rng.integers(0, len(items_list), size=item_offsets[-1])
+    quantities = rng.integers(1, 6, size=item_offsets[-1])
+    total_prices = np.round(item_prices[item_indices] * quantities, 2)
+    total_amounts = np.round(np.add.reduceat(total_prices, item_offsets[:-1]), 2)
+
+    # Transaction attributes
+    if store_numbers is None:
+        store_numbers = rng.integers(1, 11, size=size)
+    cashier_numbers = rng.integers(1, 9, size=size)
+    customer_numbers = rng.integers(1, 501, size=size)
+    loyalty_points = rng.integers(0, 6, size=size)
+    payment_method_indices = rng.integers(0, len(payment_methods), size=size)
+    payment_failed = rng.random(size=size) <= 0.001
+    receipt_age_days = rng.integers(0, 31, size=size)
+
+    # IDs: transaction, receipt and receipt transaction ID per transaction, one per item
+    transaction_ids = generate_uuids(rng, size * 3)
+    item_ids = generate_uuids(rng, int(item_offsets[-1]))
+
+    now = datetime.now()
+    receipt_dates = [(now - timedelta(days=days)).isoformat() + "Z" for days in range(31)]
+
+    item_indices = item_indices.tolist()
+    quantities = quantities.tolist()
+    total_prices = total_prices.tolist()
+    items_json = [
+        f'{{"item_id": "{item_ids[i]}", "name": {item_names_json[item_indices[i]]}, '
+        f'"quantity": {quantities[i]}, "price_per_unit": {item_prices_json[item_indices[i]]}, '
+        f'"total_price": {total_prices[i]!r}}}'
+        for i in range(len(item_ids))
+    ]
+
+    item_offsets = item_offsets.tolist()
+    store_numbers = store_numbers.tolist()
+    total_amounts = total_amounts.tolist()
+    for i, (cashier, customer, points, method, failed, age) in enumerate(
+        zip(
+            cashier_numbers.tolist(),
+            customer_numbers.tolist(),
+            loyalty_points.tolist(),
+            payment_method_indices.tolist(),
+            payment_failed.tolist(),
+            receipt_age_days.tolist(),
+        )
+    ):
+        transaction_id = transaction_ids[3 * i]
+        store_id = f"STORE_{store_numbers[i]}"
+        total_amount = total_amounts[i]
+        payment_method = payment_methods_json[method]
+        if timestamps is None:
+            delay = 10 + (event_delays[i] if event_delays is not None else 0)
+            timestamp = (datetime.now() - timedelta(seconds=delay)).isoformat() + "Z"
+        else:
+            timestamp = timestamps[i]
+        payload = (
+            f'{{"transaction_id": "{transaction_id}", "timestamp": "{timestamp}", '
+            f'"store_id": "{store_id}", "cashier_id": "CASHIER_{cashier}", '
+            f'"items": [{", ".join(items_json[item_offsets[i]:item_offsets[i + 1]])}], '
+            f'"total_amount": {total_amount!r}, "payment_method": {payment_method}, '
+            f'"payment_status": "{"failure" if failed else "success"}", '
+            f'"customer_id": "CUSTOMER_{customer}", "loyalty_points_earned": {points}, '
+            f'"receipt": {{"receipt_id": "{transaction_ids[3 * i + 1]}", "date": "{receipt_dates[age]}", '
+            f'"total_amount": {total_amount!r}, "payment_method": {payment_method}, '
+            f'"transaction_id": "{transaction_ids[3 * i + 2]}"}}}}'
+        )
+        yield payload.encode(), {
+            "transaction_id": transaction_id,
+            "store_id": store_id,
+            "total_amount": total_amount,
+            "payment_failed": failed,
+        }
@@ -0,0 +1,10 @@
+import os
+import sys
+
+# The service modules import each other as top-level modules, and the shared
+# modules as the `common` package (see the Dockerfile)
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+sys.path.insert(1, os.path.join(os.path.dirname(__file__), "..", ".."))
+
+# The reference data is loaded relative to the service directory (the Dockerfile's WORKDIR)
+os.chdir(os.path.join(os.path.dirname(__file__), ".."))
@@ -0,0 +1,26 @@
+from datetime import datetime
+from corpus import build_corpus, replay_corpus
+
+START = datetime(2024, 1, 1)
+
+
+def test_seeded_corpus_is_reproducible(tmp_path):
+    paths = [tmp_path / name for name in ("a.ndjson", "b.ndjson", "c.ndjson")]
+    for path, seed in zip(paths, (7, 7, 8)):
+        build_corpus(str(path), 20, seed=seed, start=START)
+
+    first, second, other = (path.read_bytes() for path in paths)
+
+    assert first == second
+    assert first != other
+
+
+def test_replay_keeps_the_corpus_timestamps_and_attributes(tmp_path):
+    path = tmp_path / "corpus.ndjson"
+    build_corpus(str(path), 3, seed=1, start=START, events_per_second=2)
+
+    lines = list(replay_corpus(str(path), timestamps="keep"))
+
+    assert [line.count(b'"timestamp":"2024-01-01T00:00:') for line, _ in lines] == [1, 1, 1]
+    assert b'"timestamp":"2024-01-01T00:00:00.500000Z"' in lines[1][0]
+    assert all(attributes["transaction.id"] in line.decode() for line, attributes in lines)
@@ -0,0 +1,109 @@
+import pytest
+from rate_control import AimdRateController
+
+
+class Clock:
+    """
+    A manual replacement of `time.monotonic` and `time.sleep`.
+    """
+
+    def __init__(self):
+        self.now = 100.0
+        self.sleeps = []
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr("rate_control.time.monotonic", clock.monotonic)
+    monkeypatch.setattr("rate_control.time.sleep", clock.sleep)
+    return clock
+
+
+def create_controller(**overrides):
+    settings = dict(
+        initial_rate=10,
+        min_rate=1,
+        max_rate=40,
+        increase_step=5,
+        decrease_factor=0.5,
+        target_p99_latency=0.25,
+        max_error_rate=0.01,
+        window_seconds=1,
+    )
+    return AimdRateController(**{**settings, **overrides})
+
+
+def finish_window(controller, clock, latency=0.01, error=False, count=10):
+    for _ in range(count - 1):
+        controller.record(latency, error)
+    clock.now += controller.window_seconds
+    controller.record(latency, error)
+
+
+def test_requests_are_paced_to_the_rate(clock):
+    controller = create_controller()
+
+    for _ in range(3):
+        controller.wait()
+
+    assert clock.sleeps == pytest.approx([0.1, 0.1])
+
+
+def test_healthy_window_increases_the_rate_additively(clock):
+    controller = create_controller()
+
+    finish_window(controller, clock)
+    assert controller.rate == 15
+    for _ in range(10):
+        finish_window(controller, clock)
+
+    assert controller.rate == 40
+
+
+def test_rate_is_not_changed_within_a_window(clock):
+    controller = create_controller()
+
+    for _ in range(5):
+        controller.record(1.0, True)
+
+    assert controller.rate == 10
+
+
+@pytest.mark.parametrize("latency, error", [(0.5, False), (0.01, True)])
+def test_slow_or_failing_window_decreases_the_rate_multiplicatively(clock, latency, error):
+    controller = create_controller()
+
+    finish_window(controller, clock, latency, error)
+    assert controller.rate == 5
+    for _ in range(5):
+        finish_window(controller, clock, latency, error)
+
+    assert controller.rate == 1
+
+
+def test_p99_ignores_a_single_slow_request_among_a_hundred(clock):
+    controller = create_controller()
+
+    controller.record(1.0, False)
+    finish_window(controller, clock, count=99)
+
+    assert controller.rate == 15
+
+
+def test_retry_after_backs_off_and_pauses_sending(clock):
+    controller = create_controller()
+    controller.wait()
+
+    controller.record(0.01, False, retry_after=2)
+    controller.wait()
+
+    assert controller.rate == 5
+    assert clock.sleeps == [2]
@@ -0,0 +1,101 @@
+import json
+import random
+import statistics
+import uuid
+import numpy as np
+import pytest
+from utils import generate_transaction, generate_transaction_batch, generate_uuids, payment_methods
+
+SIZE = 4000
+
+
+@pytest.fixture(scope="module")
+def single():
+    random.seed(1)
+    return [generate_transaction() for _ in range(SIZE)]
+
+
+@pytest.fixture(scope="module")
+def batch():
+    return [
+        (json.loads(payload), summary)
+        for payload, summary in generate_transaction_batch(SIZE, np.random.default_rng(1))
+    ]
+
+
+def assert_means_agree(first, second):
+    """
+    Asserts that two sample means differ by less than five standard errors.
+    """
+    variance = statistics.variance(first) / len(first) + statistics.variance(second) / len(second)
+    assert abs(statistics.mean(first) - statistics.mean(second)) < 5 * variance**0.5
+
+
+def test_batch_transactions_have_the_fields_of_single_ones(single, batch):
+    transaction, summary = batch[0]
+
+    assert list(transaction) == list(single[0])
+    assert list(transaction["items"][0]) == list(single[0]["items"][0])
+    assert list(transaction["receipt"]) == list(single[0]["receipt"])
+    assert summary == {
+        "transaction_id": transaction["transaction_id"],
+        "store_id": transaction["store_id"],
+        "total_amount": transaction["total_amount"],
+        "payment_failed": transaction["payment_status"] == "failure",
+    }
+
+
+def test_batch_totals_are_the_sum_of_their_items(batch):
+    for transaction, _ in batch:
+        items = transaction["items"]
+        for item in items:
+            assert item["total_price"] == round(item["price_per_unit"] * item["quantity"], 2)
+        assert transaction["total_amount"] == round(sum(item["total_price"] for item in items), 2)
+        assert transaction["receipt"]["total_amount"] == transaction["total_amount"]
+
+
+@pytest.mark.parametrize(
+    "statistic",
+    [
+        lambda transaction: len(transaction["items"]),
+        lambda transaction: transaction["total_amount"],
+        lambda transaction: transaction["items"][0]["quantity"],
+        lambda transaction: transaction["loyalty_points_earned"],
+        lambda transaction: int(transaction["store_id"].split("_")[1]),
+        lambda transaction: int(transaction["cashier_id"].split("_")[1]),
+        lambda transaction: int(transaction["customer_id"].split("_")[1]),
+        lambda transaction: payment_methods.index(transaction["payment_method"]),
+    ],
+    ids=[
+        "item_count",
+        "total_amount",
+        "quantity",
+        "loyalty_points",
+        "store",
+        "cashier",
+        "customer",
+        "payment_method",
+    ],
+)
+def test_batch_statistics_match_single_transactions(single, batch, statistic):
+    assert_means_agree([statistic(transaction) for transaction in single], [statistic(t) for t, _ in batch])
+
+
+def test_batch_value_ranges_match_single_transactions(single, batch):
+    def ranges(transactions):
+        return {
+            "item_count": {len(transaction["items"]) for transaction in transactions},
+            "stores": {transaction["store_id"] for transaction in transactions},
+            "cashiers": {transaction["cashier_id"] for transaction in transactions},
+            "payment_methods": {transaction["payment_method"] for transaction in transactions},
+            "loyalty_points": {transaction["loyalty_points_earned"] for transaction in transactions},
+        }
+
+    assert ranges([transaction for transaction, _ in batch]) == ranges(single)
+
+
+def test_generated_uuids_are_unique_version_4_uuids():
+    uuids = generate_uuids(np.random.default_rng(1), 1000)
+
+    assert len(set(uuids)) == 1000
+    assert all(str(uuid.UUID(value)) == value and uuid.UUID(value).version == 4 for value in uuids)
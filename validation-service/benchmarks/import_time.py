@@ -0,0 +1,72 @@
+import argparse
+import os
+import subprocess
+import sys
+
+# ------------------------------------------------------------------------------
+# Import time benchmark for the validation service.
+# Imports the application with `python -X importtime` and reports the total
+# import time and the slowest modules. With --max-ms the script exits with a
+# non-zero status if the import takes longer than the given budget.
+#
+# Usage (from the validation-service directory):
+#   python benchmarks/import_time.py --max-ms 1500
+# ------------------------------------------------------------------------------
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src")
+
+
+def measure_import_time(module: str, runs: int):
+    """
+    Imports a module in fresh interpreters and collects `-X importtime` output.
+
+    Args:
+        module (str): The module to import.
+        runs (int): Number of interpreter runs; the fastest run is reported.
+
+    Returns:
+        tuple[int, list[tuple[int, str]]]: The total import time of the module in
+            microseconds and the cumulative import time per imported module.
+    """
+    best_total, best_modules = None, []
+    for _ in range(runs):
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+            cwd=SRC_DIR,
+            env={**os.environ, "PYTHONPATH": SRC_DIR},
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        modules = []
+        for line in result.stderr.splitlines():
+            if not line.startswith("import time:") or "cumulative" in line:
+                continue
+            _, cumulative, name = line[len("import time:"):].split("|")
+            modules.append((int(cumulative), name.strip()))
+        total = next(cumulative for cumulative, name in modules if name == module)
+        if best_total is None or total < best_total:
+            best_total, best_modules = total, modules
+    return best_total, best_modules
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure the import time of the validation service.")
+    parser.add_argument("--module", default="app", help="Module to import (default: app)")
+    parser.add_argument("--runs", type=int, default=5, help="Number of runs, the fastest is reported")
+    parser.add_argument("--top", type=int, default=15, help="Number of slowest modules to list")
+    parser.add_argument("--max-ms", type=float, help="Fail if the import takes longer than this")
+    args = parser.parse_args()
+
+    total, modules = measure_import_time(args.module, args.runs)
+    print(f"Import of '{args.module}': {total / 1000:.1f} ms (best of {args.runs})")
+    for cumulative, name in sorted(modules, reverse=True)[: args.top]:
+        print(f"  {cumulative / 1000:8.1f} ms  {name}")
+
+    if args.max_ms is not None and total / 1000 > args.max_ms:
+        print(f"Import time exceeds the budget of {args.max_ms} ms")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
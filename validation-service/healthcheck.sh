@@ -5,7 +5,8 @@
 # This script:
 # - Retries loading environment variables from a `.env` file stored in `/vault-secrets`.
 # - Checks for valid entries in the `.env` file.
-# - Starts the FastAPI application using Uvicorn if the environment is configured correctly.
+# - Starts the FastAPI application using Gunicorn with Uvicorn workers (HTTP/1.1) or
+#   Hypercorn (HTTP/2 cleartext, `SERVER=hypercorn`) if the environment is configured correctly.
 # ------------------------------------------------------------------------------
 
 # Constants for retry mechanism
@@ -43,6 +44,15 @@ while [ $ATTEMPT -le $MAX_ATTEMPTS ]; do
     sleep $SLEEP_TIME
 done
 
-# Start the Validation service using Uvicorn
+# Reset the Prometheus multiprocess directory shared by the worker processes
+export PROMETHEUS_MULTIPROC_DIR=${PROMETHEUS_MULTIPROC_DIR:-/tmp/prometheus}
+rm -rf "$PROMETHEUS_MULTIPROC_DIR"
+mkdir -p "$PROMETHEUS_MULTIPROC_DIR"
+
+# Start the Validation service using Gunicorn with Uvicorn worker processes, or
+# Hypercorn for HTTP/2 cleartext (WEB_CONCURRENCY sets the number of processes, default one per core)
 echo "Starting Validation service..."
-exec uvicorn src.app:app --host 0.0.0.0 --port 8000 --log-level error
+if [ "$SERVER" = "hypercorn" ]; then
+    exec hypercorn src.app:app --config file:src/hypercorn_config.py
+fi
+exec gunicorn src.app:app --config src/gunicorn_config.py
@@ -0,0 +1,201 @@
+import base64
+import binascii
+import math
+import os
+import time
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
+from logger_config import setup_logger
+from metrics import SHED_REQUESTS
+from utils import credentials_valid
+
+# Initialize logger
+logger = setup_logger()
+
+# Admission limits per authenticated service username (per worker process)
+ADMISSION_MAX_CONCURRENCY = int(os.getenv("ADMISSION_MAX_CONCURRENCY", "200"))
+ADMISSION_RATE = float(os.getenv("ADMISSION_RATE", "0"))
+ADMISSION_BURST = float(os.getenv("ADMISSION_BURST", str(max(ADMISSION_RATE, 1))))
+
+# Endpoints subject to admission control (matched against the end of the request path)
+ADMITTED_PATHS = ("/api/v1/pos/validate_transaction", "/api/v1/pos/amount-per-store")
+
+
+class TokenBucket:
+    """
+    A token bucket refilled at a constant rate.
+
+    Attributes:
+        rate (float): Tokens added per second.
+        burst (float): Maximum number of tokens in the bucket.
+    """
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.last_refill = time.monotonic()
+
+    def try_acquire(self) -> float:
+        """
+        Takes a token from the bucket if one is available.
+
+        Returns:
+            float: 0 if a token was taken, otherwise the seconds until the next token is available.
+        """
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.last_refill) * self.rate)
+        self.last_refill = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0
+        return (1 - self.tokens) / self.rate
+
+
+class AdmissionController:
+    """
+    Limits in-flight requests and request rate per authenticated username.
+
+    Requests above the limits are rejected immediately instead of being queued:
+    - Status code 503 if the username has too many requests in flight.
+    - Status code 429 if the token-bucket rate of the username is exceeded.
+
+    The concurrency limit is checked first, so that a request shed for concurrency
+    does not use up a token. Rejections are counted in `SHED_REQUESTS`.
+    """
+
+    def __init__(self, max_concurrency: int, rate: float, burst: float):
+        """
+        Initializes the admission controller.
+
+        Args:
+            max_concurrency (int): Maximum in-flight requests per username (0 disables the limit).
+            rate (float): Admitted requests per second per username (0 disables the limit).
+            burst (float): Token bucket size per username.
+        """
+        self.max_concurrency = max_concurrency
+        self.rate = rate
+        self.burst = burst
+        self.in_flight: dict[str, int] = {}
+        self.buckets: dict[str, TokenBucket] = {}
+
+    def try_acquire(self, username: str):
+        """
+        Admits a request of a username if it is within the limits.
+
+        Args:
+            username (str): The authenticated service username.
+
+        Returns:
+            tuple[int, str, float] or None: None if the request was admitted, otherwise
+                the status code, reason and `Retry-After` delay of the rejection.
+        """
+        in_flight = self.in_flight.get(username, 0)
+        if self.max_concurrency > 0 and in_flight >= self.max_concurrency:
+            return self._shed(username, "concurrency_limited", 503, 1)
+
+        if self.rate > 0:
+            bucket = self.buckets.get(username)
+            if bucket is None:
+                bucket = self.buckets[username] = TokenBucket(self.rate, self.burst)
+            wait_time = bucket.try_acquire()
+            if wait_time:
+                return self._shed(username, "rate_limited", 429, wait_time)
+
+        self.in_flight[username] = in_flight + 1
+        return None
+
+    def release(self, username: str):
+        """
+        Marks an admitted request of the username as finished.
+
+        Args:
+            username (str): The authenticated service username.
+        """
+        self.in_flight[username] -= 1
+
+    def _shed(self, username: str, reason: str, status_code: int, retry_after: float):
+        SHED_REQUESTS.labels(username=username, reason=reason).inc()
+        logger.warning(f"Shedding request of {username}: {reason}")
+        return status_code, reason, retry_after
+
+
+def basic_auth_username(scope: Scope):
+    """
+    Returns the username of a request's valid Basic Auth credentials.
+
+    Args:
+        scope (Scope): The ASGI scope of the request.
+
+    Returns:
+        str or None: The username, or None if the credentials are missing or invalid
+            (the endpoint then rejects the request with 401).
+    """
+    for name, value in scope["headers"]:
+        if name == b"authorization":
+            scheme, _, encoded = value.partition(b" ")
+            if scheme.lower() != b"basic":
+                return None
+            try:
+                username, separator, password = base64.b64decode(encoded).decode().partition(":")
+            except (binascii.Error, UnicodeDecodeError):
+                return None
+            if separator and credentials_valid(username, password):
+                return username
+            return None
+    return None
+
+
+class AdmissionControlMiddleware:
+    """
+    ASGI middleware that applies admission control to the requests of `ADMITTED_PATHS`.
+
+    The in-flight slot of a request is held from its arrival until its response has
+    been sent, so that requests waiting on the event loop (e.g. for the write-ahead
+    log) count towards the concurrency limit. Requests without valid credentials are
+    passed on to the endpoint, which rejects them.
+    """
+
+    def __init__(self, app: ASGIApp, controller: "AdmissionController" = None):
+        """
+        Initializes the middleware.
+
+        Args:
+            app (ASGIApp): The wrapped application.
+            controller (AdmissionController): The admission controller (default `ADMISSION_CONTROLLER`).
+        """
+        self.app = app
+        self.controller = controller or ADMISSION_CONTROLLER
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or not scope["path"].endswith(ADMITTED_PATHS):
+            await self.app(scope, receive, send)
+            return
+
+        username = basic_auth_username(scope)
+        if username is None:
+            await self.app(scope, receive, send)
+            return
+
+        rejection = self.controller.try_acquire(username)
+        if rejection is not None:
+            status_code, reason, retry_after = rejection
+            response = JSONResponse(
+                status_code=status_code,
+                content={"detail": f"Request rejected: {reason}"},
+                headers={"Retry-After": str(math.ceil(retry_after))},
+            )
+            await response(scope, receive, send)
+            return
+
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.controller.release(username)
+
+
+ADMISSION_CONTROLLER = AdmissionController(
+    max_concurrency=ADMISSION_MAX_CONCURRENCY,
+    rate=ADMISSION_RATE,
+    burst=ADMISSION_BURST,
+)
@@ -1,18 +1,21 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, Request
 from fastapi.responses import JSONResponse
 from fastapi.exceptions import RequestValidationError
 from fastapi.encoders import jsonable_encoder
 from opentelemetry import trace
-from opentelemetry.exporter.otlp.proto.grpc.trace_exporter import OTLPSpanExporter
 from opentelemetry.sdk.trace import TracerProvider
 from opentelemetry.sdk.resources import Resource
-from opentelemetry.sdk.trace.export import BatchSpanProcessor
 from opentelemetry.instrumentation.fastapi import FastAPIInstrumentor
-from opentelemetry.instrumentation.requests import RequestsInstrumentor
-from opentelemetry.instrumentation.asgi import OpenTelemetryMiddleware
-from routes import transaction, health, amount_per_store
+from routes import transaction, health, amount_per_store, admin
+from background_tasks import PUBLISH_POOL, EDGE_AGGREGATOR, TRANSACTION_WAL, recover_transactions
+from runtime_metrics import RUNTIME_MONITOR
+from decompression import RequestDecompressionMiddleware
+from admission_control import AdmissionControlMiddleware
 from prometheus_fastapi_instrumentator import Instrumentator
+from prometheus_client import multiprocess
 from logger_config import setup_logger
+from common.tracing_config import create_sampler, ErrorSpanProcessor
 import os
 
 # Initialize logger
@@ -22,23 +25,29 @@ def init_tracing():
     """
     Initializes OpenTelemetry tracing for the application.
 
-    - Configures the tracer provider with resource attributes.
+    - Configures the tracer provider with resource attributes and the shared sampler.
     - Sets up the OTLP exporter to send traces to the OpenTelemetry Collector.
-    - Adds a batch span processor for optimized trace export.
-    - Instruments the `requests` library for tracing HTTP requests.
+    - Adds a batch span processor for optimized trace export (including unsampled error spans).
+    - Instruments the `requests` library for tracing HTTP requests, if the optional
+      instrumentation is installed.
+
+    The OTLP gRPC exporter is imported here rather than at module level, so that
+    importing the application stays fast.
 
     Raises:
         Exception: If tracing initialization fails.
     """
+    from opentelemetry.exporter.otlp.proto.grpc.trace_exporter import OTLPSpanExporter
+
     resource = Resource.create(
         attributes={"service.name": "validation-service"}
     )
-    trace.set_tracer_provider(TracerProvider(resource=resource))
+    trace.set_tracer_provider(TracerProvider(resource=resource, sampler=create_sampler()))
 
     otlp_exporter = OTLPSpanExporter(
         endpoint=f"{os.getenv('OTEL_COLLECTOR_PROTOCOL')}://{os.getenv('OTEL_COLLECTOR_HOST')}:{os.getenv('OTEL_COLLECTOR_PORT')}", insecure=True
     )
-    span_processor = BatchSpanProcessor(
+    span_processor = ErrorSpanProcessor(
         otlp_exporter,
         max_queue_size=1000,
         max_export_batch_size=500,
@@ -46,10 +55,64 @@ def init_tracing():
     )
     trace.get_tracer_provider().add_span_processor(span_processor)
 
-    # Automatically instrument requests
+    # Automatically instrument requests (optional dependency)
+    try:
+        from opentelemetry.instrumentation.requests import RequestsInstrumentor
+    except ImportError:
+        return
     RequestsInstrumentor().instrument()
 
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Lifespan handler of the application.
+
+    On startup:
+    - Initializes tracing and its exporter.
+    - Starts the publish workers and their broker connections.
+    - Opens the write-ahead log, if enabled, and queues the transactions a previous
+      process left unpublished.
+    - Starts the edge pre-aggregation, if enabled.
+    - Starts the runtime monitor (event loop lag, GC pauses, threads, RSS).
+    - Exposes Prometheus metrics via the application.
+
+    On shutdown:
+    - Stops the runtime monitor.
+    - Publishes the open edge aggregation windows.
+    - Drains the publish queues and closes the broker connections.
+    - Closes the write-ahead log.
+    - Flushes pending spans.
+    - Removes the live gauge files of this process from `PROMETHEUS_MULTIPROC_DIR`
+      (Hypercorn has no hook like Gunicorn's `child_exit` for this).
+
+    Args:
+        app (FastAPI): The application instance.
+    """
+    init_tracing()
+    PUBLISH_POOL.start()
+    if TRANSACTION_WAL:
+        recover_transactions()
+    if EDGE_AGGREGATOR:
+        EDGE_AGGREGATOR.start()
+    RUNTIME_MONITOR.start()
+    instrumentor.expose(app)
+    logger.info("Validation Service started")
+
+    yield
+
+    RUNTIME_MONITOR.stop()
+    if EDGE_AGGREGATOR:
+        EDGE_AGGREGATOR.stop()
+    PUBLISH_POOL.stop()
+    if TRANSACTION_WAL:
+        TRANSACTION_WAL.close()
+    trace.get_tracer_provider().shutdown()
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        multiprocess.mark_process_dead(os.getpid())
+    logger.info("Validation Service stopped")
+
+
 # Initialize FastAPI application
 app = FastAPI(
     title="Validation Service",
@@ -59,30 +122,25 @@ app = FastAPI(
     docs_url="/api/v1/pos/docs",
     redoc_url=None,
     root_path="/validation-service",
+    lifespan=lifespan,
 )
 
-# Add OpenTelemetry middleware
-init_tracing()
-FastAPIInstrumentor.instrument_app(app)
+# Add OpenTelemetry instrumentation (health checks and metrics scrapes are not traced).
+# The middleware resolves the tracer provider set up in the lifespan handler lazily.
+FastAPIInstrumentor.instrument_app(app, excluded_urls="api/v1/health,api/v1/ready,metrics")
 instrumentor = Instrumentator().instrument(app)
-app.add_middleware(OpenTelemetryMiddleware)
+
+# Accept gzip and zstd compressed request bodies
+app.add_middleware(RequestDecompressionMiddleware)
+
+# Shed excess requests per service user before their body is read (outermost middleware)
+app.add_middleware(AdmissionControlMiddleware)
 
 # Include routers for different endpoints
 app.include_router(transaction.router)
 app.include_router(health.router)
 app.include_router(amount_per_store.router)
-
-@app.on_event("startup")
-async def startup_event():
-    """
-    Event triggered when the application starts.
-
-    - Logs the startup event.
-    - Exposes Prometheus metrics via the application.
-    """
-    logger.info("Validation Service started")
-    instrumentor.expose(app)
-
+app.include_router(admin.router)
 
 @app.exception_handler(RequestValidationError)
 async def validation_exception_handler(request: Request, exc: RequestValidationError):
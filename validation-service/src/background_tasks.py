@@ -1,9 +1,39 @@
 from opentelemetry import trace
 from models.transaction_event import Transaction
 from models.aggregated_event import AggregatedEvent
-from solace_publisher import SolacePublisher
+from publish_workers import PublishWorkerPool
+from message_codecs import (
+    EVENT_TIME_PROPERTY,
+    TOTAL_CENTS_PROPERTY,
+    PARTIAL_AGGREGATE_PROPERTY,
+    RECEIPTS_SUPPRESSED_PROPERTY,
+    create_codec,
+    routing_properties,
+)
+from edge_aggregation import EDGE_AGGREGATION, EDGE_SUPPRESS_RECEIPTS, EdgeAggregator
+from wal import create_wal
 from logger_config import setup_logger
+from common.tracing_config import FORCE_SAMPLE_ATTRIBUTE
+from metrics import (
+    RECEIPT_TASK_LAG,
+    AGGREGATION_TASK_LAG,
+    RECEIPT_PUBLISH_LATENCY,
+    AGGREGATION_PUBLISH_LATENCY,
+    CORRECTED_TRANSACTIONS,
+    FAILED_PAYMENT_DROPS,
+    OUT_OF_ORDER_RECEIPTS,
+    EDGE_PARTIAL_AGGREGATES,
+)
+from datetime import datetime, timezone
+from pydantic import ValidationError
+from typing import TYPE_CHECKING, Callable
+import functools
 import os
+import time
+import uuid
+
+if TYPE_CHECKING:
+    from solace_publisher import SolacePublisher
 
 # Initialize logger
 logger = setup_logger()
@@ -19,20 +49,143 @@ POS_TRANSACTION_CONFIG = {
 # Setup topic root for POS transactions
 POS_TOPIC_PREFIX = os.getenv("BROKER_POS_TOPIC_PREFIX")
 
-# Initialize the SolacePublisher for POS transactions
-POS_PUBLISHER = SolacePublisher(config=POS_TRANSACTION_CONFIG)
+# Codec of published payloads (MESSAGE_CODEC)
+MESSAGE_CODEC = create_codec()
+
+# Worker pool publishing POS transactions, each worker with its own connection
+# (connected in the application's startup event)
+PUBLISH_POOL = PublishWorkerPool(
+    config=POS_TRANSACTION_CONFIG,
+    worker_count=int(os.getenv("PUBLISH_WORKERS", "4")),
+    queue_size=int(os.getenv("PUBLISH_QUEUE_SIZE", "1000")),
+)
+
+
+def publish_partial_aggregate(
+    store_id: str,
+    start_ms: int,
+    end_ms: int,
+    total_cents: int,
+    positions: list[tuple[int, int]] = None,
+    timeout: float = 0,
+):
+    """
+    Queues the publishing of a closed edge aggregation window as a partial aggregate.
+
+    The partial carries the window bounds as its aggregation period, so that
+    consumers can assign it to the same window as the pipeline's aggregates. The
+    write-ahead log records of its receipts are confirmed once it is published.
+
+    Args:
+        store_id (str): The store of the window.
+        start_ms (int): Start of the window in epoch milliseconds.
+        end_ms (int): End of the window in epoch milliseconds.
+        total_cents (int): The total of the window's receipts in cents.
+        positions (list[tuple[int, int]]): The write-ahead log positions of the window's
+            receipts.
+        timeout (float): Time in seconds to wait for space in the publish queue
+            (0 to not wait).
+
+    Raises:
+        queue.Full: If the publish queue of the store's worker is (still) full.
+    """
+    if total_cents <= 0:
+        confirm_logged(positions)
+        return
+    aggregated_event = AggregatedEvent(
+        event_id=uuid.uuid4(),
+        store_id=store_id,
+        total_amount=total_cents / 100,
+        begin_stream_aggregator=datetime.fromtimestamp(start_ms / 1000, tz=timezone.utc).isoformat(),
+        end_stream_aggregator=datetime.fromtimestamp(end_ms / 1000, tz=timezone.utc).isoformat(),
+    )
+    PUBLISH_POOL.submit(
+        store_id,
+        send_partial_aggregate,
+        aggregated_event,
+        positions,
+        block=timeout > 0,
+        timeout=timeout or None,
+    )
+    EDGE_PARTIAL_AGGREGATES.inc()
+
+
+# In-process pre-aggregation of accepted receipts (EDGE_AGGREGATION, started in the
+# application's startup event)
+EDGE_AGGREGATOR = EdgeAggregator(emit=publish_partial_aggregate) if EDGE_AGGREGATION else None
+
+# Write-ahead log of accepted transactions (WAL_DIR, opened in the application's
+# startup event)
+TRANSACTION_WAL = create_wal()
+
+# Event time of the last published receipt per store. A store is always published by
+# the same worker (its ordered lane), so each entry is only accessed by one thread.
+_last_event_times = {}
+
+
+def send_partial_aggregate(
+    publisher: "SolacePublisher",
+    aggregated_event: AggregatedEvent,
+    positions: list[tuple[int, int]] = None,
+):
+    """
+    Publishes a partial aggregate and confirms the log records of its receipts.
+
+    Runs on a publish worker thread (see `PUBLISH_POOL`). The receipts are confirmed
+    once the partial was handed off (see `SolacePublisher.publish_message`). If it
+    could not be published, they stay in the write-ahead log and are aggregated again
+    by the next process that opens it.
+
+    Args:
+        publisher (SolacePublisher): The publisher of the executing worker.
+        aggregated_event (AggregatedEvent): The partial aggregate.
+        positions (list[tuple[int, int]]): The write-ahead log positions of the window's
+            receipts.
+    """
+    send_aggregations(
+        publisher, aggregated_event, None, True, functools.partial(confirm_logged, positions)
+    )
+
+
+def confirm_logged(positions: list[tuple[int, int]] = None):
+    """
+    Confirms write-ahead log records, one per entry of `positions`.
+
+    Args:
+        positions (list[tuple[int, int]]): The positions of the records, or None.
+    """
+    for position in positions or ():
+        TRANSACTION_WAL.confirm(position)
 
 
-async def correct_transaction(transaction: Transaction):
+def correct_transaction(
+    publisher: "SolacePublisher",
+    transaction: Transaction,
+    accepted_at: float = None,
+    position: tuple[int, int] = None,
+):
     """
     Corrects a POS transaction and publishes it to a Solace topic.
 
+    Runs on a publish worker thread (see `PUBLISH_POOL`).
+
     - Validates the total amount of the transaction and corrects it if necessary.
     - Checks the payment status and logs any issues.
-    - Publishes the corrected transaction to a Solace topic.
+    - Adds the transaction to the edge pre-aggregation, if enabled (`EDGE_AGGREGATION`).
+    - Publishes the corrected transaction (see `publish_receipt`), unless receipts are
+      only pre-aggregated (`EDGE_SUPPRESS_RECEIPTS`).
+    - Confirms the transaction's write-ahead log record once its receipt was handed
+      off, or with the partial aggregate of its window if receipts are suppressed.
+      A failed payment is confirmed right away. A transaction whose receipt could not
+      be published stays in the log and is republished by the next process that opens it.
 
     Args:
+        publisher (SolacePublisher): The publisher of the executing worker.
         transaction (Transaction): The transaction object to be corrected and published.
+        accepted_at (float): `time.perf_counter()` value when the request was accepted,
+            used to record the background task lag.
+        position (tuple[int, int]): The write-ahead log position of the transaction
+            (see `WriteAheadLog.append`), or None.
 
     OpenTelemetry Attributes:
         - `transaction.id`: The unique identifier of the transaction.
@@ -45,15 +198,26 @@ async def correct_transaction(transaction: Transaction):
         - Warnings if the payment status is not successful.
     """
     tracer = trace.get_tracer(__name__)
-    with tracer.start_as_current_span("correct_transaction") as span:
+
+    # Corrected and failed transactions are sampled if the span starts a trace (e.g.
+    # recovered from the write-ahead log); otherwise the span is exported even if the
+    # request's trace is not sampled (see `ErrorSpanProcessor`)
+    calculated_total = sum(item.total_price for item in transaction.items)
+    needs_correction = calculated_total != transaction.total_amount
+    force_sample = needs_correction or transaction.payment_status != "success"
+    confirm = functools.partial(confirm_logged, [position] if position is not None else None)
+
+    with tracer.start_as_current_span(
+        "correct_transaction", attributes={FORCE_SAMPLE_ATTRIBUTE: 1} if force_sample else None
+    ) as span:
         span.set_attribute("transaction.id", str(transaction.transaction_id))
         span.set_attribute("transaction.store_id", transaction.store_id)
         span.set_attribute("transaction.total_amount", transaction.total_amount)
 
         # Correct the transaction total if necessary
-        calculated_total = sum(item.total_price for item in transaction.items)
-        if calculated_total != transaction.total_amount:
+        if needs_correction:
             transaction.total_amount = round(calculated_total, 2)
+            CORRECTED_TRANSACTIONS.inc()
             span.set_attribute("transaction.corrected_total", transaction.total_amount)
             logger.info(
                 f"Corrected total for transaction {transaction.transaction_id}: {transaction.total_amount}"
@@ -62,37 +226,141 @@ async def correct_transaction(transaction: Transaction):
         # Handle payment status
         if transaction.payment_status != "success":
             span.set_attribute("transaction.payment_status", "failed")
+            FAILED_PAYMENT_DROPS.inc()
             logger.warning(
                 f"Transaction {transaction.transaction_id} failed payment validation."
             )
+            confirm()
         else:
             span.set_attribute("transaction.payment_status", "success")
-            # Construct topic and publish message
-            topic = (
-                f"{POS_TOPIC_PREFIX}/receipt/{transaction.store_id}/{transaction.cashier_id}/"
-                f"{transaction.payment_method}/{transaction.payment_status}/{transaction.timestamp}/"
-                f"{transaction.transaction_id}/{transaction.total_amount}/{transaction.receipt.receipt_id}/"
-                f"{transaction.customer_id}"
+            properties = routing_properties(
+                transaction.store_id, transaction.timestamp, transaction.total_amount
             )
-            message = transaction.model_dump_json()
 
-            with tracer.start_as_current_span("publish_to_solace") as publish_span:
-                publish_span.set_attribute("solace.topic", topic)
-                POS_PUBLISHER.publish_message(topic, message, "transaction_id")
-                logger.info(
-                    f"Transaction {transaction.transaction_id} published to topic {topic}."
+            # Add the receipt to the edge pre-aggregation
+            if EDGE_AGGREGATOR and EDGE_SUPPRESS_RECEIPTS:
+                EDGE_AGGREGATOR.add(
+                    transaction.store_id,
+                    properties[EVENT_TIME_PROPERTY],
+                    properties[TOTAL_CENTS_PROPERTY],
+                    position,
                 )
+                span.set_attribute("transaction.publish_suppressed", True)
+            else:
+                if EDGE_AGGREGATOR:
+                    EDGE_AGGREGATOR.add(
+                        transaction.store_id,
+                        properties[EVENT_TIME_PROPERTY],
+                        properties[TOTAL_CENTS_PROPERTY],
+                    )
+                publish_receipt(publisher, transaction, properties, confirm)
+
+        if accepted_at is not None:
+            RECEIPT_TASK_LAG.observe(time.perf_counter() - accepted_at)
+
+
+def recover_transactions():
+    """
+    Opens the write-ahead log and queues the transactions left unpublished by a
+    previous process, in their original order.
+
+    Called in the application's startup event after the publish workers were
+    started; waits for space in the worker queues.
+    """
+    for position, record in TRANSACTION_WAL.open():
+        try:
+            transaction = Transaction.model_validate_json(record)
+        except ValidationError as e:
+            logger.error(f"Discarding unreadable transaction from the write-ahead log: {e}")
+            TRANSACTION_WAL.confirm(position)
+            continue
+        PUBLISH_POOL.submit(
+            transaction.store_id, correct_transaction, transaction, None, position, block=True
+        )
+
+
+def publish_receipt(
+    publisher: "SolacePublisher",
+    transaction: Transaction,
+    properties: dict,
+    on_durable: Callable[[], None] = None,
+):
+    """
+    Publishes a validated receipt to its Solace topic.
 
+    - Encodes the receipt with `MESSAGE_CODEC` and attaches its typed routing properties.
+    - Counts receipts whose event time precedes the last published receipt of their store.
 
-async def send_aggregations(aggregation_per_store: AggregatedEvent):
+    Args:
+        publisher (SolacePublisher): The publisher of the executing worker.
+        transaction (Transaction): The corrected transaction.
+        properties (dict): The routing properties of the receipt (see `routing_properties`).
+        on_durable (Callable): Optional function called once the receipt was handed off
+            (see `SolacePublisher.publish_message`).
+    """
+    tracer = trace.get_tracer(__name__)
+
+    # Construct topic and publish message
+    topic = (
+        f"{POS_TOPIC_PREFIX}/receipt/{transaction.store_id}/{transaction.cashier_id}/"
+        f"{transaction.payment_method}/{transaction.payment_status}/{transaction.timestamp}/"
+        f"{transaction.transaction_id}/{transaction.total_amount}/{transaction.receipt.receipt_id}/"
+        f"{transaction.customer_id}"
+    )
+    message = MESSAGE_CODEC.encode(transaction)
+
+    # Count receipts published with an earlier event time than their predecessor
+    event_time = properties[EVENT_TIME_PROPERTY]
+    if event_time < _last_event_times.get(transaction.store_id, event_time):
+        OUT_OF_ORDER_RECEIPTS.inc()
+    else:
+        _last_event_times[transaction.store_id] = event_time
+
+    with tracer.start_as_current_span("publish_to_solace") as publish_span:
+        publish_span.set_attribute("solace.topic", topic)
+        publish_start = time.perf_counter()
+        publisher.publish_message(
+            topic,
+            message,
+            str(transaction.transaction_id),
+            MESSAGE_CODEC.content_type,
+            properties,
+            on_durable,
+        )
+        RECEIPT_PUBLISH_LATENCY.observe(time.perf_counter() - publish_start)
+        logger.info(
+            f"Transaction {transaction.transaction_id} published to topic {topic}."
+        )
+
+
+def send_aggregations(
+    publisher: "SolacePublisher",
+    aggregation_per_store: AggregatedEvent,
+    accepted_at: float = None,
+    partial: bool = False,
+    on_durable: Callable[[], None] = None,
+):
     """
     Publishes aggregated data for a store to a Solace topic.
 
+    Runs on a publish worker thread (see `PUBLISH_POOL`).
+
     - Constructs a topic based on the store ID and aggregation details.
     - Publishes the aggregation event to the topic.
+    - Publishes partial aggregates on the separate `{prefix}/aggregations/partial/...`
+      topics instead, which the per-store aggregation queues do not subscribe to. They
+      carry the routing properties of a receipt (with the window start as event time)
+      and the `receipts_suppressed` property, so that the aggregation pipeline folds
+      them into its windows in place of their suppressed receipts.
 
     Args:
+        publisher (SolacePublisher): The publisher of the executing worker.
         aggregation_per_store (AggregatedEvent): The aggregated event object to be published.
+        accepted_at (float): `time.perf_counter()` value when the request was accepted,
+            used to record the background task lag.
+        partial (bool): Whether the event is a partial aggregate of the edge pre-aggregation.
+        on_durable (Callable): Optional function called once the event was handed off
+            (see `SolacePublisher.publish_message`).
 
     OpenTelemetry Attributes:
         - `event.id`: The unique identifier of the aggregated event.
@@ -108,14 +376,38 @@ async def send_aggregations(aggregation_per_store: AggregatedEvent):
 
         # Construct topic and publish message
         topic = (
-            f"{POS_TOPIC_PREFIX}/aggregations/{aggregation_per_store.store_id}/"
-            f"{aggregation_per_store.event_id}/{aggregation_per_store.total_amount}"
+            f"{POS_TOPIC_PREFIX}/aggregations/{'partial/' if partial else ''}"
+            f"{aggregation_per_store.store_id}/{aggregation_per_store.event_id}/"
+            f"{aggregation_per_store.total_amount}"
         )
-        message = aggregation_per_store.model_dump_json()
+        message = MESSAGE_CODEC.encode(aggregation_per_store)
+        properties = None
+        if partial:
+            properties = {
+                PARTIAL_AGGREGATE_PROPERTY: True,
+                RECEIPTS_SUPPRESSED_PROPERTY: EDGE_SUPPRESS_RECEIPTS,
+                **routing_properties(
+                    aggregation_per_store.store_id,
+                    aggregation_per_store.begin_stream_aggregator,
+                    aggregation_per_store.total_amount,
+                ),
+            }
 
         with tracer.start_as_current_span("publish_to_solace") as publish_span:
             publish_span.set_attribute("solace.topic", topic)
-            POS_PUBLISHER.publish_message(topic, message, "event_id")
+            publish_start = time.perf_counter()
+            publisher.publish_message(
+                topic,
+                message,
+                str(aggregation_per_store.event_id),
+                MESSAGE_CODEC.content_type,
+                properties,
+                on_durable,
+            )
+            AGGREGATION_PUBLISH_LATENCY.observe(time.perf_counter() - publish_start)
             logger.info(
                 f"Aggregated event {aggregation_per_store.event_id} published to topic {topic}."
             )
+
+    if accepted_at is not None:
+        AGGREGATION_TASK_LAG.observe(time.perf_counter() - accepted_at)
@@ -0,0 +1,95 @@
+import os
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from logger_config import setup_logger
+from common.compression import DECOMPRESSORS
+
+# Initialize logger
+logger = setup_logger()
+
+# Maximum size of a decompressed request body (protects against decompression bombs)
+MAX_DECOMPRESSED_BODY_SIZE = int(os.getenv("MAX_DECOMPRESSED_BODY_SIZE", str(10 * 1024 * 1024)))
+
+
+class RequestDecompressionMiddleware:
+    """
+    ASGI middleware that decompresses request bodies with `Content-Encoding` gzip or zstd.
+
+    The endpoints receive the decompressed body without the `Content-Encoding` header.
+    Requests are rejected with:
+    - Status code 415: If the content encoding is not supported.
+    - Status code 400: If the body cannot be decompressed or is truncated.
+    - Status code 413: If the compressed or decompressed body exceeds `max_size`.
+    """
+
+    def __init__(self, app: ASGIApp, max_size: int = MAX_DECOMPRESSED_BODY_SIZE):
+        """
+        Initializes the middleware.
+
+        Args:
+            app (ASGIApp): The wrapped application.
+            max_size (int): Maximum size of a decompressed request body in bytes.
+        """
+        self.app = app
+        self.max_size = max_size
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        encoding = None
+        headers = []
+        for name, value in scope["headers"]:
+            if name == b"content-encoding":
+                encoding = value.strip().lower()
+            elif name != b"content-length":
+                headers.append((name, value))
+
+        if encoding is None or encoding == b"identity":
+            await self.app(scope, receive, send)
+            return
+
+        decompress = DECOMPRESSORS.get(encoding)
+        if decompress is None:
+            await self._reject(scope, receive, send, 415, f"Unsupported content encoding: {encoding.decode()}")
+            return
+
+        chunks = []
+        size = 0
+        more_body = True
+        while more_body:
+            message = await receive()
+            chunk = message.get("body", b"")
+            size += len(chunk)
+            if size > self.max_size:
+                await self._reject(scope, receive, send, 413, "Request body too large")
+                return
+            chunks.append(chunk)
+            more_body = message.get("more_body", False)
+
+        try:
+            body = decompress(b"".join(chunks), self.max_size)
+        except Exception as e:
+            logger.error(f"Failed to decompress {encoding.decode()} request body: {e}")
+            await self._reject(scope, receive, send, 400, "Request body could not be decompressed")
+            return
+        if len(body) > self.max_size:
+            await self._reject(scope, receive, send, 413, "Decompressed request body too large")
+            return
+
+        headers.append((b"content-length", str(len(body)).encode()))
+        body_sent = False
+
+        async def receive_decompressed() -> Message:
+            nonlocal body_sent
+            if body_sent:
+                return await receive()
+            body_sent = True
+            return {"type": "http.request", "body": body, "more_body": False}
+
+        await self.app(dict(scope, headers=headers), receive_decompressed, send)
+
+    async def _reject(self, scope: Scope, receive: Receive, send: Send, status_code: int, detail: str):
+        response = JSONResponse(status_code=status_code, content={"detail": detail})
+        await response(scope, receive, send)
@@ -0,0 +1,185 @@
+import os
+import queue
+import threading
+import time
+from logger_config import setup_logger
+from metrics import EDGE_AGGREGATED_RECEIPTS
+from typing import Callable
+
+# Initialize logger
+logger = setup_logger()
+
+# Edge pre-aggregation: keep per-store window totals and publish them as partial aggregates
+EDGE_AGGREGATION = os.getenv("EDGE_AGGREGATION", "false").lower() == "true"
+
+# Tumbling window length (aligned to the epoch like the aggregation pipeline's windows),
+# wall-clock delay after the window end before it is published, and flush interval
+EDGE_WINDOW_SECONDS = float(os.getenv("EDGE_WINDOW_SECONDS", "10"))
+EDGE_ALLOWED_LATENESS = float(os.getenv("EDGE_ALLOWED_LATENESS", "2"))
+EDGE_FLUSH_INTERVAL = float(os.getenv("EDGE_FLUSH_INTERVAL", "1"))
+
+# Maximum time the final flush on shutdown waits for space in the publish queues
+EDGE_SHUTDOWN_TIMEOUT = float(os.getenv("EDGE_SHUTDOWN_TIMEOUT", "10"))
+
+# Whether receipts are only aggregated and no longer published individually
+EDGE_SUPPRESS_RECEIPTS = os.getenv("EDGE_SUPPRESS_RECEIPTS", "false").lower() == "true"
+
+
+class EdgeAggregator:
+    """
+    Keeps rolling per-store totals of tumbling event time windows and emits them
+    as partial aggregates once a window has closed.
+
+    The state of a window is its total in cents and the write-ahead log positions
+    of its receipts, keyed by store and window start. The positions are emitted with
+    the window, so that their records are only confirmed once the partial is
+    published. Receipts arriving after their window was emitted open a new partial
+    for that window, so consumers sum all partials of a store and window.
+
+    Methods:
+        add(store_id, event_time_ms, total_cents, position): Adds a receipt to its window.
+        flush(now_ms, deadline): Emits the windows closed at `now_ms` (all if None).
+        start(): Starts the background flush thread.
+        stop(): Stops the flush thread and emits all remaining windows.
+    """
+
+    def __init__(
+        self,
+        emit: Callable[[str, int, int, int, list, float], None],
+        window_seconds: float = EDGE_WINDOW_SECONDS,
+        allowed_lateness: float = EDGE_ALLOWED_LATENESS,
+        flush_interval: float = EDGE_FLUSH_INTERVAL,
+        shutdown_timeout: float = EDGE_SHUTDOWN_TIMEOUT,
+    ):
+        """
+        Initializes the aggregator without any open windows.
+
+        Args:
+            emit (Callable): Called as
+                `emit(store_id, start_ms, end_ms, total_cents, positions, timeout)` per
+                closed window, with the window bounds in epoch milliseconds, the log
+                positions of its receipts and the time in seconds to wait for queue
+                space (0 to not wait). May raise
+                `queue.Full`, in which case the window is kept and emitted again on the
+                next flush.
+            window_seconds (float): Length of the tumbling windows.
+            allowed_lateness (float): Delay after the window end before it is emitted.
+            flush_interval (float): Interval of the background flush.
+            shutdown_timeout (float): Time the final flush in `stop` waits for queue space.
+        """
+        self.emit = emit
+        self.window_ms = int(window_seconds * 1000)
+        self.lateness_ms = int(allowed_lateness * 1000)
+        self.flush_interval = flush_interval
+        self.shutdown_timeout = shutdown_timeout
+        self._windows = {}
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def add(
+        self, store_id: str, event_time_ms: int, total_cents: int, position: tuple[int, int] = None
+    ):
+        """
+        Adds a receipt to the window of its event time.
+
+        Args:
+            store_id (str): The store of the receipt.
+            event_time_ms (int): The event time in epoch milliseconds.
+            total_cents (int): The total of the receipt in cents.
+            position (tuple[int, int]): The write-ahead log position of the receipt to
+                confirm once the window is published, or None.
+        """
+        key = (store_id, event_time_ms - event_time_ms % self.window_ms)
+        with self._lock:
+            window = self._windows.get(key)
+            if window is None:
+                window = self._windows[key] = [0, []]
+            window[0] += total_cents
+            if position is not None:
+                window[1].append(position)
+        EDGE_AGGREGATED_RECEIPTS.inc()
+
+    def flush(self, now_ms: int = None, deadline: float = None):
+        """
+        Emits the windows whose end plus the allowed lateness has passed.
+
+        Args:
+            now_ms (int): The current time in epoch milliseconds, or None to emit all windows.
+            deadline (float): `time.monotonic()` value until which to wait for queue space,
+                or None to not wait and keep the remaining windows for the next flush.
+
+        Returns:
+            int: The number of windows that could not be emitted.
+        """
+        with self._lock:
+            closed = [
+                key
+                for key in self._windows
+                if now_ms is None or key[1] + self.window_ms + self.lateness_ms <= now_ms
+            ]
+            windows = [(key, self._windows.pop(key)) for key in closed]
+
+        for index, ((store_id, start_ms), (total_cents, positions)) in enumerate(windows):
+            timeout = 0 if deadline is None else max(deadline - time.monotonic(), 0)
+            try:
+                self.emit(store_id, start_ms, start_ms + self.window_ms, total_cents, positions, timeout)
+            except queue.Full:
+                if deadline is None:
+                    logger.warning(f"Publish queue full, retrying {len(windows) - index} partial aggregates")
+                self._restore(windows[index:])
+                return len(windows) - index
+        return 0
+
+    def _restore(self, windows):
+        """
+        Merges windows that could not be emitted back into the state.
+
+        Args:
+            windows (list): The (key, window) pairs to restore.
+        """
+        with self._lock:
+            for key, (total_cents, positions) in windows:
+                window = self._windows.get(key)
+                if window is None:
+                    self._windows[key] = [total_cents, positions]
+                else:
+                    window[0] += total_cents
+                    window[1].extend(positions)
+
+    def _run(self):
+        """
+        Emits closed windows every flush interval until stopped.
+        """
+        while not self._stopped.wait(self.flush_interval):
+            try:
+                self.flush(int(time.time() * 1000))
+            except Exception as e:
+                logger.error(f"Edge aggregation flush failed: {e}")
+
+    def start(self):
+        """
+        Starts the background flush thread.
+        """
+        self._thread = threading.Thread(target=self._run, name="edge-aggregator", daemon=True)
+        self._thread.start()
+        logger.info(
+            f"Edge aggregation started ({self.window_ms} ms windows, {self.lateness_ms} ms lateness)"
+        )
+
+    def stop(self):
+        """
+        Stops the background flush thread and emits all remaining windows.
+
+        Waits up to the shutdown timeout for space in the publish queues, so that
+        the windows are not dropped while the workers drain their backlog. The log
+        records of dropped windows stay unconfirmed and are recovered on restart.
+        """
+        self._stopped.set()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+        dropped = self.flush(deadline=time.monotonic() + self.shutdown_timeout)
+        if dropped:
+            logger.error(f"Publish queue full on shutdown, dropped {dropped} partial aggregates")
+        logger.info("Edge aggregation stopped")
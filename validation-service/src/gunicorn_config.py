@@ -0,0 +1,33 @@
+import multiprocessing
+import os
+from prometheus_client import multiprocess
+
+# ------------------------------------------------------------------------------
+# Gunicorn configuration for running the validation service with multiple
+# Uvicorn worker processes. Each worker imports the application after the fork
+# and connects its own publish workers in the FastAPI startup event.
+# ------------------------------------------------------------------------------
+
+bind = f"0.0.0.0:{os.getenv('SERVER_PORT', '8000')}"
+workers = int(os.getenv("WEB_CONCURRENCY", multiprocessing.cpu_count()))
+worker_class = "uvicorn.workers.UvicornWorker"
+loglevel = "error"
+
+# The application must be imported per worker so that broker connections and
+# span exporter threads are never shared across a fork
+preload_app = False
+
+# Time given to workers to drain their publish queues on shutdown
+graceful_timeout = int(os.getenv("SERVER_GRACEFUL_TIMEOUT", "30"))
+
+
+def child_exit(server, worker):
+    """
+    Removes the Prometheus metric files of a worker process that exited.
+
+    Args:
+        server (Arbiter): The Gunicorn arbiter.
+        worker (Worker): The worker process that exited.
+    """
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        multiprocess.mark_process_dead(worker.pid)
@@ -0,0 +1,25 @@
+import multiprocessing
+import os
+
+# ------------------------------------------------------------------------------
+# Hypercorn configuration for serving the validation service over HTTP/2
+# cleartext (h2c). Hypercorn accepts h2c with prior knowledge (as sent by
+# Traefik with the `h2c` server scheme) and HTTP/1.1 on the same port, so
+# health checks and HTTP/1.1 clients keep working.
+#
+# Hypercorn has no hook for exited workers like Gunicorn's `child_exit`, so
+# every worker removes its own Prometheus metric files from
+# PROMETHEUS_MULTIPROC_DIR in the application's shutdown (see `lifespan`).
+# ------------------------------------------------------------------------------
+
+bind = [f"0.0.0.0:{os.getenv('SERVER_PORT', '8000')}"]
+workers = int(os.getenv("WEB_CONCURRENCY", multiprocessing.cpu_count()))
+worker_class = "asyncio"
+loglevel = "ERROR"
+
+# Many multiplexed streams per connection instead of many connections
+h2_max_concurrent_streams = int(os.getenv("SERVER_H2_MAX_CONCURRENT_STREAMS", "256"))
+keep_alive_timeout = int(os.getenv("SERVER_KEEP_ALIVE_TIMEOUT", "75"))
+
+# Time given to workers to drain their publish queues on shutdown
+graceful_timeout = int(os.getenv("SERVER_GRACEFUL_TIMEOUT", "30"))
@@ -0,0 +1,114 @@
+import os
+from datetime import datetime, timezone
+from pydantic import BaseModel
+
+# User property carrying the content type of a message payload
+CONTENT_TYPE_PROPERTY = "content_type"
+
+# Typed user properties carrying the routing keys of a receipt, so that consumers
+# can key and window receipts without reading the payload
+STORE_ID_PROPERTY = "store_id"
+EVENT_TIME_PROPERTY = "event_time_ms"
+TOTAL_CENTS_PROPERTY = "total_cents"
+
+# Boolean user property marking aggregations published by the edge pre-aggregation,
+# which consumers sum per store and window
+PARTIAL_AGGREGATE_PROPERTY = "partial_aggregate"
+
+# Boolean user property of a partial aggregate telling whether its receipts were not
+# published individually, so that the aggregation pipeline folds it instead of them
+RECEIPTS_SUPPRESSED_PROPERTY = "receipts_suppressed"
+
+
+class JsonCodec:
+    """
+    Encodes messages as JSON strings (readable by every consumer).
+    """
+
+    content_type = "application/json"
+
+    def encode(self, model: BaseModel) -> str:
+        """
+        Encodes a model as JSON.
+
+        Args:
+            model (BaseModel): The model to encode.
+
+        Returns:
+            str: The JSON document.
+        """
+        return model.model_dump_json()
+
+
+class MsgpackCodec:
+    """
+    Encodes messages as MessagePack, a compact binary form of the JSON document.
+
+    The `msgpack` package is imported lazily, so that it is only required when
+    this codec is selected.
+    """
+
+    content_type = "application/msgpack"
+
+    def __init__(self):
+        import msgpack
+
+        self._packb = msgpack.packb
+
+    def encode(self, model: BaseModel) -> bytearray:
+        """
+        Encodes a model as MessagePack.
+
+        Args:
+            model (BaseModel): The model to encode.
+
+        Returns:
+            bytearray: The MessagePack document (the Solace message builder accepts
+                binary payloads only as `bytearray`, not `bytes`).
+        """
+        return bytearray(self._packb(model.model_dump(mode="json")))
+
+
+def routing_properties(store_id: str, timestamp: str, total_amount: float) -> dict:
+    """
+    Builds the typed routing properties of a receipt.
+
+    Args:
+        store_id (str): The store identifier.
+        timestamp (str): The event time in ISO 8601 format (UTC).
+        total_amount (float): The total amount.
+
+    Returns:
+        dict: `store_id` (str), `event_time_ms` (int, epoch milliseconds) and
+            `total_cents` (int).
+    """
+    event_time = datetime.fromisoformat(timestamp.replace("Z", "+00:00"))
+    if event_time.tzinfo is None:
+        event_time = event_time.replace(tzinfo=timezone.utc)
+    return {
+        STORE_ID_PROPERTY: store_id,
+        EVENT_TIME_PROPERTY: round(event_time.timestamp() * 1000),
+        TOTAL_CENTS_PROPERTY: round(total_amount * 100),
+    }
+
+
+CODECS = {
+    "json": JsonCodec,
+    "msgpack": MsgpackCodec,
+}
+
+
+def create_codec():
+    """
+    Creates the message codec configured via `MESSAGE_CODEC` ("json" (default) or "msgpack").
+
+    Returns:
+        JsonCodec or MsgpackCodec: The codec used for published payloads.
+
+    Raises:
+        ValueError: If the codec is unknown.
+    """
+    name = os.getenv("MESSAGE_CODEC", "json")
+    if name not in CODECS:
+        raise ValueError(f"Unknown message codec: {name}")
+    return CODECS[name]()
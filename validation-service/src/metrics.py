@@ -0,0 +1,123 @@
+from prometheus_client import Counter, Gauge, Histogram
+
+# Prometheus Metrics for the publish path (exposed by the instrumentator on /metrics,
+# aggregated across worker processes when PROMETHEUS_MULTIPROC_DIR is set)
+BACKGROUND_TASK_LAG = Histogram(
+    "background_task_lag_seconds",
+    "Time from a request being accepted to its background publish completing",
+    ["task"],
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+PUBLISH_LATENCY = Histogram(
+    "solace_publish_latency_seconds",
+    "Latency of publishing a message to the Solace broker",
+    ["topic_family"],
+    buckets=(0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.5),
+)
+PUBLISH_FAILURES = Counter(
+    "solace_publish_failures_total", "Number of failed Solace publishes", ["source"]
+)
+BROKER_SERVICE_EVENTS = Counter(
+    "solace_service_events_total",
+    "Number of reconnection and interruption events of the messaging service",
+    ["event"],
+)
+PUBLISH_BACKLOG = Gauge(
+    "publish_queue_backlog",
+    "Number of jobs waiting in the publish worker queues",
+    multiprocess_mode="livesum",
+)
+PUBLISH_REJECTIONS = Counter(
+    "publish_queue_rejections_total", "Number of requests rejected because the publish queue was full"
+)
+SHED_REQUESTS = Counter(
+    "admission_shed_requests_total",
+    "Number of requests rejected by admission control",
+    ["username", "reason"],
+)
+CORRECTED_TRANSACTIONS = Counter(
+    "transactions_corrected_total", "Number of transactions with a corrected total amount"
+)
+FAILED_PAYMENT_DROPS = Counter(
+    "transactions_failed_payment_dropped_total",
+    "Number of transactions dropped because of a failed payment",
+)
+OUT_OF_ORDER_RECEIPTS = Counter(
+    "receipts_out_of_order_total",
+    "Number of receipts published with an earlier event time than the previous receipt of their store",
+)
+EDGE_AGGREGATED_RECEIPTS = Counter(
+    "edge_aggregated_receipts_total", "Number of receipts added to the edge pre-aggregation"
+)
+EDGE_PARTIAL_AGGREGATES = Counter(
+    "edge_partial_aggregates_total", "Number of partial aggregates published by the edge pre-aggregation"
+)
+OUTBOX_APPENDED = Counter(
+    "outbox_appended_total", "Number of messages stored in the outbox while the broker was unavailable"
+)
+OUTBOX_DRAINED = Counter(
+    "outbox_drained_total", "Number of messages republished from the outbox"
+)
+OUTBOX_DROPPED = Counter(
+    "outbox_dropped_total", "Number of messages dropped because the outbox was full"
+)
+OUTBOX_FSYNCS = Counter("outbox_fsyncs_total", "Number of fsyncs of outbox segments")
+OUTBOX_BACKLOG_BYTES = Gauge(
+    "outbox_backlog_bytes",
+    "Size of the messages waiting in the outbox",
+    multiprocess_mode="livesum",
+)
+WAL_COMMIT_BATCH = Histogram(
+    "wal_commit_batch_size",
+    "Number of accepted transactions made durable by one fsync of the write-ahead log",
+    buckets=(1, 2, 5, 10, 25, 50, 100, 250, 500, 1000),
+)
+WAL_FSYNC_LATENCY = Histogram(
+    "wal_fsync_latency_seconds",
+    "Duration of an fsync of the write-ahead log",
+    buckets=(0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.5),
+)
+WAL_RECOVERED = Counter(
+    "wal_recovered_transactions_total",
+    "Number of unpublished transactions recovered from the write-ahead log on startup",
+)
+WAL_PENDING = Gauge(
+    "wal_pending_transactions",
+    "Number of logged transactions whose publish was not confirmed yet",
+    multiprocess_mode="livesum",
+)
+
+# Python runtime metrics (updated by the runtime monitor of each worker process)
+EVENT_LOOP_LAG = Histogram(
+    "runtime_event_loop_lag_seconds",
+    "Delay of a scheduled event loop callback beyond its due time",
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5),
+)
+GC_COLLECTIONS = Counter(
+    "runtime_gc_collections_total", "Number of garbage collections", ["generation"]
+)
+GC_PAUSE = Histogram(
+    "runtime_gc_pause_seconds",
+    "Duration of garbage collections (the interpreter is paused meanwhile)",
+    ["generation"],
+    buckets=(0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.5),
+)
+PROCESS_THREADS = Gauge(
+    "runtime_threads", "Number of threads of the worker process", multiprocess_mode="liveall"
+)
+PROCESS_RSS = Gauge(
+    "runtime_resident_memory_bytes",
+    "Resident set size of the worker process",
+    multiprocess_mode="liveall",
+)
+
+# Label children are bound once instead of per message
+RECEIPT_TASK_LAG = BACKGROUND_TASK_LAG.labels(task="correct_transaction")
+AGGREGATION_TASK_LAG = BACKGROUND_TASK_LAG.labels(task="send_aggregations")
+RECEIPT_PUBLISH_LATENCY = PUBLISH_LATENCY.labels(topic_family="receipt")
+AGGREGATION_PUBLISH_LATENCY = PUBLISH_LATENCY.labels(topic_family="aggregations")
+PUBLISH_FAILURES_SYNC = PUBLISH_FAILURES.labels(source="publish")
+PUBLISH_FAILURES_ASYNC = PUBLISH_FAILURES.labels(source="failure_listener")
+RECONNECTED_EVENTS = BROKER_SERVICE_EVENTS.labels(event="reconnected")
+RECONNECTING_EVENTS = BROKER_SERVICE_EVENTS.labels(event="reconnecting")
+INTERRUPTED_EVENTS = BROKER_SERVICE_EVENTS.labels(event="interrupted")
@@ -0,0 +1,401 @@
+import fcntl
+import json
+import os
+import struct
+import time
+import zlib
+from logger_config import setup_logger
+from metrics import (
+    OUTBOX_APPENDED,
+    OUTBOX_DRAINED,
+    OUTBOX_DROPPED,
+    OUTBOX_BACKLOG_BYTES,
+    OUTBOX_FSYNCS,
+)
+from typing import Any, BinaryIO, Callable
+
+# Initialize logger
+logger = setup_logger()
+
+# Directory of the store-and-forward outboxes (disabled if empty)
+OUTBOX_DIR = os.getenv("OUTBOX_DIR", "")
+
+# Size of a segment file and maximum backlog of an outbox in bytes
+OUTBOX_SEGMENT_SIZE = int(os.getenv("OUTBOX_SEGMENT_SIZE", str(16 * 1024 * 1024)))
+OUTBOX_MAX_BYTES = int(os.getenv("OUTBOX_MAX_BYTES", str(512 * 1024 * 1024)))
+
+# Appended records are fsynced every OUTBOX_FSYNC_BATCH records or OUTBOX_FSYNC_INTERVAL seconds
+OUTBOX_FSYNC_BATCH = int(os.getenv("OUTBOX_FSYNC_BATCH", "256"))
+OUTBOX_FSYNC_INTERVAL = float(os.getenv("OUTBOX_FSYNC_INTERVAL", "0.05"))
+
+# Maximum number of messages per second republished from an outbox after a reconnect
+OUTBOX_DRAIN_RATE = float(os.getenv("OUTBOX_DRAIN_RATE", "2000"))
+
+# Record frame: payload length and CRC32, followed by the payload
+FRAME_HEADER = struct.Struct("<II")
+SEGMENT_SUFFIX = ".seg"
+CURSOR_FILE = "cursor"
+
+# Slot directories claimed by this process per base directory (see `claim_slot`),
+# with their lock files
+_slots = {}
+
+
+class Outbox:
+    """
+    A durable append-only log of messages that could not be published.
+
+    The log consists of numbered segment files of length-prefixed, checksummed
+    records. A cursor file stores the position of the first record not yet
+    republished. Segments behind the cursor are deleted.
+
+    - Appends are fsynced in batches (`fsync_batch` records or `fsync_interval`
+      seconds), so an outage does not cost one fsync per message. The callbacks
+      passed to `append` run once their record is fsynced.
+    - A new segment is started on every open, so that a torn record at the end
+      of a segment (crash during a write) only ends that segment. A torn record
+      within a segment is skipped up to the next intact record (see
+      `find_next_record`).
+    - Records are republished at least once: a crash between a publish and the
+      next cursor update republishes them again.
+
+    An outbox is used by a single publish worker thread.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        segment_size: int = OUTBOX_SEGMENT_SIZE,
+        max_bytes: int = OUTBOX_MAX_BYTES,
+        fsync_batch: int = OUTBOX_FSYNC_BATCH,
+        fsync_interval: float = OUTBOX_FSYNC_INTERVAL,
+    ):
+        """
+        Opens the outbox, recovering the records left by a previous process.
+
+        Args:
+            directory (str): The directory of the segment files.
+            segment_size (int): Size in bytes after which a new segment is started.
+            max_bytes (int): Maximum backlog in bytes; further records are dropped.
+            fsync_batch (int): Number of appended records per fsync.
+            fsync_interval (float): Maximum time in seconds before appended records are fsynced.
+        """
+        self.directory = directory
+        self.segment_size = segment_size
+        self.max_bytes = max_bytes
+        self.fsync_batch = fsync_batch
+        self.fsync_interval = fsync_interval
+        os.makedirs(directory, exist_ok=True)
+
+        self._segments = sorted(
+            int(name[: -len(SEGMENT_SUFFIX)])
+            for name in os.listdir(directory)
+            if name.endswith(SEGMENT_SUFFIX)
+        )
+        self._read_segment, self._read_offset = self._load_cursor()
+        self._segments = [segment for segment in self._segments if segment >= self._read_segment]
+        self.backlog_bytes = sum(
+            os.path.getsize(self._segment_path(segment)) for segment in self._segments
+        ) - (self._read_offset if self._read_segment in self._segments else 0)
+        self._reader = None
+
+        self._writer = None
+        self._write_segment = None
+        self._unsynced = 0
+        self._on_durable = []
+        self._last_sync = time.monotonic()
+        self._start_segment()
+        if self._read_segment not in self._segments:
+            self._read_segment, self._read_offset = self._segments[0], 0
+        OUTBOX_BACKLOG_BYTES.inc(self.backlog_bytes)
+        if self.backlog_bytes:
+            logger.warning(f"Recovered {self.backlog_bytes} bytes of unpublished messages in {directory}")
+
+    def _segment_path(self, segment: int) -> str:
+        return os.path.join(self.directory, f"{segment:016d}{SEGMENT_SUFFIX}")
+
+    def _load_cursor(self):
+        """
+        Reads the cursor file.
+
+        Returns:
+            tuple[int, int]: The segment and offset of the next record to republish.
+        """
+        try:
+            with open(os.path.join(self.directory, CURSOR_FILE)) as cursor:
+                segment, offset = json.load(cursor)
+                return segment, offset
+        except (OSError, ValueError):
+            return (self._segments[0] if self._segments else 0), 0
+
+    def _save_cursor(self):
+        """
+        Atomically replaces the cursor file with the current read position.
+        """
+        path = os.path.join(self.directory, CURSOR_FILE)
+        with open(f"{path}.tmp", "w") as cursor:
+            json.dump([self._read_segment, self._read_offset], cursor)
+        os.replace(f"{path}.tmp", path)
+
+    def _start_segment(self):
+        """
+        Closes the current segment and starts appending to a new one.
+        """
+        if self._writer:
+            self.sync()
+            self._writer.close()
+        self._write_segment = (self._segments[-1] + 1) if self._segments else max(self._read_segment, 1)
+        self._segments.append(self._write_segment)
+        self._writer = open(self._segment_path(self._write_segment), "ab")
+
+    def pending(self) -> bool:
+        """
+        Returns whether the outbox holds records that were not republished yet.
+        """
+        return self.backlog_bytes > 0
+
+    def has_capacity(self) -> bool:
+        """
+        Returns whether the backlog is below the size limit.
+        """
+        return self.backlog_bytes < self.max_bytes
+
+    def append(
+        self,
+        topic: str,
+        message: str | bytearray,
+        application_message_id: str,
+        content_type: str,
+        properties: dict[str, Any] = None,
+        on_durable: Callable[[], None] = None,
+    ) -> bool:
+        """
+        Appends a message to the outbox.
+
+        The record is durable after the next `sync`, which calls `on_durable`.
+
+        Args:
+            topic (str): The destination topic.
+            message (str | bytearray): The encoded message.
+            application_message_id (str): The application message ID.
+            content_type (str): The content type of the message.
+            properties (dict): Optional typed user properties.
+            on_durable (Callable): Optional function called once the record is fsynced.
+
+        Returns:
+            bool: True if the message was stored, False if the outbox is full.
+        """
+        header = json.dumps(
+            {
+                "topic": topic,
+                "id": application_message_id,
+                "content_type": content_type,
+                "properties": properties,
+                "text": isinstance(message, str),
+            }
+        ).encode()
+        payload = header + b"\n" + (message.encode() if isinstance(message, str) else message)
+        frame = FRAME_HEADER.pack(len(payload), zlib.crc32(payload)) + payload
+
+        if self.backlog_bytes + len(frame) > self.max_bytes:
+            OUTBOX_DROPPED.inc()
+            logger.error(f"Outbox {self.directory} is full, dropping message {application_message_id}")
+            return False
+
+        if self._writer.tell() and self._writer.tell() + len(frame) > self.segment_size:
+            self._start_segment()
+        self._writer.write(frame)
+        self.backlog_bytes += len(frame)
+        OUTBOX_BACKLOG_BYTES.inc(len(frame))
+        OUTBOX_APPENDED.inc()
+        if on_durable is not None:
+            self._on_durable.append(on_durable)
+
+        self._unsynced += 1
+        if (
+            self._unsynced >= self.fsync_batch
+            or time.monotonic() - self._last_sync >= self.fsync_interval
+        ):
+            self.sync()
+        return True
+
+    def sync(self):
+        """
+        Flushes and fsyncs the appended records, if any, and runs their `on_durable` callbacks.
+        """
+        if self._unsynced:
+            self._writer.flush()
+            os.fsync(self._writer.fileno())
+            OUTBOX_FSYNCS.inc()
+            self._unsynced = 0
+        self._last_sync = time.monotonic()
+        callbacks, self._on_durable = self._on_durable, []
+        for callback in callbacks:
+            callback()
+
+    def read(self, max_records: int) -> list[tuple[tuple, tuple[int, int]]]:
+        """
+        Reads the next records to republish, starting at the cursor.
+
+        Args:
+            max_records (int): Maximum number of records to read.
+
+        Returns:
+            list: Per record, the arguments of `SolacePublisher.publish_message`
+                (topic, message, application message ID, content type, properties)
+                and the position after the record, to be passed to `commit`.
+        """
+        self.sync()
+        records = []
+        segment, offset = self._read_segment, self._read_offset
+        while len(records) < max_records and self.backlog_bytes:
+            if self._reader is None or self._reader.name != self._segment_path(segment):
+                if self._reader:
+                    self._reader.close()
+                self._reader = open(self._segment_path(segment), "rb")
+            self._reader.seek(offset)
+            header = self._reader.read(FRAME_HEADER.size)
+            record = None
+            if len(header) == FRAME_HEADER.size:
+                length, checksum = FRAME_HEADER.unpack(header)
+                payload = self._reader.read(length)
+                if len(payload) == length and zlib.crc32(payload) == checksum:
+                    record = payload
+
+            if record is None:
+                if segment == self._write_segment:
+                    break
+                # A torn record: continue with the next intact one
+                next_offset = find_next_record(self._reader, offset) if len(header) else None
+                if len(header):
+                    logger.error(f"Skipping torn record in outbox segment {segment} at offset {offset}")
+                if next_offset is not None:
+                    offset = next_offset
+                else:
+                    # End of a closed segment: continue with the next one
+                    segment, offset = self._segments[self._segments.index(segment) + 1], 0
+                if not records:
+                    self.commit((segment, offset), 0)
+                continue
+
+            offset += FRAME_HEADER.size + len(record)
+            header, body = record.split(b"\n", 1)
+            fields = json.loads(header)
+            records.append(
+                (
+                    (
+                        fields["topic"],
+                        body.decode() if fields["text"] else bytearray(body),
+                        fields["id"],
+                        fields["content_type"],
+                        fields["properties"],
+                    ),
+                    (segment, offset),
+                )
+            )
+        return records
+
+    def commit(self, position: tuple[int, int], count: int):
+        """
+        Advances the cursor past republished records and deletes drained segments.
+
+        Args:
+            position (tuple[int, int]): The position after the last republished record.
+            count (int): The number of republished records.
+        """
+        segment, offset = position
+        drained = 0
+        for passed in [s for s in self._segments if self._read_segment <= s < segment]:
+            drained += os.path.getsize(self._segment_path(passed)) - (
+                self._read_offset if passed == self._read_segment else 0
+            )
+            self._segments.remove(passed)
+            os.remove(self._segment_path(passed))
+        drained += offset - (self._read_offset if segment == self._read_segment else 0)
+
+        self._read_segment, self._read_offset = segment, offset
+        self._save_cursor()
+        self.backlog_bytes -= drained
+        OUTBOX_BACKLOG_BYTES.dec(drained)
+        OUTBOX_DRAINED.inc(count)
+
+    def close(self):
+        """
+        Fsyncs the appended records and closes the segment files.
+        """
+        self.sync()
+        self._writer.close()
+        if self._reader:
+            self._reader.close()
+        OUTBOX_BACKLOG_BYTES.dec(self.backlog_bytes)
+
+
+def find_next_record(reader: BinaryIO, offset: int) -> int | None:
+    """
+    Finds the next intact record after a torn record in a segment file.
+
+    Scans forward byte by byte for a frame whose length fits the file and whose
+    checksum matches its payload, so that a torn record only loses itself instead
+    of the rest of its segment.
+
+    Args:
+        reader (BinaryIO): The segment file, opened for reading.
+        offset (int): The offset of the torn record.
+
+    Returns:
+        int or None: The offset of the next intact record, or None if there is none.
+    """
+    reader.seek(offset + 1)
+    data = memoryview(reader.read())
+    for start in range(len(data) - FRAME_HEADER.size + 1):
+        length, checksum = FRAME_HEADER.unpack_from(data, start)
+        end = start + FRAME_HEADER.size + length
+        if 0 < length and end <= len(data) and zlib.crc32(data[start + FRAME_HEADER.size : end]) == checksum:
+            return offset + 1 + start
+    return None
+
+
+def claim_slot(directory: str) -> str:
+    """
+    Claims a slot directory for this process below a base directory.
+
+    Every worker process locks its own `slot-<n>` directory, so that concurrent
+    processes never share files. A process started after a crash claims a free
+    slot, and with it the files left by its previous owner.
+
+    Args:
+        directory (str): The base directory, e.g. of the outboxes.
+
+    Returns:
+        str: The slot directory of this process.
+    """
+    if directory not in _slots:
+        index = 0
+        while True:
+            path = os.path.join(directory, f"slot-{index}")
+            os.makedirs(path, exist_ok=True)
+            lock = open(os.path.join(path, "lock"), "w")
+            try:
+                fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                lock.close()
+                index += 1
+                continue
+            _slots[directory] = (path, lock)
+            break
+    return _slots[directory][0]
+
+
+def create_outbox(worker_index: int):
+    """
+    Creates the outbox of a publish worker if `OUTBOX_DIR` is set.
+
+    Args:
+        worker_index (int): The index of the worker in the pool.
+
+    Returns:
+        Outbox or None: The outbox in `<slot>/worker-<index>`, or None if disabled.
+    """
+    if not OUTBOX_DIR:
+        return None
+    return Outbox(os.path.join(claim_slot(OUTBOX_DIR), f"worker-{worker_index}"))
@@ -0,0 +1,202 @@
+import os
+import queue
+import threading
+import zlib
+from opentelemetry import context
+from logger_config import setup_logger
+from metrics import PUBLISH_BACKLOG
+from outbox import create_outbox
+from typing import TYPE_CHECKING, Any, Callable
+
+if TYPE_CHECKING:
+    from solace_publisher import SolacePublisher
+
+# Initialize logger
+logger = setup_logger()
+
+# Sentinel that tells a worker to stop after draining its queue
+_STOP = object()
+
+# Maximum time between two outbox drains of a worker
+OUTBOX_DRAIN_INTERVAL = float(os.getenv("OUTBOX_DRAIN_INTERVAL", "0.1"))
+
+
+class PublishWorker(threading.Thread):
+    """
+    A publisher thread with its own Solace connection and bounded job queue.
+
+    Jobs are executed in the order they were submitted, with the OpenTelemetry
+    context of the submitting request attached.
+
+    Attributes:
+        publisher (SolacePublisher): The connection used by this worker.
+        jobs (queue.Queue): The bounded queue of pending jobs.
+    """
+
+    def __init__(self, index: int, publisher: "SolacePublisher", queue_size: int):
+        """
+        Initializes the worker.
+
+        Args:
+            index (int): The index of the worker in the pool.
+            publisher (SolacePublisher): The connected publisher used by this worker.
+            queue_size (int): Maximum number of pending jobs.
+        """
+        super().__init__(name=f"publish-worker-{index}", daemon=True)
+        self.publisher = publisher
+        self.jobs = queue.Queue(maxsize=queue_size)
+
+    def run(self):
+        """
+        Executes jobs until the stop sentinel is received.
+
+        If the publisher has an outbox, the worker wakes up at least every
+        `OUTBOX_DRAIN_INTERVAL` seconds to republish stored messages.
+        """
+        outbox = self.publisher.outbox
+        while True:
+            try:
+                job = self.jobs.get(timeout=OUTBOX_DRAIN_INTERVAL if outbox else None)
+            except queue.Empty:
+                job = None
+            if outbox:
+                self.publisher.drain_outbox()
+            if job is None:
+                continue
+            if job is _STOP:
+                break
+            PUBLISH_BACKLOG.dec()
+            task, args, ctx = job
+            token = context.attach(ctx)
+            try:
+                task(self.publisher, *args)
+            except Exception as e:
+                logger.error(f"Publish job {task.__name__} failed: {e}")
+            finally:
+                context.detach(token)
+
+
+class PublishWorkerPool:
+    """
+    A pool of publisher threads fed by bounded queues.
+
+    Jobs with the same ordering key (e.g. the store ID) are always routed to the
+    same worker, which preserves their order while jobs for different keys are
+    published in parallel.
+
+    Methods:
+        start(): Connects one publisher per worker and starts the threads.
+        submit(key, task, *args, block=False): Queues a job, by default without blocking.
+        backlog(): Returns the number of pending jobs.
+        capacity(): Returns the maximum number of pending jobs.
+        publisher_states(): Returns the connection state of every worker's publisher.
+        stop(): Drains the queues, stops the threads and closes the connections.
+    """
+
+    def __init__(self, config: dict[str, Any], worker_count: int, queue_size: int):
+        """
+        Initializes the pool without connecting to the broker.
+
+        Args:
+            config (dict): Configuration dictionary for the Solace messaging service.
+            worker_count (int): Number of publisher threads.
+            queue_size (int): Maximum number of pending jobs per worker.
+        """
+        self.config = config
+        self.worker_count = worker_count
+        self.queue_size = queue_size
+        self.workers: list[PublishWorker] = []
+
+    def start(self):
+        """
+        Connects one publisher per worker and starts the worker threads.
+
+        Each publisher gets its own outbox if `OUTBOX_DIR` is set.
+
+        The Solace SDK is imported here, so that it is only loaded once the
+        application starts and not when it is imported.
+        """
+        from solace_publisher import SolacePublisher
+
+        for index in range(self.worker_count):
+            publisher = SolacePublisher(config=self.config, outbox=create_outbox(index))
+            worker = PublishWorker(index, publisher, self.queue_size)
+            worker.start()
+            self.workers.append(worker)
+        logger.info(f"Started {self.worker_count} publish workers")
+
+    def submit(self, key: str, task: Callable, *args, block: bool = False, timeout: float = None):
+        """
+        Queues a job on the worker responsible for the ordering key.
+
+        The task is called as `task(publisher, *args)` on the worker thread.
+
+        Args:
+            key (str): The ordering key, e.g. the store ID.
+            task (Callable): The function to execute.
+            *args: Additional arguments passed to the task.
+            block (bool): Whether to wait for space in the worker's queue instead of
+                raising `queue.Full` (only for callers outside the event loop).
+            timeout (float): Maximum time in seconds to wait if `block` is True
+                (None waits indefinitely).
+
+        Raises:
+            queue.Full: If the worker's queue is full and `block` is False, or is
+                still full after `timeout`.
+        """
+        worker = self.workers[zlib.crc32(key.encode()) % len(self.workers)]
+        worker.jobs.put((task, args, context.get_current()), block=block, timeout=timeout)
+        PUBLISH_BACKLOG.inc()
+
+    def backlog(self) -> int:
+        """
+        Returns the number of jobs waiting in all worker queues.
+
+        Returns:
+            int: The total number of pending jobs.
+        """
+        return sum(worker.jobs.qsize() for worker in self.workers)
+
+    def capacity(self) -> int:
+        """
+        Returns the maximum number of jobs all worker queues can hold.
+
+        Returns:
+            int: The total queue capacity.
+        """
+        return self.worker_count * self.queue_size
+
+    def publisher_states(self) -> list[dict[str, Any]]:
+        """
+        Returns the connection state of every worker's publisher.
+
+        A worker with an outbox stays ready while the broker is unavailable, as long
+        as its outbox has capacity left.
+
+        Returns:
+            list[dict]: One entry per worker with its name, readiness, connection
+                state, queue backlog and outbox backlog in bytes.
+        """
+        return [
+            {
+                "worker": worker.name,
+                "ready": worker.publisher.is_ready()
+                or (worker.publisher.outbox is not None and worker.publisher.outbox.has_capacity()),
+                "state": worker.publisher.service_handler.state,
+                "backlog": worker.jobs.qsize(),
+                "outbox_backlog": worker.publisher.outbox.backlog_bytes if worker.publisher.outbox else 0,
+            }
+            for worker in self.workers
+        ]
+
+    def stop(self):
+        """
+        Drains the worker queues, stops the threads and closes their publishers.
+        """
+        for worker in self.workers:
+            worker.jobs.put(_STOP)
+        for worker in self.workers:
+            worker.join()
+            worker.publisher.close()
+        self.workers = []
+        logger.info("Publish workers stopped")
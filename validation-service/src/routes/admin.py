@@ -0,0 +1,70 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import Response
+from common.profiling import (
+    PROFILING_ENABLED,
+    PROFILE_MAX_SECONDS,
+    ProfileInProgress,
+    capture_profile,
+    profile_filename,
+)
+from utils import validate_admin_auth
+from logger_config import setup_logger
+
+# Initialize logger
+logger = setup_logger()
+
+# Initialize API router
+router = APIRouter()
+
+
+@router.get("/api/v1/admin/profile", status_code=200, tags=["Admin"])
+async def profile(
+    seconds: float = Query(10, gt=0, le=PROFILE_MAX_SECONDS),
+    format: str = Query("speedscope", pattern="^(collapsed|speedscope)$"),
+    mode: str = Query("cpu", pattern="^(cpu|wall)$"),
+    username: str = Depends(validate_admin_auth),
+):
+    """
+    Captures a sampling profile of the worker process that handles the request.
+
+    This endpoint:
+    - Is only available if `PROFILING_ENABLED` is set and restricted to `ADMIN_USERNAMES`.
+    - Samples the stacks of all threads (event loop and publish workers) for `seconds`
+      in a thread pool, so that the event loop keeps serving requests.
+    - Returns the profile as collapsed stacks or as a speedscope file.
+
+    With several server workers, each request profiles one of them.
+
+    Args:
+        seconds (float): Duration of the profile.
+        format (str): "collapsed" or "speedscope".
+        mode (str): "cpu" (threads using CPU) or "wall" (all threads).
+        username (str): Administrator authenticated via Basic Auth.
+
+    Returns:
+        Response: The profile as an attachment.
+
+    Raises:
+        HTTPException:
+            - Status code 404 if profiling is disabled.
+            - Status code 409 if a profile is already being captured.
+    """
+    if not PROFILING_ENABLED:
+        raise HTTPException(status_code=404, detail="Profiling is disabled")
+
+    logger.info(f"User '{username}' requested a {seconds} seconds {mode} profile")
+    try:
+        media_type, content = await run_in_threadpool(
+            capture_profile, seconds, format, mode, "validation-service"
+        )
+    except ProfileInProgress as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+    return Response(
+        content=content,
+        media_type=media_type,
+        headers={
+            "Content-Disposition": f'attachment; filename="{profile_filename("validation-service", format)}"'
+        },
+    )
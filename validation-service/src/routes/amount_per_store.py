@@ -1,9 +1,13 @@
-from fastapi import APIRouter, BackgroundTasks, Depends
+from fastapi import APIRouter, Depends, HTTPException
 from models.aggregated_event import AggregatedEvent
 from opentelemetry import trace
-from background_tasks import send_aggregations
+from opentelemetry.trace import StatusCode
+from background_tasks import PUBLISH_POOL, send_aggregations
 from logger_config import setup_logger
 from utils import validate_basic_auth
+from metrics import PUBLISH_REJECTIONS
+import queue
+import time
 
 # Initialize logger
 logger = setup_logger()
@@ -15,7 +19,6 @@ router = APIRouter()
 @router.post("/api/v1/pos/amount-per-store", status_code=200, tags=["Aggregations"])
 async def amount_per_store(
     aggregated_event: AggregatedEvent,
-    background_tasks: BackgroundTasks,
     username: str = Depends(validate_basic_auth),
 ):
     """
@@ -24,18 +27,21 @@ async def amount_per_store(
     This endpoint:
     - Validates the incoming aggregated event data.
     - Logs the received data and the authenticated username.
-    - Adds a background task to send the aggregations for further processing.
+    - Queues the publishing of the aggregations on the publish worker responsible for the store.
     - Traces the operation using OpenTelemetry for observability.
 
     Args:
         aggregated_event (AggregatedEvent): The aggregated data object received from the Flink job.
-        background_tasks (BackgroundTasks): FastAPI's background task manager for running tasks asynchronously.
         username (str): Authenticated username extracted via Basic Auth.
 
     Returns:
         dict: A response dictionary with a success message.
 
     Raises:
+        HTTPException:
+            - Status code 429 or 503 if the request is shed by admission control
+              (see `AdmissionControlMiddleware`).
+            - Status code 503 if the publish queue of the store's worker is full.
         Exception: If an error occurs during processing, the exception is logged and re-raised.
 
     OpenTelemetry Attributes:
@@ -55,8 +61,21 @@ async def amount_per_store(
                 f"User '{username}' received aggregated data: {aggregated_event}"
             )
 
-            # Add the background task for further processing
-            background_tasks.add_task(send_aggregations, aggregated_event)
+            # Queue the aggregations on the store's publish worker
+            try:
+                PUBLISH_POOL.submit(
+                    aggregated_event.store_id, send_aggregations, aggregated_event, time.perf_counter()
+                )
+            except queue.Full:
+                PUBLISH_REJECTIONS.inc()
+                logger.warning(
+                    f"Publish queue full, rejecting aggregated event {aggregated_event.event_id}"
+                )
+                raise HTTPException(
+                    status_code=503,
+                    detail="Publish queue is full",
+                    headers={"Retry-After": "1"},
+                )
 
             # Return success response
             return {
@@ -67,5 +86,5 @@ async def amount_per_store(
             # Log and trace the exception
             logger.error(f"Error processing aggregated data: {e}")
             span.record_exception(e)
-            span.set_status("ERROR")
+            span.set_status(StatusCode.ERROR)
             raise e
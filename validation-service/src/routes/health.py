@@ -1,5 +1,8 @@
 from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+from background_tasks import PUBLISH_POOL
 from logger_config import setup_logger
+import os
 
 # Initialize logger
 logger = setup_logger()
@@ -7,6 +10,9 @@ logger = setup_logger()
 # Initialize API router
 router = APIRouter()
 
+# Share of the publish queue capacity above which the service reports not ready
+READINESS_MAX_BACKLOG_RATIO = float(os.getenv("READINESS_MAX_BACKLOG_RATIO", "0.8"))
+
 
 @router.get("/api/v1/health", status_code=200, tags=["Health"])
 async def health_check():
@@ -15,15 +21,52 @@ async def health_check():
 
     This endpoint:
     - Confirms that the application is healthy and operational.
-    - Logs each access to the health check endpoint for monitoring.
+    - Is probed frequently and therefore does not log its accesses.
 
     Returns:
         dict: A response dictionary containing the health status and a message.
             - `status` (str): "ok" indicating the application is running.
             - `message` (str): A detailed message confirming the application's health.
     """
-    # Log access to the endpoint
-    logger.info("Health check endpoint accessed.")
-
-    # Return the health status
     return {"status": "ok", "message": "The application is healthy and running."}
+
+
+@router.get("/api/v1/ready", status_code=200, tags=["Health"])
+async def readiness_check():
+    """
+    Readiness endpoint reflecting broker connectivity and publish queue pressure.
+
+    This endpoint:
+    - Reports the connection state of every publish worker's `SolacePublisher`.
+    - Compares the publish backlog against `READINESS_MAX_BACKLOG_RATIO` of the queue capacity.
+    - Returns status code 503 if a publisher is not ready (and its outbox, if any, is full)
+      or the backlog is above the threshold, so that Traefik stops routing traffic to this replica.
+
+    Returns:
+        JSONResponse: A response containing:
+            - `status` (str): "ready" or "not_ready".
+            - `backlog` (int): Number of pending publish jobs.
+            - `max_backlog` (int): Backlog above which the service is not ready.
+            - `publishers` (list): Readiness, connection state, backlog and outbox backlog per worker.
+    """
+    publishers = PUBLISH_POOL.publisher_states()
+    backlog = sum(publisher["backlog"] for publisher in publishers)
+    max_backlog = int(PUBLISH_POOL.capacity() * READINESS_MAX_BACKLOG_RATIO)
+    ready = (
+        bool(publishers)
+        and all(publisher["ready"] for publisher in publishers)
+        and backlog < max_backlog
+    )
+
+    if not ready:
+        logger.warning(f"Readiness check failed: backlog {backlog}/{max_backlog}, publishers {publishers}")
+
+    return JSONResponse(
+        status_code=200 if ready else 503,
+        content={
+            "status": "ready" if ready else "not_ready",
+            "backlog": backlog,
+            "max_backlog": max_backlog,
+            "publishers": publishers,
+        },
+    )
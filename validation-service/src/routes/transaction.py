@@ -1,9 +1,17 @@
-from fastapi import APIRouter, BackgroundTasks, Depends
+from fastapi import APIRouter, Depends, HTTPException
 from models.transaction_event import Transaction
-from background_tasks import correct_transaction
+from background_tasks import (
+    PUBLISH_POOL,
+    TRANSACTION_WAL,
+    correct_transaction,
+)
 from opentelemetry import trace
+from opentelemetry.trace import StatusCode
 from logger_config import setup_logger
 from utils import validate_basic_auth
+from metrics import PUBLISH_REJECTIONS
+import queue
+import time
 
 # Initialize logger
 logger = setup_logger()
@@ -15,7 +23,6 @@ router = APIRouter()
 @router.post("/api/v1/pos/validate_transaction", status_code=200, tags=["Validation"])
 async def validate_transaction(
     transaction: Transaction,
-    background_tasks: BackgroundTasks,
     username: str = Depends(validate_basic_auth),
 ):
     """
@@ -24,12 +31,15 @@ async def validate_transaction(
     This endpoint:
     - Validates the incoming transaction data.
     - Logs the transaction details and the authenticated username.
-    - Adds a background task to correct the transaction if necessary.
+    - With the write-ahead log enabled (`WAL_DIR`), appends the transaction to it and
+      waits until it is fsynced (group commit), so that an accepted transaction
+      survives a crash before its publish.
+    - Queues the correction and publishing of the transaction on the publish
+      worker responsible for its store.
     - Traces the operation using OpenTelemetry for observability.
 
     Args:
         transaction (Transaction): The transaction object to be validated.
-        background_tasks (BackgroundTasks): FastAPI's background task manager to handle asynchronous tasks.
         username (str): Authenticated username extracted via Basic Auth.
 
     Returns:
@@ -39,6 +49,11 @@ async def validate_transaction(
             - `message` (str): A success message.
 
     Raises:
+        HTTPException:
+            - Status code 429 or 503 if the request is shed by admission control
+              (see `AdmissionControlMiddleware`).
+            - Status code 503 if the publish queue of the store's worker is full or the
+              transaction could not be written to the write-ahead log.
         Exception: If an error occurs during validation, the exception is logged and re-raised.
 
     OpenTelemetry Attributes:
@@ -58,10 +73,44 @@ async def validate_transaction(
                 f"Transaction received for validation by {username}: {transaction}"
             )
 
-            # Add a background task for transaction correction
-            background_tasks.add_task(correct_transaction, transaction)
+            accepted_at = time.perf_counter()
+
+            # Make the transaction durable before it is acknowledged
+            position = None
+            if TRANSACTION_WAL:
+                try:
+                    position = await TRANSACTION_WAL.append(transaction.model_dump_json().encode())
+                except OSError as e:
+                    logger.error(
+                        f"Write-ahead log append failed for transaction ID {transaction.transaction_id}: {e}"
+                    )
+                    raise HTTPException(
+                        status_code=503,
+                        detail="Transaction could not be logged",
+                        headers={"Retry-After": "1"},
+                    )
+
+            # Queue the transaction correction on the store's publish worker
+            try:
+                PUBLISH_POOL.submit(
+                    transaction.store_id, correct_transaction, transaction, accepted_at, position
+                )
+            except queue.Full:
+                # The transaction is not accepted, so it is not recovered from the log either;
+                # the pos-service sends it again after Retry-After (SEND_MAX_ATTEMPTS)
+                if position is not None:
+                    TRANSACTION_WAL.confirm(position)
+                PUBLISH_REJECTIONS.inc()
+                logger.warning(
+                    f"Publish queue full, rejecting transaction ID {transaction.transaction_id}"
+                )
+                raise HTTPException(
+                    status_code=503,
+                    detail="Publish queue is full",
+                    headers={"Retry-After": "1"},
+                )
             logger.info(
-                f"Background task added for transaction ID {transaction.transaction_id}"
+                f"Publish job queued for transaction ID {transaction.transaction_id}"
             )
 
             # Return success response
@@ -76,5 +125,5 @@ async def validate_transaction(
                 f"Error while validating transaction ID {transaction.transaction_id}: {e}"
             )
             span.record_exception(e)
-            span.set_status("ERROR")
+            span.set_status(StatusCode.ERROR)
             raise e
@@ -0,0 +1,115 @@
+import asyncio
+import gc
+import os
+import threading
+import time
+from logger_config import setup_logger
+from metrics import (
+    EVENT_LOOP_LAG,
+    GC_COLLECTIONS,
+    GC_PAUSE,
+    PROCESS_THREADS,
+    PROCESS_RSS,
+)
+
+# Initialize logger
+logger = setup_logger()
+
+# Interval of the event loop lag probe, which also refreshes the process gauges
+EVENT_LOOP_LAG_INTERVAL = float(os.getenv("EVENT_LOOP_LAG_INTERVAL", "0.1"))
+
+PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+def read_rss():
+    """
+    Reads the resident set size of the current process from `/proc/self/statm`.
+
+    Returns:
+        int or None: The resident set size in bytes, or None if unavailable.
+    """
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * PAGE_SIZE
+    except (OSError, IndexError, ValueError):
+        return None
+
+
+class RuntimeMonitor:
+    """
+    Exports Python runtime metrics of a worker process.
+
+    - Event loop lag: a task sleeps for `interval` and observes how late it wakes up.
+      Blocking calls on the loop (e.g. a synchronous publish) show up as lag.
+    - Garbage collection: a `gc.callbacks` hook counts collections and observes their
+      pause per generation.
+    - Thread count and resident set size, refreshed with every lag probe.
+    """
+
+    def __init__(self, interval: float = EVENT_LOOP_LAG_INTERVAL):
+        """
+        Initializes the monitor.
+
+        Args:
+            interval (float): Interval of the event loop lag probe in seconds.
+        """
+        self.interval = interval
+        self._task = None
+        self._gc_start = None
+        # Label children are bound once instead of per collection
+        self._gc_collections = [GC_COLLECTIONS.labels(generation=str(g)) for g in range(3)]
+        self._gc_pauses = [GC_PAUSE.labels(generation=str(g)) for g in range(3)]
+
+    def start(self):
+        """
+        Installs the GC hook and starts the lag probe on the running event loop.
+        """
+        gc.callbacks.append(self._on_gc)
+        self._task = asyncio.get_running_loop().create_task(self._probe_loop())
+        logger.info(f"Runtime monitor started (event loop lag interval {self.interval}s)")
+
+    def stop(self):
+        """
+        Removes the GC hook and cancels the lag probe.
+        """
+        if self._on_gc in gc.callbacks:
+            gc.callbacks.remove(self._on_gc)
+        if self._task:
+            self._task.cancel()
+            self._task = None
+
+    def _on_gc(self, phase, info):
+        """
+        Measures a garbage collection (called by the interpreter before and after it).
+
+        Collections do not overlap, so a single start time is sufficient.
+
+        Args:
+            phase (str): "start" or "stop".
+            info (dict): Details of the collection, including its `generation`.
+        """
+        if phase == "start":
+            self._gc_start = time.perf_counter()
+        elif self._gc_start is not None:
+            generation = info["generation"]
+            self._gc_pauses[generation].observe(time.perf_counter() - self._gc_start)
+            self._gc_collections[generation].inc()
+            self._gc_start = None
+
+    async def _probe_loop(self):
+        """
+        Observes the event loop lag and refreshes the process gauges every interval.
+        """
+        loop = asyncio.get_running_loop()
+        while True:
+            scheduled = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            EVENT_LOOP_LAG.observe(max(loop.time() - scheduled, 0.0))
+
+            PROCESS_THREADS.set(threading.active_count())
+            rss = read_rss()
+            if rss is not None:
+                PROCESS_RSS.set(rss)
+
+
+RUNTIME_MONITOR = RuntimeMonitor()
@@ -1,4 +1,3 @@
-import json
 from solace.messaging.messaging_service import (
     MessagingService,
     ServiceEvent,
@@ -16,8 +15,18 @@ from solace_otel.messaging.trace.propagation import (
     OutboundMessageCarrier,
     OutboundMessageSetter,
 )
-from typing import Any
+from typing import Any, Callable
 from logger_config import setup_logger
+from outbox import OUTBOX_DRAIN_RATE, Outbox
+from message_codecs import CONTENT_TYPE_PROPERTY, JsonCodec
+from metrics import (
+    PUBLISH_FAILURES_SYNC,
+    PUBLISH_FAILURES_ASYNC,
+    RECONNECTED_EVENTS,
+    RECONNECTING_EVENTS,
+    INTERRUPTED_EVENTS,
+)
+import time
 
 # Initialize logger
 logger = setup_logger()
@@ -31,28 +40,38 @@ class SolacePublisher:
         messaging_service (MessagingService): Solace messaging service instance.
         direct_publisher (DirectMessagePublisher): Direct message publisher for sending messages.
         message_builder (MessageBuilder): Builder for creating messages.
+        service_handler (ServiceEventHandler): Tracks the connection state of the messaging service.
+        outbox (Outbox): Stores messages while the broker is unavailable (None if disabled).
 
     Methods:
-        publish_message(topic, message, application_message_id):
-            Publishes a message to a specific topic.
+        publish_message(topic, message, application_message_id, content_type, properties, on_durable):
+            Publishes an encoded message to a specific topic.
+        drain_outbox():
+            Republishes stored messages once the publisher is ready again.
+        is_ready():
+            Returns whether the publisher is connected and ready to publish.
         close():
             Gracefully shuts down the publisher and messaging service.
     """
 
-    def __init__(self, config: dict[str, Any]):
+    def __init__(self, config: dict[str, Any], outbox: Outbox = None):
         """
         Initializes the SolacePublisher.
 
         Args:
             config (dict): Configuration dictionary for the Solace messaging service.
+            outbox (Outbox): Optional durable outbox for messages that cannot be published.
         """
+        self.outbox = outbox
+        self._drain_budget = 0.0
+        self._last_drain = time.monotonic()
         self.messaging_service = self._initialize_messaging_service(config)
 
         # Event Handling for the messaging service
-        service_handler = ServiceEventHandler()
-        self.messaging_service.add_reconnection_listener(service_handler)
-        self.messaging_service.add_reconnection_attempt_listener(service_handler)
-        self.messaging_service.add_service_interruption_listener(service_handler)
+        self.service_handler = ServiceEventHandler()
+        self.messaging_service.add_reconnection_listener(self.service_handler)
+        self.messaging_service.add_reconnection_attempt_listener(self.service_handler)
+        self.messaging_service.add_service_interruption_listener(self.service_handler)
 
         self.direct_publisher = self._initialize_direct_publisher()
         self.message_builder = self.messaging_service.message_builder()
@@ -93,17 +112,46 @@ class SolacePublisher:
         logger.info(f"Direct Publisher ready? {direct_publisher.is_ready()}")
         return direct_publisher
 
-    def publish_message(self, topic: str, message: str, application_message_id: str):
+    def publish_message(
+        self,
+        topic: str,
+        message: str | bytearray,
+        application_message_id: str,
+        content_type: str = JsonCodec.content_type,
+        properties: dict[str, Any] = None,
+        on_durable: Callable[[], None] = None,
+    ) -> bool:
         """
         Publishes a message to a specified topic.
 
+        The content type is attached as the `content_type` user property, so that
+        consumers can pick the matching decoder. Additional typed user properties
+        (e.g. routing keys) are attached to this message only.
+
+        With an outbox, messages are stored in it instead while the publisher is not
+        ready or the publish fails. Once the publisher is ready again, new messages
+        are published right away while `drain_outbox` republishes the stored ones
+        in the background, so that live traffic is not limited to the drain rate.
+        New messages may therefore overtake stored messages of the same store.
+
+        `on_durable` is called once the message was handed off: right after a
+        direct publish returned, or once its outbox record is fsynced. A direct
+        publish is a best-effort handoff to the SDK without a broker
+        acknowledgement, so a message may still be lost if the connection drops
+        before it was sent.
+
         Args:
             topic (str): The Solace topic to publish the message to.
-            message (str): The message content in JSON format.
-            application_message_id (str): The ID associated with the application message.
+            message (str | bytearray): The encoded message content (see `message_codecs`).
+            application_message_id (str): The application message ID, e.g. the transaction ID.
+            content_type (str): The content type of the encoded message.
+            properties (dict): Optional typed user properties of the message.
+            on_durable (Callable): Optional function called once the message was handed
+                off (see above); not called if it was lost.
 
-        Raises:
-            PubSubPlusClientError: If there is an error during publishing.
+        Returns:
+            bool: True if the message was published or stored in the outbox, False if
+                it was lost.
 
         Logs:
             - Success or failure of the message publishing.
@@ -115,24 +163,53 @@ class SolacePublisher:
             - `messaging.destination`: Specifies the topic name.
             - `messaging.operation`: Describes the operation as publish.
         """
+        if not application_message_id:
+            logger.error("Error processing message: missing application message ID")
+            return False
+
+        if self.outbox is not None and not self.is_ready():
+            return self.outbox.append(
+                topic, message, application_message_id, content_type, properties, on_durable
+            )
+
+        published = self._send(topic, message, application_message_id, content_type, properties)
+        if not published and self.outbox is not None:
+            return self.outbox.append(
+                topic, message, application_message_id, content_type, properties, on_durable
+            )
+        if published and on_durable is not None:
+            on_durable()
+        return published
+
+    def _send(
+        self,
+        topic: str,
+        message: str | bytearray,
+        application_message_id: str,
+        content_type: str,
+        properties: dict[str, Any],
+    ) -> bool:
+        """
+        Builds a message with its trace context and publishes it with the direct publisher.
+
+        Args:
+            topic (str): The Solace topic to publish the message to.
+            message (str | bytearray): The encoded message content.
+            application_message_id (str): The application message ID.
+            content_type (str): The content type of the encoded message.
+            properties (dict): Optional typed user properties of the message.
+
+        Returns:
+            bool: True if the message was published, False if publishing failed.
+        """
         try:
             topic_obj = Topic.of(topic)
 
-            # Parse the message body to extract transaction_id
-            try:
-                message_content = json.loads(message)
-                application_message_id = message_content[application_message_id]
-                if not application_message_id:
-                    raise ValueError("Missing application_message_id in message content")
-            except (json.JSONDecodeError, ValueError) as e:
-                logger.error(f"Error processing message body: {e}")
-                return
-
             outbound_msg = (
                 self.message_builder
                 .with_application_message_id(application_message_id)
-                .with_property("application", "json")
-                .build(message)
+                .with_property(CONTENT_TYPE_PROPERTY, content_type)
+                .build(message, additional_message_properties=properties)
             )
 
             tracer = trace.get_tracer("SolacePublisherTracer")
@@ -155,23 +232,76 @@ class SolacePublisher:
                     self.direct_publisher.publish(destination=topic_obj, message=outbound_msg)
                     span.set_status(StatusCode.OK)
                     logger.info(f"Message published to topic: {topic}")
+                    return True
                 except Exception as e:
                     logger.error(f"Error publishing message: {e}")
                     span.set_status(StatusCode.ERROR, str(e))
+                    PUBLISH_FAILURES_SYNC.inc()
 
         except KeyboardInterrupt:
             logger.warning("Publishing interrupted by user.")
         except PubSubPlusClientError as e:
             logger.error(f"Error publishing message: {e}")
+            PUBLISH_FAILURES_SYNC.inc()
+        return False
+
+    def drain_outbox(self):
+        """
+        Republishes messages from the outbox at up to `OUTBOX_DRAIN_RATE` messages per second.
+
+        Called periodically by the publish worker. Appended records are fsynced even
+        while the publisher is not ready. Draining stops at the first failed publish,
+        which is retried on the next call.
+        """
+        if self.outbox is None:
+            return
+        self.outbox.sync()
+        now = time.monotonic()
+        self._drain_budget = min(
+            self._drain_budget + (now - self._last_drain) * OUTBOX_DRAIN_RATE, OUTBOX_DRAIN_RATE
+        )
+        self._last_drain = now
+        if not self.outbox.pending() or not self.is_ready() or self._drain_budget < 1:
+            return
+
+        position, count = None, 0
+        for record, record_position in self.outbox.read(int(self._drain_budget)):
+            if not self._send(*record):
+                break
+            position, count = record_position, count + 1
+        if count:
+            self.outbox.commit(position, count)
+            self._drain_budget -= count
+            if not self.outbox.pending():
+                logger.info(f"Outbox {self.outbox.directory} drained")
+
+    def is_ready(self) -> bool:
+        """
+        Checks whether the publisher can currently publish messages.
+
+        Returns:
+            bool: True if the messaging service is connected, not reconnecting or
+                interrupted, and the direct publisher is ready.
+        """
+        return (
+            self.service_handler.state == ServiceEventHandler.CONNECTED
+            and self.messaging_service.is_connected
+            and self.direct_publisher.is_ready()
+        )
 
     def close(self):
         """
         Gracefully shuts down the publisher and messaging service.
 
+        The outbox, if any, is fsynced and closed; its remaining messages are
+        republished by the next process that opens it.
+
         Logs:
             - Termination of the direct publisher.
             - Disconnection of the messaging service.
         """
+        if self.outbox is not None:
+            self.outbox.close()
         if self.direct_publisher and self.direct_publisher.is_ready():
             self.direct_publisher.terminate()
             logger.info("Direct publisher terminated.")
@@ -186,24 +316,40 @@ class ServiceEventHandler(
     """
     Handles events related to messaging service interruptions and reconnections.
 
+    Attributes:
+        state (str): The last known connection state (`connected`, `reconnecting` or `interrupted`).
+
     Methods:
         on_reconnected(e): Handles successful reconnections.
         on_reconnecting(e): Handles reconnection attempts.
         on_service_interrupted(e): Handles service interruptions.
     """
 
+    CONNECTED = "connected"
+    RECONNECTING = "reconnecting"
+    INTERRUPTED = "interrupted"
+
+    def __init__(self):
+        self.state = self.CONNECTED
+
     def on_reconnected(self, e: ServiceEvent):
+        self.state = self.CONNECTED
         logger.info("Reconnected to the messaging service.")
+        RECONNECTED_EVENTS.inc()
         logger.debug(f"Error cause: {e.get_cause()}")
         logger.debug(f"Message: {e.get_message()}")
 
     def on_reconnecting(self, e: "ServiceEvent"):
+        self.state = self.RECONNECTING
         logger.warning("Attempting to reconnect to the messaging service.")
+        RECONNECTING_EVENTS.inc()
         logger.debug(f"Error cause: {e.get_cause()}")
         logger.debug(f"Message: {e.get_message()}")
 
     def on_service_interrupted(self, e: "ServiceEvent"):
+        self.state = self.INTERRUPTED
         logger.error("Messaging service interrupted.")
+        INTERRUPTED_EVENTS.inc()
         logger.debug(f"Error cause: {e.get_cause()}")
         logger.debug(f"Message: {e.get_message()}")
 
@@ -218,4 +364,5 @@ class PublisherErrorHandling(PublishFailureListener):
 
     def on_failed_publish(self, e: "FailedPublishEvent"):
         logger.error("Failed to publish message.")
+        PUBLISH_FAILURES_ASYNC.inc()
         logger.debug(f"Failed Publish Event: {e}")
@@ -66,3 +66,44 @@ def validate_basic_auth(credentials: HTTPBasicCredentials = Depends(security)):
 
     logger.info(f"Successfully authenticated user: {credentials.username}")
     return credentials.username
+
+
+def credentials_valid(username: str, password: str) -> bool:
+    """
+    Checks Basic Auth credentials like `validate_basic_auth`, without logging or raising.
+
+    Used outside of the endpoint dependencies, e.g. by the admission control middleware.
+
+    Args:
+        username (str): The provided username.
+        password (str): The provided password.
+
+    Returns:
+        bool: True if the credentials match the environment variables of their service.
+    """
+    service_name = username.split("_", 1)[0].replace("-", "_")
+    expected_username = os.getenv(f"{service_name.upper()}_USERNAME")
+    expected_password = os.getenv(f"{service_name.upper()}_PASSWORD")
+    return bool(expected_username and expected_password) and (
+        username == expected_username and password == expected_password
+    )
+
+
+def validate_admin_auth(username: str = Depends(validate_basic_auth)):
+    """
+    Restricts an endpoint to the administrators listed in `ADMIN_USERNAMES`.
+
+    Args:
+        username (str): The username authenticated via Basic Auth.
+
+    Returns:
+        str: The username if it belongs to an administrator.
+
+    Raises:
+        HTTPException: Status code 403 if the user is not an administrator.
+    """
+    admins = {name.strip() for name in os.getenv("ADMIN_USERNAMES", "").split(",") if name.strip()}
+    if username not in admins:
+        logger.warning(f"User {username} is not allowed to access admin endpoints")
+        raise HTTPException(status_code=403, detail="Admin access required")
+    return username
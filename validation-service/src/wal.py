@@ -0,0 +1,380 @@
+import asyncio
+import collections
+import json
+import os
+import threading
+import time
+import zlib
+from logger_config import setup_logger
+from metrics import WAL_COMMIT_BATCH, WAL_FSYNC_LATENCY, WAL_RECOVERED, WAL_PENDING
+from outbox import CURSOR_FILE, FRAME_HEADER, SEGMENT_SUFFIX, claim_slot, find_next_record
+
+# Initialize logger
+logger = setup_logger()
+
+# Directory of the write-ahead log of accepted transactions (disabled if empty)
+WAL_DIR = os.getenv("WAL_DIR", "")
+
+# Size of a log segment in bytes
+WAL_SEGMENT_SIZE = int(os.getenv("WAL_SEGMENT_SIZE", str(64 * 1024 * 1024)))
+
+# Time the committer waits after the first append of a group for further appends
+# to share its fsync (0 commits as soon as the previous fsync has finished)
+WAL_COMMIT_DELAY = float(os.getenv("WAL_COMMIT_DELAY", "0.001"))
+
+# Interval in which the committer saves the position of the first unconfirmed record
+WAL_CURSOR_INTERVAL = float(os.getenv("WAL_CURSOR_INTERVAL", "0.1"))
+
+
+class WriteAheadLog:
+    """
+    A group-committed log of accepted transactions, truncated as they are published.
+
+    Request handlers append a record and wait until it is durable. A committer
+    thread fsyncs all records appended since its previous fsync at once, so that
+    concurrent requests share one fsync instead of paying one each.
+
+    The log consists of numbered segment files of length-prefixed, checksummed
+    records (the frame format of the outbox). Records are confirmed individually
+    and in any order. The position of the first unconfirmed record (the low-water
+    mark) is saved in a cursor file, like the read position of the outbox, and the
+    segments before it are deleted. On open, only the records from the cursor on
+    are returned for republishing, so a crash republishes the records that were
+    in flight instead of whole segments. Records confirmed out of order after the
+    cursor are republished as well (at least once).
+
+    Methods:
+        open(): Opens the log and returns the records to recover.
+        append(record): Appends a record and waits until it is fsynced.
+        confirm(position): Confirms the publish of a record.
+        close(): Fsyncs the log and stops the committer.
+    """
+
+    def __init__(
+        self,
+        base_directory: str,
+        segment_size: int = WAL_SEGMENT_SIZE,
+        commit_delay: float = WAL_COMMIT_DELAY,
+        cursor_interval: float = WAL_CURSOR_INTERVAL,
+    ):
+        """
+        Initializes the log without touching the file system.
+
+        Args:
+            base_directory (str): The base directory; the segment files are kept in
+                the slot directory claimed by this process on open (see `outbox.claim_slot`).
+            segment_size (int): Size in bytes after which a new segment is started.
+            commit_delay (float): Time in seconds a commit waits for further appends.
+            cursor_interval (float): Minimum time in seconds between cursor updates.
+        """
+        self.base_directory = base_directory
+        self.directory = None
+        self.segment_size = segment_size
+        self.commit_delay = commit_delay
+        self.cursor_interval = cursor_interval
+        self._lock = threading.Lock()
+        self._unconfirmed = collections.deque()
+        self._confirmed = set()
+        self._segments = []
+        self._cursor = None
+        self._saved_cursor = None
+        self._waiters = []
+        self._writer = None
+        self._segment = None
+        self._end = 0
+        self._appended = threading.Event()
+        self._closed = False
+        self._thread = None
+
+    def _segment_path(self, segment: int) -> str:
+        return os.path.join(self.directory, f"{segment:016d}{SEGMENT_SUFFIX}")
+
+    def _read_segment(self, segment: int, offset: int = 0) -> list[tuple[int, bytes]]:
+        """
+        Reads the intact records of a segment from an offset, skipping torn records.
+
+        Args:
+            segment (int): The segment number.
+            offset (int): The offset of the first record to read.
+
+        Returns:
+            list[tuple[int, bytes]]: The offsets and payloads of the intact records.
+        """
+        records = []
+        with open(self._segment_path(segment), "rb") as reader:
+            reader.seek(offset)
+            while True:
+                header = reader.read(FRAME_HEADER.size)
+                if not header:
+                    break
+                intact = len(header) == FRAME_HEADER.size
+                if intact:
+                    length, checksum = FRAME_HEADER.unpack(header)
+                    payload = reader.read(length)
+                    intact = len(payload) == length and zlib.crc32(payload) == checksum
+                if not intact:
+                    logger.error(f"Skipping torn record in log segment {segment} at offset {offset}")
+                    offset = find_next_record(reader, offset)
+                    if offset is None:
+                        break
+                    reader.seek(offset)
+                    continue
+                records.append((offset, payload))
+                offset += FRAME_HEADER.size + length
+        return records
+
+    def _load_cursor(self) -> tuple[int, int]:
+        """
+        Reads the cursor file.
+
+        Returns:
+            tuple[int, int]: The segment and offset of the first unconfirmed record
+                of the previous process, or (0, 0) if there is no cursor.
+        """
+        try:
+            with open(os.path.join(self.directory, CURSOR_FILE)) as cursor:
+                segment, offset = json.load(cursor)
+                return segment, offset
+        except (OSError, ValueError):
+            return 0, 0
+
+    def _save_cursor(self):
+        """
+        Atomically replaces the cursor file with the current low-water mark.
+
+        The cursor is not fsynced: a cursor lost in a power failure only makes the
+        next process republish more records.
+        """
+        with self._lock:
+            cursor = self._cursor
+        if cursor == self._saved_cursor:
+            return
+        path = os.path.join(self.directory, CURSOR_FILE)
+        with open(f"{path}.tmp", "w") as file:
+            json.dump(list(cursor), file)
+        os.replace(f"{path}.tmp", path)
+        self._saved_cursor = cursor
+
+    def open(self) -> list[tuple[tuple[int, int], bytes]]:
+        """
+        Opens the log, starts a new segment and the committer thread.
+
+        Returns:
+            list[tuple[tuple[int, int], bytes]]: The unconfirmed records of a previous
+                process in append order, each with its position to be passed to `confirm`.
+        """
+        self.directory = os.path.join(claim_slot(self.base_directory), "transactions")
+        os.makedirs(self.directory, exist_ok=True)
+        self._closed = False
+        self._unconfirmed = collections.deque()
+        self._confirmed = set()
+        self._segments = []
+        segments = sorted(
+            int(name[: -len(SEGMENT_SUFFIX)])
+            for name in os.listdir(self.directory)
+            if name.endswith(SEGMENT_SUFFIX)
+        )
+        cursor_segment, cursor_offset = self._saved_cursor = self._load_cursor()
+        recovered = []
+        for segment in segments:
+            records = []
+            if segment >= cursor_segment:
+                records = self._read_segment(segment, cursor_offset if segment == cursor_segment else 0)
+            if not records:
+                os.remove(self._segment_path(segment))
+                continue
+            self._segments.append(segment)
+            recovered.extend(((segment, offset), record) for offset, record in records)
+        self._unconfirmed.extend(position for position, _ in recovered)
+        WAL_PENDING.inc(len(recovered))
+        WAL_RECOVERED.inc(len(recovered))
+        if recovered:
+            logger.warning(f"Recovered {len(recovered)} unpublished transactions from {self.directory}")
+
+        self._start_segment(max(segments + [cursor_segment]) + 1)
+        self._thread = threading.Thread(target=self._run, name="wal-committer", daemon=True)
+        self._thread.start()
+        return recovered
+
+    def _start_segment(self, segment: int):
+        """
+        Fsyncs and closes the current segment and starts appending to a new one.
+
+        Must be called with the lock held (or before the committer is started).
+
+        Args:
+            segment (int): The number of the new segment.
+        """
+        if self._writer:
+            self._writer.flush()
+            os.fsync(self._writer.fileno())
+            self._writer.close()
+        self._segment = segment
+        self._segments.append(segment)
+        self._writer = open(self._segment_path(segment), "ab")
+        self._end = 0
+        self._advance()
+
+    def _advance(self):
+        """
+        Moves the low-water mark past the confirmed records at the head of the log and
+        deletes the segments before it.
+
+        Must be called with the lock held.
+        """
+        while self._unconfirmed and self._unconfirmed[0] in self._confirmed:
+            self._confirmed.remove(self._unconfirmed.popleft())
+        self._cursor = self._unconfirmed[0] if self._unconfirmed else (self._segment, self._end)
+        while self._segments and self._segments[0] < self._cursor[0]:
+            os.remove(self._segment_path(self._segments.pop(0)))
+
+    async def append(self, record: bytes) -> tuple[int, int]:
+        """
+        Appends a record and waits until it is durable.
+
+        The record is written to the current segment right away; the returned
+        coroutine completes once the committer has fsynced it.
+
+        Args:
+            record (bytes): The payload of the record.
+
+        Returns:
+            tuple[int, int]: The position (segment and offset) of the record, to be
+                passed to `confirm` once published.
+
+        Raises:
+            OSError: If the record could not be written or fsynced.
+        """
+        frame = FRAME_HEADER.pack(len(record), zlib.crc32(record)) + record
+        loop = asyncio.get_running_loop()
+        durable = loop.create_future()
+        with self._lock:
+            if self._end and self._end + len(frame) > self.segment_size:
+                self._start_segment(self._segment + 1)
+            position = (self._segment, self._end)
+            self._unconfirmed.append(position)
+            self._end += len(frame)
+            self._writer.write(frame)
+            self._waiters.append((loop, durable))
+        WAL_PENDING.inc()
+        self._appended.set()
+        try:
+            await durable
+        except OSError:
+            self.confirm(position)
+            raise
+        return position
+
+    def confirm(self, position: tuple[int, int]):
+        """
+        Confirms that a record was published (or is no longer needed).
+
+        Args:
+            position (tuple[int, int]): The position of the record (see `append`).
+        """
+        with self._lock:
+            self._confirmed.add(position)
+            self._advance()
+        WAL_PENDING.dec()
+
+    def _run(self):
+        """
+        Fsyncs the appended records in groups and saves the cursor until the log is closed.
+
+        The file is flushed under the lock and fsynced through a duplicate of its
+        descriptor outside of it, so that appends continue during the fsync. The
+        cursor is saved at most every `cursor_interval` seconds.
+        """
+        last_cursor_save = time.monotonic()
+        while True:
+            if self._appended.wait(self.cursor_interval):
+                if self.commit_delay and not self._closed:
+                    time.sleep(self.commit_delay)
+                self._commit()
+            if time.monotonic() - last_cursor_save >= self.cursor_interval:
+                self._save_cursor()
+                last_cursor_save = time.monotonic()
+            if self._closed:
+                break
+
+    def _commit(self):
+        """
+        Fsyncs the records appended since the previous commit and completes their appends.
+        """
+        with self._lock:
+            self._appended.clear()
+            waiters, self._waiters = self._waiters, []
+            fd, error = None, None
+            if waiters:
+                try:
+                    self._writer.flush()
+                    fd = os.dup(self._writer.fileno())
+                except OSError as e:
+                    error = e
+
+        if fd is not None:
+            fsync_start = time.perf_counter()
+            try:
+                os.fsync(fd)
+            except OSError as e:
+                error = e
+            finally:
+                os.close(fd)
+            WAL_FSYNC_LATENCY.observe(time.perf_counter() - fsync_start)
+            WAL_COMMIT_BATCH.observe(len(waiters))
+        if error is not None:
+            logger.error(f"Write-ahead log commit failed: {error}")
+
+        for loop, durable in waiters:
+            loop.call_soon_threadsafe(_resolve, durable, error)
+
+    def close(self):
+        """
+        Commits the appended records, stops the committer and closes the segment.
+
+        The segments before the first unconfirmed record are deleted, including the
+        current one if all its records were confirmed; the next process republishes
+        the others.
+        """
+        if self._thread is None:
+            return
+        self._closed = True
+        self._appended.set()
+        self._thread.join()
+        self._thread = None
+        with self._lock:
+            self._writer.close()
+            self._writer = None
+            self._advance()
+            if not self._unconfirmed:
+                os.remove(self._segment_path(self._segments.pop()))
+            pending = len(self._unconfirmed)
+        self._save_cursor()
+        WAL_PENDING.dec(pending)
+
+
+def _resolve(durable: asyncio.Future, error: Exception = None):
+    """
+    Completes the future of an append on its event loop.
+    """
+    if durable.done():
+        return
+    if error is None:
+        durable.set_result(None)
+    else:
+        durable.set_exception(error)
+
+
+def create_wal():
+    """
+    Creates the write-ahead log of this process if `WAL_DIR` is set.
+
+    The log is opened in the application's startup event, in the slot directory
+    claimed by the worker process below `WAL_DIR`.
+
+    Returns:
+        WriteAheadLog or None: The log, or None if disabled.
+    """
+    if not WAL_DIR:
+        return None
+    return WriteAheadLog(WAL_DIR)
@@ -0,0 +1,7 @@
+import os
+import sys
+
+# The service modules import each other as top-level modules, and the shared
+# modules as the `common` package (see the Dockerfile)
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+sys.path.insert(1, os.path.join(os.path.dirname(__file__), "..", ".."))
@@ -0,0 +1,126 @@
+import asyncio
+import base64
+import pytest
+from starlette.responses import PlainTextResponse
+from admission_control import AdmissionController, AdmissionControlMiddleware
+
+PATH = "/api/v1/pos/validate_transaction"
+
+
+@pytest.fixture(autouse=True)
+def credentials(monkeypatch):
+    monkeypatch.setenv("POS_USERNAME", "pos_service")
+    monkeypatch.setenv("POS_PASSWORD", "secret")
+
+
+def authorization(username="pos_service", password="secret"):
+    return b"Basic " + base64.b64encode(f"{username}:{password}".encode())
+
+
+async def request(middleware, path=PATH, auth=None):
+    """
+    Sends a request through the middleware and returns its status and headers.
+    """
+    sent = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {
+        "type": "http",
+        "method": "POST",
+        "path": path,
+        "headers": [(b"authorization", auth or authorization())],
+    }
+    await middleware(scope, receive, send)
+    return sent[0]["status"], dict(sent[0]["headers"])
+
+
+async def ok(scope, receive, send):
+    await PlainTextResponse("ok")(scope, receive, send)
+
+
+def test_request_above_concurrency_limit_is_shed_with_503():
+    controller = AdmissionController(max_concurrency=1, rate=0, burst=1)
+    release = asyncio.Event()
+
+    async def blocking(scope, receive, send):
+        await release.wait()
+        await ok(scope, receive, send)
+
+    middleware = AdmissionControlMiddleware(blocking, controller)
+
+    async def run():
+        first = asyncio.create_task(request(middleware))
+        await asyncio.sleep(0)
+        second = await request(middleware)
+        release.set()
+        return await first, second
+
+    first, second = asyncio.run(run())
+
+    assert first[0] == 200
+    assert second[0] == 503
+    assert second[1][b"retry-after"] == b"1"
+    assert controller.in_flight["pos_service"] == 0
+
+
+def test_request_above_rate_is_shed_with_429():
+    controller = AdmissionController(max_concurrency=0, rate=0.5, burst=1)
+    middleware = AdmissionControlMiddleware(ok, controller)
+
+    async def run():
+        return await request(middleware), await request(middleware)
+
+    first, second = asyncio.run(run())
+
+    assert first[0] == 200
+    assert second[0] == 429
+    assert second[1][b"retry-after"] == b"2"
+
+
+def test_request_shed_for_concurrency_does_not_use_a_token():
+    controller = AdmissionController(max_concurrency=1, rate=0.001, burst=2)
+
+    assert controller.try_acquire("pos_service") is None
+    assert controller.try_acquire("pos_service")[0] == 503
+    controller.release("pos_service")
+
+    assert controller.try_acquire("pos_service") is None
+
+
+def test_limits_apply_per_username():
+    controller = AdmissionController(max_concurrency=1, rate=0, burst=1)
+
+    assert controller.try_acquire("pos_service") is None
+    assert controller.try_acquire("other_service") is None
+
+
+def test_slot_is_released_when_the_endpoint_raises():
+    controller = AdmissionController(max_concurrency=1, rate=0, burst=1)
+
+    async def failing(scope, receive, send):
+        raise RuntimeError("endpoint failed")
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(request(AdmissionControlMiddleware(failing, controller)))
+
+    assert controller.in_flight["pos_service"] == 0
+
+
+@pytest.mark.parametrize(
+    "path, auth",
+    [("/metrics", None), (PATH, authorization(password="wrong")), (PATH, b"Bearer token")],
+)
+def test_other_paths_and_invalid_credentials_are_passed_on(path, auth):
+    controller = AdmissionController(max_concurrency=0, rate=0.001, burst=1)
+    middleware = AdmissionControlMiddleware(ok, controller)
+
+    async def run():
+        return [await request(middleware, path, auth) for _ in range(3)]
+
+    assert [status for status, _ in asyncio.run(run())] == [200, 200, 200]
+    assert controller.in_flight == {}
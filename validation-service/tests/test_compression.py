@@ -0,0 +1,120 @@
+import asyncio
+import zlib
+import pytest
+from starlette.responses import PlainTextResponse
+from common.compression import RequestCompressor, decompress_gzip, decompress_zstd
+from decompression import RequestDecompressionMiddleware
+
+zstandard = pytest.importorskip("zstandard")
+
+BODY = b'{"transaction_id": "1", "store_id": "STORE_1", "total_amount": 12.5}' * 8
+
+
+async def echo_length(scope, receive, send):
+    """
+    An application answering with the length of the received body.
+    """
+    message = await receive()
+    await PlainTextResponse(str(len(message["body"])))(scope, receive, send)
+
+
+def post(body_chunks, encoding=b"gzip", max_size=1000):
+    """
+    Sends a request through the middleware and returns its status and body.
+    """
+    messages = [
+        {"type": "http.request", "body": chunk, "more_body": index < len(body_chunks) - 1}
+        for index, chunk in enumerate(body_chunks)
+    ]
+    sent = []
+
+    async def receive():
+        return messages.pop(0) if messages else {"type": "http.disconnect"}
+
+    async def send(message):
+        sent.append(message)
+
+    middleware = RequestDecompressionMiddleware(echo_length, max_size=max_size)
+    scope = {"type": "http", "method": "POST", "path": "/", "headers": [(b"content-encoding", encoding)]}
+    asyncio.run(middleware(scope, receive, send))
+    return sent[0]["status"], sent[1]["body"]
+
+
+@pytest.mark.parametrize("encoding, decompress", [("gzip", decompress_gzip), ("zstd", decompress_zstd)])
+def test_round_trip(encoding, decompress):
+    compressed = RequestCompressor(encoding, level=3).compress(BODY)
+
+    assert decompress(compressed, 10_000) == BODY
+
+
+@pytest.mark.parametrize("encoding, decompress", [("gzip", decompress_gzip), ("zstd", decompress_zstd)])
+def test_larger_body_is_cut_after_max_size(encoding, decompress):
+    compressed = RequestCompressor(encoding, level=3).compress(BODY)
+
+    assert len(decompress(compressed, 100)) == 101
+
+
+@pytest.mark.parametrize("cut", [5, 0.5, 10])
+def test_truncated_gzip_is_rejected(cut):
+    compressed = RequestCompressor("gzip", level=3).compress(BODY)
+    length = int(len(compressed) * cut) if isinstance(cut, float) else len(compressed) - cut
+
+    with pytest.raises(zlib.error):
+        decompress_gzip(compressed[:length], 10_000)
+
+
+@pytest.mark.parametrize("cut", [5, 0.5, 10])
+def test_truncated_zstd_is_rejected(cut):
+    compressed = RequestCompressor("zstd", level=3).compress(BODY)
+    length = int(len(compressed) * cut) if isinstance(cut, float) else len(compressed) - cut
+
+    with pytest.raises(zstandard.ZstdError):
+        decompress_zstd(compressed[:length], 10_000)
+
+
+def test_zstd_reads_all_frames():
+    compressor = RequestCompressor("zstd", level=3)
+
+    assert decompress_zstd(compressor.compress(BODY) + compressor.compress(BODY), 10_000) == BODY * 2
+
+
+def test_zstd_with_truncated_second_frame_is_rejected():
+    compressor = RequestCompressor("zstd", level=3)
+    compressed = compressor.compress(BODY) + compressor.compress(BODY)
+
+    with pytest.raises(zstandard.ZstdError):
+        decompress_zstd(compressed[:-5], 10_000)
+
+
+@pytest.mark.parametrize("encoding", ["gzip", "zstd"])
+def test_middleware_passes_decompressed_body(encoding):
+    compressed = RequestCompressor(encoding, level=3).compress(BODY)
+
+    assert post([compressed[:10], compressed[10:]], encoding.encode()) == (200, str(len(BODY)).encode())
+
+
+@pytest.mark.parametrize("encoding", ["gzip", "zstd"])
+def test_middleware_rejects_truncated_body(encoding):
+    compressed = RequestCompressor(encoding, level=3).compress(BODY)
+
+    status, _ = post([compressed[:-5]], encoding.encode())
+
+    assert status == 400
+
+
+def test_middleware_rejects_large_compressed_body_while_reading():
+    status, body = post([b"x" * 600, b"x" * 600, b"never read"])
+
+    assert (status, body) == (413, b'{"detail":"Request body too large"}')
+
+
+def test_middleware_rejects_large_decompressed_body():
+    status, body = post([RequestCompressor("gzip", level=3).compress(b"x" * 5000)])
+
+    assert (status, body) == (413, b'{"detail":"Decompressed request body too large"}')
+
+
+def test_middleware_rejects_unsupported_encoding():
+    status, _ = post([BODY], b"br")
+
+    assert status == 415
@@ -0,0 +1,57 @@
+import pytest
+from models.aggregated_event import AggregatedEvent
+from message_codecs import MsgpackCodec, STORE_ID_PROPERTY
+from outbox import Outbox
+
+solace = pytest.importorskip("solace.messaging.messaging_service")
+msgpack = pytest.importorskip("msgpack")
+
+
+@pytest.fixture
+def message_builder():
+    """
+    A message builder of a messaging service that is built but never connected.
+    """
+    service = (
+        solace.MessagingService.builder()
+        .from_properties(
+            {
+                "solace.messaging.transport.host": "tcp://localhost:55555",
+                "solace.messaging.service.vpn-name": "default",
+                "solace.messaging.authentication.scheme.basic.username": "test",
+                "solace.messaging.authentication.scheme.basic.password": "test",
+            }
+        )
+        .build()
+    )
+    return service.message_builder()
+
+
+@pytest.fixture
+def event():
+    return AggregatedEvent(
+        event_id="8c1d4a46-2c8c-4b0e-9b7e-3f1a9d7c2e10",
+        store_id="STORE_01",
+        total_amount=12.5,
+        begin_stream_aggregator="2024-11-15T00:00:00+00:00",
+        end_stream_aggregator="2024-11-15T00:00:10+00:00",
+    )
+
+
+def test_msgpack_payload_builds_outbound_message(message_builder, event):
+    payload = MsgpackCodec().encode(event)
+
+    message = message_builder.build(payload, additional_message_properties={STORE_ID_PROPERTY: "STORE_01"})
+
+    assert msgpack.unpackb(bytes(message.get_payload_as_bytes()))["store_id"] == "STORE_01"
+
+
+def test_msgpack_payload_from_outbox_builds_outbound_message(tmp_path, message_builder, event):
+    outbox = Outbox(str(tmp_path))
+    outbox.append("pos/aggregations/STORE_01", MsgpackCodec().encode(event), "1", MsgpackCodec.content_type)
+
+    [((_, payload, _, _, _), _)] = outbox.read(1)
+    outbox.close()
+    message = message_builder.build(payload)
+
+    assert msgpack.unpackb(bytes(message.get_payload_as_bytes()))["total_amount"] == 12.5
@@ -0,0 +1,116 @@
+import os
+from outbox import FRAME_HEADER, SEGMENT_SUFFIX, Outbox, find_next_record
+
+
+def segment_files(directory):
+    return sorted(name for name in os.listdir(directory) if name.endswith(SEGMENT_SUFFIX))
+
+
+def test_records_are_read_with_their_fields(tmp_path):
+    outbox = Outbox(str(tmp_path))
+    outbox.append("pos/receipt/STORE_01", '{"a": 1}', "1", "application/json", {"store_id": "STORE_01"})
+    outbox.append("pos/receipt/STORE_02", bytearray(b"\x81\xa1a\x01"), "2", "application/msgpack")
+
+    records = outbox.read(10)
+    outbox.close()
+
+    assert [fields for fields, _ in records] == [
+        ("pos/receipt/STORE_01", '{"a": 1}', "1", "application/json", {"store_id": "STORE_01"}),
+        ("pos/receipt/STORE_02", bytearray(b"\x81\xa1a\x01"), "2", "application/msgpack", None),
+    ]
+
+
+def test_committed_records_are_not_read_again_after_reopen(tmp_path):
+    outbox = Outbox(str(tmp_path))
+    for index in range(3):
+        outbox.append("pos/receipt", str(index), str(index), "application/json")
+    records = outbox.read(2)
+    outbox.commit(records[-1][1], len(records))
+    outbox.close()
+
+    outbox = Outbox(str(tmp_path))
+    records = outbox.read(10)
+    outbox.close()
+
+    assert [fields[2] for fields, _ in records] == ["2"]
+
+
+def test_drained_segments_are_deleted(tmp_path):
+    outbox = Outbox(str(tmp_path), segment_size=64)
+    for index in range(4):
+        outbox.append("pos/receipt", str(index), str(index), "application/json")
+    assert len(segment_files(tmp_path)) == 4
+
+    records = outbox.read(10)
+    outbox.commit(records[-1][1], len(records))
+
+    assert len(segment_files(tmp_path)) == 1
+    assert not outbox.pending()
+    outbox.close()
+
+
+def test_full_outbox_drops_messages(tmp_path):
+    outbox = Outbox(str(tmp_path), max_bytes=200)
+
+    stored = [outbox.append("pos/receipt", "x" * 50, str(index), "application/json") for index in range(4)]
+
+    assert stored == [True, False, False, False]
+    assert outbox.backlog_bytes <= 200
+    outbox.close()
+
+
+def test_on_durable_is_called_after_fsync(tmp_path):
+    outbox = Outbox(str(tmp_path), fsync_batch=2, fsync_interval=60)
+    durable = []
+
+    outbox.append("pos/receipt", "1", "1", "application/json", None, lambda: durable.append(1))
+    assert durable == []
+    outbox.append("pos/receipt", "2", "2", "application/json", None, lambda: durable.append(2))
+    outbox.close()
+
+    assert durable == [1, 2]
+
+
+def test_on_durable_is_not_called_for_dropped_message(tmp_path):
+    outbox = Outbox(str(tmp_path), max_bytes=10)
+    durable = []
+
+    assert not outbox.append("pos/receipt", "1", "1", "application/json", None, lambda: durable.append(1))
+    outbox.close()
+
+    assert durable == []
+
+
+def corrupt(path, offset):
+    """
+    Flips a byte of a segment file.
+    """
+    with open(path, "r+b") as segment:
+        segment.seek(offset)
+        byte = segment.read(1)
+        segment.seek(offset)
+        segment.write(bytes([byte[0] ^ 0xFF]))
+
+
+def test_torn_record_is_skipped_up_to_the_next_intact_record(tmp_path):
+    outbox = Outbox(str(tmp_path))
+    for index in range(3):
+        outbox.append("pos/receipt", str(index), str(index), "application/json")
+    segment = outbox._segment_path(outbox._write_segment)
+    first_record_size = outbox._writer.tell() // 3
+    outbox.close()
+    corrupt(segment, first_record_size + FRAME_HEADER.size + 2)
+
+    outbox = Outbox(str(tmp_path))
+    records = outbox.read(10)
+    outbox.close()
+
+    assert [fields[2] for fields, _ in records] == ["0", "2"]
+
+
+def test_find_next_record_without_intact_record(tmp_path):
+    path = tmp_path / "segment"
+    path.write_bytes(b"\x05\x00\x00\x00garbage-without-a-frame")
+
+    with open(path, "rb") as reader:
+        assert find_next_record(reader, 0) is None
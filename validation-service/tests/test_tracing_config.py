@@ -0,0 +1,110 @@
+import pytest
+from opentelemetry import trace
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+from opentelemetry.trace import StatusCode
+from common.tracing_config import (
+    FORCE_SAMPLE_ATTRIBUTE,
+    ErrorSpanProcessor,
+    PrioritySampler,
+    RateLimitingSampler,
+)
+
+
+def create_tracer(sampler):
+    """
+    Creates a tracer exporting to memory through an `ErrorSpanProcessor`.
+    """
+    exporter = InMemorySpanExporter()
+    provider = TracerProvider(sampler=sampler)
+    provider.add_span_processor(ErrorSpanProcessor(exporter))
+    return provider, exporter
+
+
+def exported(provider, exporter):
+    provider.force_flush()
+    return sorted(span.name for span in exporter.get_finished_spans())
+
+
+def test_root_spans_are_sampled_by_ratio():
+    provider, exporter = create_tracer(PrioritySampler(ratio=1.0))
+    tracer = provider.get_tracer(__name__)
+
+    with tracer.start_as_current_span("root"):
+        with tracer.start_as_current_span("child"):
+            pass
+
+    assert exported(provider, exporter) == ["child", "root"]
+
+
+def test_forced_root_span_is_sampled_with_its_children():
+    provider, exporter = create_tracer(PrioritySampler(ratio=0.0, keep_errors=False))
+    tracer = provider.get_tracer(__name__)
+
+    with tracer.start_as_current_span("forced", attributes={FORCE_SAMPLE_ATTRIBUTE: 1}):
+        with tracer.start_as_current_span("child"):
+            pass
+    with tracer.start_as_current_span("dropped"):
+        pass
+
+    assert exported(provider, exporter) == ["child", "forced"]
+
+
+def test_child_spans_follow_the_decision_of_their_parent():
+    provider, exporter = create_tracer(PrioritySampler(ratio=0.0, keep_errors=False))
+    tracer = provider.get_tracer(__name__)
+
+    with tracer.start_as_current_span("root") as root:
+        with tracer.start_as_current_span("child", attributes={FORCE_SAMPLE_ATTRIBUTE: 1}) as child:
+            pass
+
+    assert not root.is_recording() and not child.is_recording()
+    assert exported(provider, exporter) == []
+
+
+def test_unsampled_error_and_forced_spans_are_exported_with_keep_errors():
+    provider, exporter = create_tracer(PrioritySampler(ratio=0.0))
+    tracer = provider.get_tracer(__name__)
+
+    with tracer.start_as_current_span("root"):
+        with tracer.start_as_current_span("ok"):
+            pass
+        with tracer.start_as_current_span("failed") as span:
+            span.set_status(StatusCode.ERROR, "invalid")
+        with tracer.start_as_current_span("corrected") as span:
+            span.set_attribute(FORCE_SAMPLE_ATTRIBUTE, 1)
+
+    assert exported(provider, exporter) == ["corrected", "failed"]
+    assert all(span.context.trace_flags.sampled for span in exporter.get_finished_spans())
+
+
+def test_remote_parent_decision_is_followed():
+    sampler = PrioritySampler(ratio=1.0, keep_errors=False)
+    parent = trace.SpanContext(
+        trace_id=1, span_id=2, is_remote=True, trace_flags=trace.TraceFlags(trace.TraceFlags.DEFAULT)
+    )
+    context = trace.set_span_in_context(trace.NonRecordingSpan(parent))
+
+    assert not sampler.should_sample(context, 1, "child").decision.is_recording()
+
+
+def test_rate_limit_caps_sampled_roots(monkeypatch):
+    monkeypatch.setattr("common.tracing_config.time.monotonic", lambda: 100.0)
+    sampler = PrioritySampler(ratio=1.0, max_per_second=2, keep_errors=False)
+
+    decisions = [sampler.should_sample(None, trace_id, "root").decision for trace_id in range(1, 5)]
+
+    assert [decision.is_sampled() for decision in decisions] == [True, True, False, False]
+
+
+@pytest.mark.parametrize("elapsed, sampled", [(0.4, False), (0.5, True)])
+def test_rate_limiting_sampler_refills(monkeypatch, elapsed, sampled):
+    now = [100.0]
+    monkeypatch.setattr("common.tracing_config.time.monotonic", lambda: now[0])
+    sampler = RateLimitingSampler(2)
+    sampler.should_sample(None, 1, "root")
+    sampler.should_sample(None, 2, "root")
+
+    now[0] += elapsed
+
+    assert sampler.should_sample(None, 3, "root").decision.is_sampled() is sampled
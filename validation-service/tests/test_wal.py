@@ -0,0 +1,105 @@
+import asyncio
+import os
+from outbox import FRAME_HEADER, SEGMENT_SUFFIX
+from wal import WriteAheadLog
+
+
+def append(wal, *records):
+    """
+    Appends records and returns their positions once they are durable.
+    """
+
+    async def run():
+        return [await wal.append(record) for record in records]
+
+    return asyncio.run(run())
+
+
+def segment_files(wal):
+    return sorted(name for name in os.listdir(wal.directory) if name.endswith(SEGMENT_SUFFIX))
+
+
+def reopen(wal):
+    wal.close()
+    reopened = WriteAheadLog(wal.base_directory, segment_size=wal.segment_size, commit_delay=0)
+    return reopened, reopened.open()
+
+
+def test_unconfirmed_records_are_recovered(tmp_path):
+    wal = WriteAheadLog(str(tmp_path), commit_delay=0)
+    assert wal.open() == []
+    positions = append(wal, b"a", b"b", b"c")
+    wal.confirm(positions[0])
+
+    wal, recovered = reopen(wal)
+    wal.close()
+
+    assert [record for _, record in recovered] == [b"b", b"c"]
+
+
+def test_records_confirmed_after_the_first_unconfirmed_one_are_recovered(tmp_path):
+    wal = WriteAheadLog(str(tmp_path), commit_delay=0)
+    wal.open()
+    positions = append(wal, b"a", b"b", b"c")
+    wal.confirm(positions[1])
+
+    wal, recovered = reopen(wal)
+    wal.close()
+
+    assert [record for _, record in recovered] == [b"a", b"b", b"c"]
+
+
+def test_recovered_records_are_confirmed_by_position(tmp_path):
+    wal = WriteAheadLog(str(tmp_path), commit_delay=0)
+    wal.open()
+    append(wal, b"a", b"b")
+    wal, recovered = reopen(wal)
+    for position, _ in recovered:
+        wal.confirm(position)
+
+    wal, recovered = reopen(wal)
+    wal.close()
+
+    assert recovered == []
+
+
+def test_segments_are_deleted_once_confirmed(tmp_path):
+    wal = WriteAheadLog(str(tmp_path), segment_size=20, commit_delay=0)
+    wal.open()
+    positions = append(wal, b"a" * 8, b"b" * 8, b"c" * 8)
+    assert len(segment_files(wal)) == 3
+
+    wal.confirm(positions[0])
+    wal.confirm(positions[1])
+
+    assert len(segment_files(wal)) == 1
+    wal.confirm(positions[2])
+    wal.close()
+    assert segment_files(wal) == []
+
+
+def test_segment_of_an_unconfirmed_record_is_kept_on_close(tmp_path):
+    wal = WriteAheadLog(str(tmp_path), segment_size=20, commit_delay=0)
+    wal.open()
+    positions = append(wal, b"a" * 8, b"b" * 8)
+    wal.confirm(positions[0])
+
+    wal, recovered = reopen(wal)
+    wal.close()
+
+    assert [record for _, record in recovered] == [b"b" * 8]
+
+
+def test_torn_record_is_skipped_on_recovery(tmp_path):
+    wal = WriteAheadLog(str(tmp_path), commit_delay=0)
+    wal.open()
+    positions = append(wal, b"a" * 8, b"b" * 8, b"c" * 8)
+    segment, offset = positions[1]
+    with open(wal._segment_path(segment), "r+b") as file:
+        file.seek(offset + FRAME_HEADER.size)
+        file.write(b"x")
+
+    wal, recovered = reopen(wal)
+    wal.close()
+
+    assert [record for _, record in recovered] == [b"a" * 8, b"c" * 8]